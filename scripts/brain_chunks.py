@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Knowledge Brain — chunk index below page level.
+
+Used by: knowledge-brain.py (search/query --chunks read it; chunks, import,
+         watch and writer sync it), knowledge-brain-ingest.py (sync)
+
+Pages are split according to config.chunk_strategy:
+  section   compiled_truth by markdown heading (## State, ### Open Threads,
+            ...; the heading path is kept, e.g. "State › Open Threads"),
+            timeline by entry (one "- **date** | source — summary" each)
+  page      one chunk per page (compiled_truth + timeline)
+
+Storage (schema v6, see brain_db):
+  chunks        page_id, ord, kind, heading, content, content_hash
+  chunk_fts     FTS5 over chunks(heading, content), kept in step by triggers
+  chunk_dirty   pages changed since the last sync (filled by triggers)
+
+Page writes only mark the page dirty; sync() re-chunks dirty pages and
+rewrites just the chunks whose text changed, so an edited section or a new
+timeline entry costs one or two FTS row updates, not a page re-index.
+Changing chunk_strategy re-chunks every page on the next sync. sync runs on
+the write paths after page writes; searches only read the chunk index.
+"""
+import hashlib
+import re
+
+CHUNK_STRATEGIES = ("section", "page")
+DEFAULT_STRATEGY = "section"
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_ENTRY = re.compile(r"^\s*[-*]\s+")
+_ENTRY_DATE = re.compile(r"\*\*(\d{4}-\d{2}-\d{2})\*\*")
+
+
+def split_sections(text):
+    """[(heading_path, body)] per markdown heading; "" for text before the first one.
+
+    A level-1 heading is the page title and starts the intro, not a section.
+    """
+    sections = []
+    path, lines = [], []
+    heading = ""
+    for line in (text or "").splitlines():
+        m = _HEADING.match(line)
+        if not m:
+            lines.append(line)
+            continue
+        sections.append((heading, "\n".join(lines).strip()))
+        level = len(m.group(1))
+        path = path[:max(level - 2, 0)] + ([m.group(2)] if level > 1 else [])
+        heading, lines = " › ".join(path), []
+    sections.append((heading, "\n".join(lines).strip()))
+    return [(h, body) for h, body in sections if body]
+
+
+def split_timeline(text):
+    """[(date or "", entry)] — one per list item, continuation lines included."""
+    entries = []
+    for line in (text or "").splitlines():
+        if _HEADING.match(line) or not line.strip():
+            continue
+        if _ENTRY.match(line) or not entries:
+            entries.append([line.strip()])
+        else:
+            entries[-1].append(line.strip())
+    result = []
+    for lines in entries:
+        entry = "\n".join(lines)
+        m = _ENTRY_DATE.search(lines[0])
+        result.append((m.group(1) if m else "", entry))
+    return result
+
+
+def chunk_page(compiled_truth, timeline, strategy=DEFAULT_STRATEGY):
+    """[(kind, heading, content)] for a page under the given strategy."""
+    if strategy == "page":
+        content = "\n\n".join(t for t in (compiled_truth, timeline) if t and t.strip())
+        return [("page", "", content)] if content else []
+    chunks = [("section", heading, body) for heading, body in split_sections(compiled_truth)]
+    chunks += [("timeline", date, entry) for date, entry in split_timeline(timeline)]
+    return chunks
+
+
+def chunk_strategy(conn):
+    """config.chunk_strategy, falling back to "section" for unknown values."""
+    row = conn.execute("SELECT value FROM config WHERE key = 'chunk_strategy'").fetchone()
+    value = (row[0] if row else "").strip().lower()
+    return value if value in CHUNK_STRATEGIES else DEFAULT_STRATEGY
+
+
+def _content_hash(kind, heading, content):
+    return hashlib.sha1(f"{kind}\0{heading}\0{content}".encode("utf-8")).hexdigest()
+
+
+def sync(conn, force=False):
+    """Re-chunk dirty pages (all pages when forced or the strategy changed).
+
+    Returns {"pages", "written", "deleted"}; commits. Runs as one IMMEDIATE
+    transaction so concurrent writers (watch, ingest, the queue writer)
+    re-chunk a page one at a time, and bumps the query-cache generation
+    when chunks changed.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    strategy = chunk_strategy(conn)
+    built = conn.execute("SELECT value FROM config WHERE key = 'chunk_strategy_built'").fetchone()
+    if force or not built or built[0] != strategy:
+        conn.execute("INSERT OR IGNORE INTO chunk_dirty (page_id) SELECT id FROM pages")
+        conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('chunk_strategy_built', ?)",
+                     (strategy,))
+
+    dirty = [r[0] for r in conn.execute("SELECT page_id FROM chunk_dirty")]
+    written = deleted = 0
+    for page_id in dirty:
+        page = conn.execute("SELECT compiled_truth, timeline FROM pages WHERE id = ?", (page_id,)).fetchone()
+        chunks = chunk_page(page[0], page[1], strategy) if page else []
+
+        # Unchanged chunks keep their row (at most an ord update, which the
+        # FTS trigger ignores); changed ones reuse a leftover row, then insert
+        by_hash = {}
+        for chunk_id, ord_, h in conn.execute(
+                "SELECT id, ord, content_hash FROM chunks WHERE page_id = ? ORDER BY ord", (page_id,)):
+            by_hash.setdefault(h, []).append((chunk_id, ord_))
+        pending = []
+        for ord_, (kind, heading, content) in enumerate(chunks):
+            h = _content_hash(kind, heading, content)
+            if by_hash.get(h):
+                chunk_id, old_ord = by_hash[h].pop(0)
+                if old_ord != ord_:
+                    conn.execute("UPDATE chunks SET ord = ? WHERE id = ?", (ord_, chunk_id))
+            else:
+                pending.append((ord_, kind, heading, content, h))
+        spare = [chunk_id for rows in by_hash.values() for chunk_id, _ in rows]
+
+        for ord_, kind, heading, content, h in pending:
+            if spare:
+                conn.execute("UPDATE chunks SET ord = ?, kind = ?, heading = ?, content = ?, content_hash = ? "
+                             "WHERE id = ?", (ord_, kind, heading, content, h, spare.pop()))
+            else:
+                conn.execute("INSERT INTO chunks (page_id, ord, kind, heading, content, content_hash) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", (page_id, ord_, kind, heading, content, h))
+            written += 1
+        if spare:
+            conn.executemany("DELETE FROM chunks WHERE id = ?", [(c,) for c in spare])
+            deleted += len(spare)
+
+    if dirty:
+        conn.executemany("DELETE FROM chunk_dirty WHERE page_id = ?", [(p,) for p in dirty])
+    if written or deleted:
+        conn.execute("UPDATE config SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+    conn.commit()
+    return {"pages": len(dirty), "written": written, "deleted": deleted}
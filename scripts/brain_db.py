@@ -0,0 +1,776 @@
+#!/usr/bin/env python3
+"""
+Knowledge Brain — shared connection management + schema helpers.
+
+Used by: knowledge-brain.py, knowledge-brain-ingest.py,
+         knowledge-brain-briefing.py, knowledge-brain-link.py
+
+Every script opens the brain through get_db(), so all of them run with the
+same pragma profile (PRAGMAS). Connections come from a per-path pool: close()
+hands the connection back instead of closing it, so long-lived callers
+(briefing, agents calling several brain functions) reuse a warm connection
+without reconnecting or re-issuing pragmas. WAL is persistent in the DB
+file, so journal_mode is only set on the first connection per process; that
+connection also brings the schema up to SCHEMA_VERSION (see migrate()).
+"""
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+WORKSPACE = Path("/root/.openclaw/workspace")
+BRAIN_DB = os.environ.get("KNOWLEDGE_DB", str(WORKSPACE / "knowledge.db"))
+
+# Per-connection settings, applied once when a connection is opened
+PRAGMAS = (
+    ("foreign_keys", "ON"),
+    ("synchronous", "NORMAL"),    # durable enough under WAL, far fewer fsyncs
+    ("cache_size", "-16000"),     # 16 MB page cache
+    ("mmap_size", "268435456"),   # 256 MB memory-mapped reads
+    ("temp_store", "MEMORY"),
+)
+POOL_MAX_IDLE = 4
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to its pool."""
+
+    pool = None
+
+    def close(self):
+        if self.pool is None or not self.pool.release(self):
+            super().close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of configured connections to one database file."""
+
+    def __init__(self, path, max_idle=POOL_MAX_IDLE):
+        self.path = str(path)
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._wal_checked = False
+        self.opened = 0
+        self.reused = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+        conn = sqlite3.connect(self.path, factory=PooledConnection, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.executescript("".join(f"PRAGMA {name} = {value};" for name, value in PRAGMAS))
+        with self._lock:
+            set_wal = not self._wal_checked
+            self._wal_checked = True
+        if set_wal:
+            conn.execute("PRAGMA journal_mode = WAL")
+            migrate(conn)
+        conn.pool = self
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def release(self, conn):
+        """Take a connection back; False means the caller should really close it."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            return False
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return True
+        return False
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.pool = None
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    """Process-wide pool for a DB path (defaults to BRAIN_DB)."""
+    path = str(path or BRAIN_DB)
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+def get_db(path=None):
+    """Configured connection to the brain; close() returns it to the pool."""
+    return get_pool(path).acquire()
+
+
+# ── Versioned schema migrations ──────────────────────────────────────────────
+# config.version records the schema level of a brain. init_db creates the v1
+# tables; migrate() then walks every later step in order, so fresh and
+# existing DBs end up with the same schema.
+
+def _execute_statements(conn, script):
+    """Run a multi-statement script inside the current transaction.
+
+    executescript() would COMMIT first, breaking the migration's transaction.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+
+
+def _fm_field(path):
+    """Frontmatter field as a generated-column expression (NULL on bad JSON)."""
+    return f"CASE WHEN json_valid(frontmatter) THEN json_extract(frontmatter, '{path}') END"
+
+
+def _migrate_v2(conn):
+    """Indexed generated columns for the frontmatter fields briefing/maintain filter on.
+
+    SQLite can only ADD virtual generated columns; the indexes below store
+    the extracted values, so filters on them never decode frontmatter.
+    """
+    columns = {
+        "status": f"TEXT GENERATED ALWAYS AS ({_fm_field('$.status')}) VIRTUAL",
+        "priority": f"TEXT GENERATED ALWAYS AS ({_fm_field('$.priority')}) VIRTUAL",
+        "date_applied": f"TEXT GENERATED ALWAYS AS ({_fm_field('$.date_applied')}) VIRTUAL",
+        "open_thread_count": """INTEGER GENERATED ALWAYS AS (
+            CASE WHEN json_valid(frontmatter) AND json_type(frontmatter, '$.open_threads') = 'array'
+                 THEN json_array_length(frontmatter, '$.open_threads') ELSE 0 END) VIRTUAL""",
+    }
+    existing = {r[1] for r in conn.execute("PRAGMA table_xinfo(pages)")}
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE pages ADD COLUMN {name} {ddl}")
+    for index, cols in (("idx_pages_type_status", "type, status"),
+                        ("idx_pages_priority", "priority"),
+                        ("idx_pages_date_applied", "date_applied"),
+                        ("idx_pages_open_threads", "open_thread_count")):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON pages({cols})")
+
+
+# Undirected adjacency over links, one row per (page, neighbor) direction.
+# Graph traversal seeks this WITHOUT ROWID primary key instead of unioning
+# both links indexes at every hop. Triggers keep it current, so link inserts
+# from knowledge-brain-link.py and the ingest pipeline update it incrementally.
+ADJACENCY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS adjacency (
+        page_id     INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+        neighbor_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+        PRIMARY KEY (page_id, neighbor_id)
+    ) WITHOUT ROWID;
+    CREATE TRIGGER IF NOT EXISTS links_adjacency_ai AFTER INSERT ON links BEGIN
+        INSERT OR IGNORE INTO adjacency (page_id, neighbor_id)
+        VALUES (new.from_page_id, new.to_page_id), (new.to_page_id, new.from_page_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS links_adjacency_ad AFTER DELETE ON links
+    WHEN NOT EXISTS (
+        SELECT 1 FROM links
+        WHERE (from_page_id = old.from_page_id AND to_page_id = old.to_page_id)
+           OR (from_page_id = old.to_page_id AND to_page_id = old.from_page_id)
+    ) BEGIN
+        DELETE FROM adjacency
+        WHERE (page_id = old.from_page_id AND neighbor_id = old.to_page_id)
+           OR (page_id = old.to_page_id AND neighbor_id = old.from_page_id);
+    END;
+"""
+
+
+def _migrate_v3(conn):
+    """Materialize the adjacency cache and backfill it from links."""
+    _execute_statements(conn, ADJACENCY_SCHEMA)
+    conn.execute("""
+        INSERT OR IGNORE INTO adjacency (page_id, neighbor_id)
+        SELECT from_page_id, to_page_id FROM links
+        UNION SELECT to_page_id, from_page_id FROM links
+    """)
+
+
+# FTS sync on UPDATE: only when an indexed column actually changed.
+# Frontmatter/updated_at writes (ingest does these constantly) leave the
+# FTS index alone instead of deleting and re-inserting the row.
+PAGES_FTS_UPDATE_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE OF title, compiled_truth, timeline ON pages
+    WHEN old.title IS NOT new.title
+      OR old.compiled_truth IS NOT new.compiled_truth
+      OR old.timeline IS NOT new.timeline
+    BEGIN
+        INSERT INTO page_fts(page_fts, rowid, title, compiled_truth, timeline)
+        VALUES ('delete', old.id, old.title, old.compiled_truth, old.timeline);
+        INSERT INTO page_fts(rowid, title, compiled_truth, timeline)
+        VALUES (new.id, new.title, new.compiled_truth, new.timeline);
+    END;
+"""
+
+
+def _migrate_v4(conn):
+    """Replace the catch-all pages_au FTS trigger with the narrow one."""
+    conn.execute("DROP TRIGGER IF EXISTS pages_au")
+    _execute_statements(conn, PAGES_FTS_UPDATE_TRIGGER)
+
+
+# Vector index bookkeeping (matrix itself lives in the .vectors sidecar,
+# see brain_vectors.py). Page writes that change indexed text queue the
+# page in vector_dirty; the next vector sync (run by the write paths)
+# re-embeds just those pages.
+VECTOR_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS vector_rows (
+        row           INTEGER PRIMARY KEY,   -- row in the float32 matrix
+        page_id       INTEGER,               -- NULL: free row
+        section       TEXT,
+        content_hash  TEXT,
+        UNIQUE(page_id, section)
+    );
+    CREATE INDEX IF NOT EXISTS idx_vector_rows_free ON vector_rows(page_id) WHERE page_id IS NULL;
+    CREATE TABLE IF NOT EXISTS vector_idf (
+        bucket  INTEGER PRIMARY KEY,
+        idf     REAL    NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS vector_dirty (
+        page_id INTEGER PRIMARY KEY
+    );
+    CREATE TRIGGER IF NOT EXISTS pages_vector_ai AFTER INSERT ON pages BEGIN
+        INSERT OR IGNORE INTO vector_dirty (page_id) VALUES (new.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS pages_vector_au AFTER UPDATE OF title, compiled_truth, timeline ON pages
+    WHEN old.title IS NOT new.title
+      OR old.compiled_truth IS NOT new.compiled_truth
+      OR old.timeline IS NOT new.timeline
+    BEGIN
+        INSERT OR IGNORE INTO vector_dirty (page_id) VALUES (new.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS pages_vector_ad AFTER DELETE ON pages BEGIN
+        INSERT OR IGNORE INTO vector_dirty (page_id) VALUES (old.id);
+    END;
+"""
+
+
+def _migrate_v5(conn):
+    """Vector index tables + dirty-page triggers (first sync builds the matrix)."""
+    _execute_statements(conn, VECTOR_SCHEMA)
+
+
+# Chunk index (brain_chunks): chunk_fts mirrors chunks through triggers; the
+# update trigger ignores ord-only moves. Page writes just queue the page.
+CHUNK_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS chunks (
+        id            INTEGER PRIMARY KEY,
+        page_id       INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+        ord           INTEGER NOT NULL,
+        kind          TEXT    NOT NULL,      -- section | timeline | page
+        heading       TEXT    NOT NULL DEFAULT '',
+        content       TEXT    NOT NULL,
+        content_hash  TEXT    NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_chunks_page ON chunks(page_id, ord);
+    CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+        heading, content,
+        content='chunks', content_rowid='id',
+        tokenize='porter unicode61'
+    );
+    CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+        INSERT INTO chunk_fts(rowid, heading, content) VALUES (new.id, new.heading, new.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+        INSERT INTO chunk_fts(chunk_fts, rowid, heading, content)
+        VALUES ('delete', old.id, old.heading, old.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS chunks_au AFTER UPDATE OF heading, content ON chunks BEGIN
+        INSERT INTO chunk_fts(chunk_fts, rowid, heading, content)
+        VALUES ('delete', old.id, old.heading, old.content);
+        INSERT INTO chunk_fts(rowid, heading, content) VALUES (new.id, new.heading, new.content);
+    END;
+    CREATE TABLE IF NOT EXISTS chunk_dirty (
+        page_id INTEGER PRIMARY KEY
+    );
+    CREATE TRIGGER IF NOT EXISTS pages_chunk_ai AFTER INSERT ON pages BEGIN
+        INSERT OR IGNORE INTO chunk_dirty (page_id) VALUES (new.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS pages_chunk_au AFTER UPDATE OF compiled_truth, timeline ON pages
+    WHEN old.compiled_truth IS NOT new.compiled_truth
+      OR old.timeline IS NOT new.timeline
+    BEGIN
+        INSERT OR IGNORE INTO chunk_dirty (page_id) VALUES (new.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS pages_chunk_ad AFTER DELETE ON pages BEGIN
+        INSERT OR IGNORE INTO chunk_dirty (page_id) VALUES (old.id);
+    END;
+"""
+
+
+def _migrate_v6(conn):
+    """Chunk tables + triggers; every page is queued so the first sync fills them."""
+    _execute_statements(conn, CHUNK_SCHEMA)
+    conn.execute("INSERT OR IGNORE INTO chunk_dirty (page_id) SELECT id FROM pages")
+
+
+def _migrate_v7(conn):
+    """ingest_log.intent_id: a queued log intent's id, so a spool replay can't log it twice."""
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(ingest_log)")}
+    if columns and "intent_id" not in columns:
+        conn.execute("ALTER TABLE ingest_log ADD COLUMN intent_id TEXT")
+    if columns:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_ingest_log_intent ON ingest_log(intent_id) "
+                     "WHERE intent_id IS NOT NULL")
+
+
+MIGRATIONS = {
+    2: _migrate_v2,
+    3: _migrate_v3,
+    4: _migrate_v4,
+    5: _migrate_v5,
+    6: _migrate_v6,
+    7: _migrate_v7,
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+
+def schema_version(conn):
+    row = conn.execute("SELECT value FROM config WHERE key = 'version'").fetchone()
+    return int(row[0]) if row else 1
+
+
+def migrate(conn):
+    """Apply pending migrations; returns the versions applied.
+
+    Each step runs in its own IMMEDIATE transaction and re-checks the
+    version inside it, so concurrent writers never apply a step twice.
+    Brains that have not been init'ed yet are left alone.
+    """
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not {"pages", "config"} <= tables:
+        return []
+    if conn.in_transaction:
+        conn.commit()
+    applied = []
+    for version in sorted(MIGRATIONS):
+        if schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) < version:
+                MIGRATIONS[version](conn)
+                conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('version', ?)", (str(version),))
+                applied.append(version)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return applied
+
+
+TIMELINE_UNIQUE_INDEX = "idx_timeline_unique"
+
+
+def ensure_timeline_unique(conn):
+    """Migrate timeline_entries to a UNIQUE (page_id, date, source, summary) index.
+
+    Existing duplicates are collapsed onto their oldest row first. Runs once:
+    later calls only see the index in sqlite_master and return.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+        (TIMELINE_UNIQUE_INDEX,)
+    ).fetchone()
+    if exists:
+        return
+    conn.execute("""
+        DELETE FROM timeline_entries WHERE id NOT IN (
+            SELECT MIN(id) FROM timeline_entries
+            GROUP BY page_id, date, source, summary
+        )
+    """)
+    conn.execute(f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS {TIMELINE_UNIQUE_INDEX}
+        ON timeline_entries(page_id, date, source, summary)
+    """)
+    conn.commit()
+
+
+def insert_timeline_entries(cursor, entries):
+    """Insert (page_id, date, source, summary, detail) rows with one executemany.
+
+    Duplicates (including within the batch) are dropped by the UNIQUE index.
+    Returns (inserted, skipped).
+    """
+    if not entries:
+        return 0, 0
+    cursor.executemany("""
+        INSERT OR IGNORE INTO timeline_entries (page_id, date, source, summary, detail)
+        VALUES (?, ?, ?, ?, ?)
+    """, entries)
+    inserted = max(cursor.rowcount, 0)
+    return inserted, len(entries) - inserted
+
+
+def insert_links(cursor, links):
+    """Insert (from_page_id, to_page_id, context) rows with one executemany.
+
+    Existing edges are left as they are (UNIQUE(from_page_id, to_page_id)).
+    Returns (inserted, skipped).
+    """
+    if not links:
+        return 0, 0
+    cursor.executemany("""
+        INSERT OR IGNORE INTO links (from_page_id, to_page_id, context)
+        VALUES (?, ?, ?)
+    """, links)
+    inserted = max(cursor.rowcount, 0)
+    return inserted, len(links) - inserted
+
+
+# Stay under SQLITE_MAX_VARIABLE_NUMBER on older builds (999)
+SLUG_BATCH = 900
+
+
+def resolve_slugs(cursor, slugs):
+    """Map slug → page id for every slug that exists (one IN query per batch)."""
+    slugs = list(dict.fromkeys(slugs))
+    ids = {}
+    for i in range(0, len(slugs), SLUG_BATCH):
+        batch = slugs[i:i + SLUG_BATCH]
+        cursor.execute(f"SELECT slug, id FROM pages WHERE slug IN ({','.join('?' * len(batch))})", batch)
+        ids.update((row[0], row[1]) for row in cursor.fetchall())
+    return ids
+
+
+# Frontmatter keys holding ISO dates that only ever move forward; every other
+# key is overwritten with the latest value. Only ISO date strings compare
+# correctly with SQL max() ("9" > "10").
+MONOTONIC_DATE_KEYS = frozenset({"last_updated", "last_email_date", "last_contact"})
+
+
+class FrontmatterDeltas:
+    """Per-page frontmatter changes accumulated during ingest, flushed in bulk.
+
+    Many entries for one page (a burst of emails from one recruiter) become
+    one UPDATE at flush time. Values are applied with json_set, so only the
+    frontmatter column changes; MONOTONIC_DATE_KEYS never move backwards.
+    """
+
+    def __init__(self):
+        self._pending = {}   # page_id → {key: value}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def set(self, page_id, key, value):
+        """Queue key = value for page_id (raised, not overwritten, for date keys)."""
+        fields = self._pending.setdefault(page_id, {})
+        if key in MONOTONIC_DATE_KEYS:
+            value = str(value)
+            if key in fields and value <= fields[key]:
+                return
+        fields[key] = value
+
+    def flush(self, cursor):
+        """One UPDATE per touched page (executemany per key set); returns pages updated."""
+        groups = {}
+        for page_id, fields in self._pending.items():
+            keys = tuple(sorted(fields))
+            groups.setdefault(keys, []).append([fields[k] for k in keys] + [page_id])
+        updated = 0
+        for keys, rows in groups.items():
+            setters = ", ".join(
+                f"'$.{k}', max(COALESCE(json_extract(frontmatter, '$.{k}'), ''), ?)"
+                if k in MONOTONIC_DATE_KEYS else f"'$.{k}', ?"
+                for k in keys)
+            cursor.executemany(f"""
+                UPDATE pages SET frontmatter = json_set(frontmatter, {setters}),
+                                 updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+                WHERE id = ? AND json_valid(frontmatter)
+            """, rows)
+            updated += max(cursor.rowcount, 0)
+        self._pending.clear()
+        return updated
+
+
+# LIKE is case-insensitive for ASCII letters only
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+class PageResolver:
+    """In-memory page lookup for ingest: slug, title and title-substring.
+
+    Loads every page once and answers find_or_create_page's three lookups
+    without touching SQL:
+      - slug == slug
+      - exact title, ASCII case-insensitive (as LIKE compares)
+      - same type, title contains x: via a per-type trigram index (a title
+        containing x contains all of x's trigrams), then verified. x is
+        matched literally; unlike LIKE '%x%', "_" and "%" in x are not
+        wildcards.
+    Ties go to the lowest page id, as the table scans returned. add() keeps
+    it current as pages are created.
+    """
+
+    def __init__(self, cursor):
+        self._slugs = {}
+        self._titles = {}
+        self._by_type = {}   # type → {id: lowercased title}
+        self._grams = {}     # (type, trigram) → {id}
+        cursor.execute("SELECT id, slug, type, title FROM pages ORDER BY id")
+        for page_id, slug, page_type, title in cursor.fetchall():
+            self.add(page_id, slug, page_type, title)
+
+    @staticmethod
+    def _trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, page_id, slug, page_type, title):
+        title = (title or "").translate(_ASCII_LOWER)
+        self._slugs.setdefault(slug, page_id)
+        self._titles.setdefault(title, page_id)
+        self._by_type.setdefault(page_type, {})[page_id] = title
+        for gram in self._trigrams(title):
+            self._grams.setdefault((page_type, gram), set()).add(page_id)
+
+    def slug_id(self, slug):
+        """Page id for slug, or None."""
+        return self._slugs.get(slug)
+
+    def find(self, title, page_type, slug):
+        """Page id matching slug, then title, then type + title[:20] substring."""
+        if slug in self._slugs:
+            return self._slugs[slug]
+        title = (title or "").translate(_ASCII_LOWER)
+        if title in self._titles:
+            return self._titles[title]
+
+        needle = title[:20]
+        titles = self._by_type.get(page_type, {})
+        grams = self._trigrams(needle)
+        if grams:
+            postings = sorted((self._grams.get((page_type, g), set()) for g in grams), key=len)
+            candidates = set.intersection(*postings)
+        else:
+            candidates = titles.keys()
+        matches = [i for i in candidates if needle in titles[i]]
+        return min(matches) if matches else None
+
+
+def find_or_create_page(cursor, title, entity_type, slug_suggestion="", frontmatter=None, resolver=None):
+    """Find existing page by slug or title, or create one.
+
+    Lookups go through a PageResolver (loaded once per ingest run), so SQL
+    is only hit to insert new pages.
+    """
+    slug = slug_suggestion or f"{entity_type}/" + title.lower().replace(" ", "-").replace(",", "").replace("/", "-")
+    if resolver is None:
+        resolver = PageResolver(cursor)
+
+    existing = resolver.find(title, entity_type, slug)
+    if existing:
+        return existing
+
+    # Create new
+    import datetime
+    now = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    fm = json.dumps(frontmatter or {})
+    compiled = f"# {title}\n\n> [Auto-created by ingest]\n\n## State\n**Last Updated:** {now}\n**Status:** active\n\n---\n"
+    cursor.execute(
+        "INSERT INTO pages (slug, type, title, compiled_truth, timeline, frontmatter) VALUES (?, ?, ?, ?, ?, ?)",
+        (slug, entity_type, title, compiled, "", fm)
+    )
+    print(f"    + Created entity: {slug}")
+    resolver.add(cursor.lastrowid, slug, entity_type, title)
+    return cursor.lastrowid
+
+
+# ── Query result cache ───────────────────────────────────────────────────────
+# config.generation is bumped by triggers on every write to the tables that
+# search/query read, so a cached result is valid iff it was stored at the
+# current generation. Repeat queries between ingests skip FTS entirely.
+# A hit is read-only: hit/miss counts and per-entry hits/last_used build up
+# in memory (_CacheCounters) and are written with the next cache_put, or by
+# cache_flush() (the resident server calls it periodically and on shutdown).
+QUERY_CACHE_MAX = 500
+GENERATION_TABLES = ("pages", "timeline_entries", "links", "tags")
+
+
+def _generation_triggers():
+    sql = []
+    for table in GENERATION_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            sql.append(f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_generation_{event.lower()} AFTER {event} ON {table} BEGIN
+        UPDATE config SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation';
+    END;""")
+    return "".join(sql)
+
+
+QUERY_CACHE_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS query_cache (
+        cache_key   TEXT    PRIMARY KEY,   -- kind | normalized query | limit | params
+        generation  INTEGER NOT NULL,
+        result      TEXT    NOT NULL,      -- JSON list of result rows
+        hits        INTEGER NOT NULL DEFAULT 0,
+        last_used   REAL    NOT NULL DEFAULT (julianday('now'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_query_cache_lru ON query_cache(last_used);
+    INSERT OR IGNORE INTO config (key, value) VALUES ('generation', '0');
+    INSERT OR IGNORE INTO config (key, value) VALUES ('query_cache_hits', '0');
+    INSERT OR IGNORE INTO config (key, value) VALUES ('query_cache_misses', '0');
+    {_generation_triggers()}
+"""
+
+
+def ensure_query_cache(conn):
+    """Create the query cache + generation triggers once per DB."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'query_cache'"
+    ).fetchone()
+    if not exists:
+        conn.executescript(QUERY_CACHE_SCHEMA)
+        conn.commit()
+
+
+def cache_key(kind, query, limit, *params):
+    """Cache key from the query text, limit and ranking params.
+
+    Only whitespace is collapsed: FTS5 operators (OR/AND/NOT/NEAR) are
+    case-sensitive, so "a OR b" and "a or b" are different searches. Callers
+    that case-fold (query_semantic's extracted terms) do so before this.
+    """
+    normalized = " ".join(query.split())
+    return "|".join([kind, normalized, str(limit)] + [str(p) for p in params])
+
+
+class _CacheCounters:
+    """Unwritten cache hit/miss counts per DB file, shared by all threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}   # db path → [hits, misses, {cache_key: hits}]
+
+    @staticmethod
+    def _db(conn):
+        return getattr(conn.pool, "path", None) if isinstance(conn, PooledConnection) else None
+
+    def count(self, conn, key, hit):
+        with self._lock:
+            entry = self._pending.setdefault(self._db(conn), [0, 0, {}])
+            if hit:
+                entry[0] += 1
+                entry[2][key] = entry[2].get(key, 0) + 1
+            else:
+                entry[1] += 1
+
+    def take(self, conn):
+        with self._lock:
+            return self._pending.pop(self._db(conn), None)
+
+    def restore(self, conn, taken):
+        """Put counts back after a failed write so they are not lost."""
+        if taken:
+            hits, misses, per_key = taken
+            with self._lock:
+                entry = self._pending.setdefault(self._db(conn), [0, 0, {}])
+                entry[0] += hits
+                entry[1] += misses
+                for key, n in per_key.items():
+                    entry[2][key] = entry[2].get(key, 0) + n
+
+    def peek(self, conn):
+        with self._lock:
+            hits, misses, _ = self._pending.get(self._db(conn), (0, 0, None))
+            return hits, misses
+
+
+_cache_counters = _CacheCounters()
+
+
+def _write_cache_counters(conn, taken):
+    """Add taken in-memory counts to config and query_cache (no commit)."""
+    hits, misses, per_key = taken
+    conn.executemany("UPDATE config SET value = CAST(value AS INTEGER) + ? WHERE key = ?",
+                     [(hits, "query_cache_hits"), (misses, "query_cache_misses")])
+    conn.executemany("UPDATE query_cache SET hits = hits + ?, last_used = julianday('now') WHERE cache_key = ?",
+                     [(n, key) for key, n in per_key.items()])
+
+
+def cache_get(conn, key):
+    """Cached rows (list of dicts) for key at the current generation, else None.
+
+    Read-only: the hit or miss is counted in memory (see cache_flush).
+    """
+    row = conn.execute("""
+        SELECT q.result FROM query_cache q
+        WHERE q.cache_key = ?
+          AND q.generation = (SELECT CAST(value AS INTEGER) FROM config WHERE key = 'generation')
+    """, (key,)).fetchone()
+    _cache_counters.count(conn, key, hit=row is not None)
+    return json.loads(row[0]) if row else None
+
+
+def cache_put(conn, key, rows, max_entries=QUERY_CACHE_MAX):
+    """Store rows at the current generation and evict least-recently-used entries.
+
+    Pending hit/miss counts ride along in the same transaction.
+    """
+    taken = _cache_counters.take(conn)
+    try:
+        if taken:
+            _write_cache_counters(conn, taken)
+        conn.execute("""
+            INSERT OR REPLACE INTO query_cache (cache_key, generation, result)
+            VALUES (?, (SELECT CAST(value AS INTEGER) FROM config WHERE key = 'generation'), ?)
+        """, (key, json.dumps(rows)))
+        conn.execute("""
+            DELETE FROM query_cache WHERE cache_key IN (
+                SELECT cache_key FROM query_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """, (max_entries,))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        _cache_counters.restore(conn, taken)
+        raise
+
+
+def cache_flush(conn):
+    """Write pending in-memory hit/miss counts; no-op (and no write) if none."""
+    taken = _cache_counters.take(conn)
+    if not taken:
+        return
+    try:
+        _write_cache_counters(conn, taken)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        _cache_counters.restore(conn, taken)
+        raise
+
+
+def cache_stats(conn):
+    """Generation, entry count and hit/miss counters for `stats`.
+
+    Counts include this process's hits/misses not yet flushed to the DB.
+    """
+    config = dict(conn.execute(
+        "SELECT key, value FROM config WHERE key IN ('generation', 'query_cache_hits', 'query_cache_misses')"
+    ).fetchall())
+    entries = conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+    pending_hits, pending_misses = _cache_counters.peek(conn)
+    hits = int(config.get("query_cache_hits", 0)) + pending_hits
+    misses = int(config.get("query_cache_misses", 0)) + pending_misses
+    return {
+        "generation": int(config.get("generation", 0)),
+        "entries": entries,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+    }
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Knowledge Brain — entity file parser.
+
+Used by: knowledge-brain.py (import)
+
+All patterns are compiled once at import. Each thing import needs comes
+from a single scan: the --- rule and the State block bounds via str.find,
+the title, all State **Key:** fields (one alternation instead of a search
+per key) and every "- [ ]" open thread. The title and thread scans start on
+a literal, so the regex engine skips ahead in C rather than trying the
+pattern at every position.
+
+parse_file() reads, hashes and parses one file and returns plain data, so
+import can fan files out over a process pool and keep the writes in one
+transaction in the parent.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+
+STATE_KEYS = ("Last Updated", "Status", "Relationship", "Priority", "Fit Score",
+              "Date Applied", "Applied Via", "Location", "Company", "Industry",
+              "Relationship Type")
+
+_COMMENT = re.compile(r"<!--[\s\S]*?-->\s*\n")
+_TITLE = re.compile(r"^#\s+(.+)$", re.MULTILINE)
+# Lookahead so matches may overlap: like the old per-key searches, a value
+# that runs on into another **Key:** (same line, or the next one when the
+# value is empty) still lets that key match too
+_FIELD = re.compile(r"(?=\*\*(" + "|".join(re.escape(k) for k in STATE_KEYS) + r"):\*\*\s*(.+))")
+_THREAD = re.compile(r"- \[ \]\s*(.*)")
+_TIMELINE_ENTRY = re.compile(r"-\s+\*\*(\d{4}-\d{2}-\d{2})\*\*\s*\|\s*([^\—]+)\s*[—\-]\s*(.+)")
+
+
+def _state_block(compiled_truth):
+    """Text after "## State" up to the first ###, --- or the end."""
+    start = compiled_truth.find("## State\n")
+    if start < 0:
+        return ""
+    start += len("## State\n")
+    ends = [e for e in (compiled_truth.find("###", start), compiled_truth.find("\n---", start)) if e >= 0]
+    return compiled_truth[start:min(ends, default=len(compiled_truth))]
+
+
+def parse_entity(content, stem=None):
+    """{"title", "compiled_truth", "timeline", "frontmatter"} for a file.
+
+    frontmatter holds the State fields (lower_snake keys, STATE_KEYS order;
+    the first occurrence of each key wins) and open_threads.
+    """
+    comment = _COMMENT.match(content)
+    body = content[comment.end():].strip() if comment else content
+
+    # The first --- rule separates compiled_truth from timeline
+    hr = body.find("\n---\n")
+    if hr >= 0:
+        compiled_truth = body[:hr].strip()
+        timeline = body[hr + len("\n---\n"):].strip()
+    else:
+        compiled_truth = body.strip()
+        timeline = ""
+
+    title = _TITLE.search(compiled_truth)
+
+    fields = {}
+    for m in _FIELD.finditer(_state_block(compiled_truth)):
+        fields.setdefault(m.group(1), m.group(2).strip())
+    frontmatter = {k.lower().replace(" ", "_"): fields[k] for k in STATE_KEYS if k in fields}
+    threads = _THREAD.findall(body)
+    if threads:
+        frontmatter["open_threads"] = threads
+
+    return {
+        "title": title.group(1) if title else (stem or "Unknown"),
+        "compiled_truth": compiled_truth,
+        "timeline": timeline,
+        "frontmatter": frontmatter,
+    }
+
+
+def timeline_entries(timeline):
+    """[(date, source, summary)] for "- **YYYY-MM-DD** | Source — Summary" lines."""
+    return [(m.group(1), m.group(2).strip(), m.group(3).strip())
+            for m in _TIMELINE_ENTRY.finditer(timeline)]
+
+
+def parse_file(job):
+    """Process-pool worker: (path, known_hash, force) → (path, content_hash, parsed).
+
+    parsed is None when the content hash matches known_hash (and not
+    force); otherwise parse_entity()'s dict plus "frontmatter_json" and the
+    timeline "entries".
+    """
+    path, known_hash, force = job
+    content = Path(path).read_text()
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    if not force and known_hash == content_hash:
+        return path, content_hash, None
+    parsed = parse_entity(content, Path(path).stem)
+    parsed["frontmatter_json"] = json.dumps(parsed["frontmatter"])
+    parsed["entries"] = timeline_entries(parsed["timeline"]) if parsed["timeline"] else []
+    return path, content_hash, parsed
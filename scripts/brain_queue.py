@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Knowledge Brain — write queue: durable spool + single group-committing writer.
+
+Used by: knowledge-brain.py (writer; import --queue),
+         knowledge-brain-ingest.py (--queue), knowledge-brain-link.py (--queue)
+
+Producers (cron ingest, link scripts, agents) don't open write transactions.
+They append write intents to a JSONL spool next to the DB (knowledge.db →
+knowledge.spool) under a short flock, fsync, and return: they never wait on
+SQLite's write lock. One writer (at most one per DB, held by flock on
+knowledge.spool.lock) drains the spool in grouped transactions of up to
+GROUP_MAX intents; the spool offset (config.spool_offset) commits in the
+same transaction as the writes it covers. Under load each transaction
+simply carries more intents, so N producers cost one commit per group, not
+N commits and N lock retries. Once caught up, the writer truncates the
+spool while holding the producers' lock.
+
+Intents, one JSON object per line. A page REF is an existing slug
+("people/lee-abrahams") or {"title", "type", "slug", "frontmatter"}, found
+or created the way ingest always has (find_or_create_page):
+  {"op": "page", "page": REF}
+  {"op": "timeline", "page": REF, "date", "source", "summary", "detail",
+   "max": ["last_updated", ...]}   frontmatter keys raised to the latest
+                                     inserted entry's date
+  {"op": "link", "from": REF, "to": REF, "context", "bidirectional": true}
+  {"op": "frontmatter", "page": REF, "key", "value"}   raised for
+                                     MONOTONIC_DATE_KEYS, else overwritten
+                                     ("frontmatter_max" is an alias)
+  {"op": "config", "key", "value"}
+  {"op": "log", "source_type", "source_ref", "summary", "pages_updated", "id"}
+Callers can add ops (knowledge-brain.py adds "entity_file"). Every op is
+idempotent, so recovery errs towards replaying a group, never skipping one:
+timeline rows and links hit UNIQUE indexes, pages resolve by slug, maxima
+and config values converge, and enqueue() stamps each log intent with an id
+that ingest_log.intent_id records once.
+
+A group that fails for any reason other than a busy/locked DB is rolled
+back and retried one intent at a time (each under a SAVEPOINT); intents that
+still fail are appended to knowledge.spool.rejected with the error, and the
+offset moves past them instead of retrying the group forever.
+"""
+import fcntl
+import json
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+
+import brain_db
+from brain_db import FrontmatterDeltas, PageResolver, find_or_create_page, insert_links, insert_timeline_entries
+
+GROUP_MAX = 1000         # intents per write transaction
+FLUSH_INTERVAL = 0.2     # writer: seconds between spool checks when idle
+
+
+def spool_path(db_path):
+    """Intent spool for a brain DB (knowledge.db → knowledge.spool)."""
+    return Path(db_path).with_suffix(".spool")
+
+
+def _lock_path(db_path):
+    return Path(db_path).with_suffix(".spool.lock")
+
+
+def rejected_path(db_path):
+    """Quarantine for intents the writer could not apply (knowledge.spool.rejected)."""
+    return Path(db_path).with_suffix(".spool.rejected")
+
+
+def enqueue(db_path, intents, sync=True):
+    """Append intents to db_path's spool in one locked write; returns how many.
+
+    Blocks only on other producers' appends (microseconds), never on the DB.
+    Log intents without an id get one, so replaying them logs them once.
+    A partial last line (a producer died mid-write) is terminated first, so
+    it is skipped as one bad line instead of swallowing the first new intent.
+    """
+    intents = [{**i, "id": uuid.uuid4().hex} if i.get("op") == "log" and not i.get("id") else i
+               for i in intents]
+    data = b"".join(json.dumps(i, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+                    for i in intents)
+    if not data:
+        return 0
+    count = len(intents)
+    fd = os.open(spool_path(db_path), os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            data = b"\n" + data
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        if sync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)   # releases the lock
+    return count
+
+
+def _offset(conn):
+    row = conn.execute("SELECT value FROM config WHERE key = 'spool_offset'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def _set_offset(conn, offset):
+    conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('spool_offset', ?)", (str(offset),))
+
+
+def pending_bytes(conn, db_path):
+    """Spool bytes not yet applied to the DB."""
+    path = spool_path(db_path)
+    size = path.stat().st_size if path.exists() else 0
+    return max(size - _offset(conn), 0)
+
+
+LAST_TIMELINE_ID_SQL = "SELECT COALESCE(MAX(id), 0) FROM timeline_entries"
+NEW_TIMELINE_DATES_SQL = "SELECT page_id, MAX(date) FROM timeline_entries WHERE id > ? GROUP BY page_id"
+
+
+class Applier:
+    """Applies intents through one cursor; flush() writes the batched rows.
+
+    Page refs resolve as they arrive (creating pages as needed) through a
+    PageResolver, which drain() loads once and shares across its Appliers;
+    pages a handler writes itself are registered with page_written().
+    Timeline rows, links and frontmatter values are collected and written in
+    bulk at flush(), like ingest's per-chunk writes. Nothing commits here.
+    """
+
+    def __init__(self, cursor, handlers=None, resolver=None):
+        self.cursor = cursor
+        self.handlers = {**OPS, **(handlers or {})}
+        self._resolver = resolver
+        self._timeline = {}     # page id → [(page_id, date, source, summary, detail)]
+        self._max_keys = {}     # page id → frontmatter keys raised by its new entries
+        self._links = []
+        self._config = {}
+        self._logs = []
+        self.deltas = FrontmatterDeltas()
+        self.stats = {"intents": 0, "timeline": 0, "timeline_skipped": 0,
+                      "links": 0, "links_skipped": 0, "bad": 0, "rejected": 0, "missing": set()}
+
+    @property
+    def resolver(self):
+        if self._resolver is None:
+            self._resolver = PageResolver(self.cursor)
+        return self._resolver
+
+    def page_written(self, page_id, slug, page_type, title):
+        """Register a page a handler inserted or retitled with its own SQL."""
+        self.resolver.add(page_id, slug, page_type, title)
+
+    def page(self, ref):
+        """Page id for a REF; None (and noted as missing) for an unknown slug."""
+        if isinstance(ref, str):
+            page_id = self.resolver.slug_id(ref)
+            if page_id is None:
+                self.stats["missing"].add(ref)
+            return page_id
+        return find_or_create_page(self.cursor, ref["title"], ref["type"], ref.get("slug") or "",
+                                   frontmatter=ref.get("frontmatter"), resolver=self.resolver)
+
+    def apply(self, intent):
+        self.stats["intents"] += 1
+        try:
+            self.handlers[intent["op"]](self, intent)
+        except (KeyError, TypeError, ValueError, AttributeError, sqlite3.IntegrityError) as e:
+            self.stats["bad"] += 1
+            print(f"  Warning: skipping intent {json.dumps(intent, default=str)[:120]}: {e!r}")
+
+    def flush(self):
+        """Write collected rows (still uncommitted)."""
+        last_id = self.cursor.execute(LAST_TIMELINE_ID_SQL).fetchone()[0] if self._max_keys else 0
+        for page_id, rows in self._timeline.items():
+            inserted, dupes = insert_timeline_entries(self.cursor, rows)
+            self.stats["timeline"] += inserted
+            self.stats["timeline_skipped"] += dupes
+        if self._max_keys:
+            # AUTOINCREMENT ids: rows past last_id are exactly the ones just
+            # inserted, so duplicates the UNIQUE index dropped raise nothing
+            for page_id, latest in self.cursor.execute(NEW_TIMELINE_DATES_SQL, (last_id,)).fetchall():
+                for key in self._max_keys.get(page_id, ()):
+                    self.deltas.set(page_id, key, latest)
+        inserted, skipped = insert_links(self.cursor, self._links)
+        self.stats["links"] += inserted
+        self.stats["links_skipped"] += skipped
+        self.deltas.flush(self.cursor)
+        self.cursor.executemany("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)",
+                                self._config.items())
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO ingest_log (source_type, source_ref, pages_updated, summary, intent_id) "
+            "VALUES (?, ?, ?, ?, ?)", self._logs)
+        self._timeline, self._max_keys, self._links, self._config, self._logs = {}, {}, [], {}, []
+
+
+def _op_page(applier, intent):
+    applier.page(intent["page"])
+
+
+def _op_timeline(applier, intent):
+    page_id = applier.page(intent["page"])
+    if page_id is None:
+        return
+    applier._timeline.setdefault(page_id, []).append(
+        (page_id, str(intent["date"]), intent.get("source") or "", str(intent["summary"]),
+         intent.get("detail") or ""))
+    if intent.get("max"):
+        applier._max_keys.setdefault(page_id, set()).update(intent["max"])
+
+
+def _op_link(applier, intent):
+    from_id, to_id = applier.page(intent["from"]), applier.page(intent["to"])
+    if from_id is None or to_id is None:
+        return
+    context = intent.get("context") or ""
+    applier._links.append((from_id, to_id, context))
+    if intent.get("bidirectional", True):
+        applier._links.append((to_id, from_id, context))
+
+
+def _op_frontmatter(applier, intent):
+    page_id = applier.page(intent["page"])
+    if page_id is not None:
+        applier.deltas.set(page_id, intent["key"], intent["value"])
+
+
+def _op_config(applier, intent):
+    applier._config[intent["key"]] = str(intent["value"])
+
+
+def _op_log(applier, intent):
+    applier._logs.append((str(intent["source_type"]), intent.get("source_ref") or "",
+                          json.dumps(intent.get("pages_updated") or []), intent.get("summary") or "",
+                          intent.get("id")))
+
+
+OPS = {
+    "page": _op_page,
+    "timeline": _op_timeline,
+    "link": _op_link,
+    "frontmatter": _op_frontmatter,
+    "frontmatter_max": _op_frontmatter,
+    "config": _op_config,
+    "log": _op_log,
+}
+
+
+def _read_groups(path, offset, group_max):
+    """Yield ([intent], end_offset) from complete spool lines after offset."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        start, group = offset, []
+        for line in f:
+            if not line.endswith(b"\n"):
+                break   # a producer's write in progress
+            offset += len(line)
+            if line.strip():
+                try:
+                    group.append(json.loads(line))
+                except ValueError as e:
+                    print(f"  Warning: skipping spool line before byte {offset}: {e}")
+            if len(group) >= group_max:
+                yield group, offset
+                start, group = offset, []
+        if group or offset != start:
+            yield group, offset
+
+
+def _truncate_if_drained(conn, path, offset):
+    """Empty the spool if nothing arrived past offset (under the producers' lock).
+
+    The offset reset commits before the truncate: a crash in between
+    replays the spool (idempotent) rather than skipping new appends.
+    """
+    with open(path, "rb+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        if os.fstat(f.fileno()).st_size != offset:
+            return False
+        _set_offset(conn, 0)
+        conn.commit()
+        f.truncate(0)
+    return True
+
+
+def _reject(db_path, intent, error):
+    """Append an unappliable intent and its error to the rejected file."""
+    line = json.dumps({"at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                       "error": f"{type(error).__name__}: {error}", "intent": intent},
+                      separators=(",", ":"), default=str)
+    with open(rejected_path(db_path), "a") as f:
+        f.write(line + "\n")
+    print(f"  Warning: rejected intent {json.dumps(intent, default=str)[:120]}: {error!r}")
+
+
+def _apply_one_by_one(conn, db_path, group, handlers, stats):
+    """Re-apply a failed group intent by intent; quarantine the ones that fail.
+
+    Each intent is applied and flushed under its own SAVEPOINT. A failure
+    rolls back to it and starts a fresh Applier and PageResolver, since the
+    old ones may hold pages from the rolled-back work. A busy DB still
+    raises. Returns the resolver in use at the end.
+    """
+    applier = Applier(conn.cursor(), handlers, PageResolver(conn.cursor()))
+    applier.stats = stats
+    conn.execute("BEGIN")   # savepoints nest in it; the caller commits with the offset
+    for intent in group:
+        conn.execute("SAVEPOINT intent")
+        try:
+            applier.apply(intent)
+            applier.flush()
+            conn.execute("RELEASE intent")
+        except sqlite3.OperationalError:
+            raise
+        except Exception as e:
+            conn.execute("ROLLBACK TO intent")
+            conn.execute("RELEASE intent")
+            stats["rejected"] += 1
+            _reject(db_path, intent, e)
+            applier = Applier(conn.cursor(), handlers, PageResolver(conn.cursor()))
+            applier.stats = stats
+    return applier.resolver
+
+
+class _SharedResolver:
+    """A PageResolver kept across drains, reloaded when another connection writes.
+
+    PRAGMA data_version only changes on commits from other connections, so
+    the writer's own pages (already add()ed) don't force a reload.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._resolver = None
+        self._version = None
+
+    def get(self):
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._resolver is None or version != self._version:
+            self._resolver = PageResolver(self.conn.cursor())
+            self._version = version
+        return self._resolver
+
+    def replace(self, resolver):
+        """Use resolver from now on (None: reload on the next get())."""
+        self._resolver = resolver
+
+
+def drain(conn, db_path, handlers=None, group_max=GROUP_MAX, resolvers=None):
+    """Apply every complete intent in the spool, GROUP_MAX per transaction.
+
+    Returns the Applier's stats plus "groups". A locked DB raises
+    sqlite3.OperationalError after rolling back; the spool offset only moves
+    with committed groups, so the next drain picks up where this one stopped.
+    Any other failure rolls the group back and retries it intent by intent
+    (_apply_one_by_one), so one bad intent can't stall the queue.
+
+    Slugs resolve through one PageResolver for the whole drain (resolvers:
+    the writer's _SharedResolver, kept across drains), checked against
+    other connections' commits before each group.
+    """
+    path = spool_path(db_path)
+    resolvers = resolvers or _SharedResolver(conn)
+    applier = Applier(conn.cursor(), handlers, resolvers.get())
+    applier.stats["groups"] = 0
+    if not path.exists():
+        return applier.stats
+
+    offset = _offset(conn)
+    if offset > path.stat().st_size:
+        print(f"  Spool shrank (offset {offset}); re-reading from the start")
+        offset = 0
+    try:
+        for group, end_offset in _read_groups(path, offset, group_max):
+            before = {k: set(v) if isinstance(v, set) else v for k, v in applier.stats.items()}
+            applier._resolver = resolvers.get()
+            try:
+                for intent in group:
+                    applier.apply(intent)
+                applier.flush()
+            except sqlite3.OperationalError:
+                raise
+            except Exception as e:
+                conn.rollback()
+                print(f"  Warning: group of {len(group)} failed ({e!r}); retrying intent by intent")
+                # The group's resolver may hold rolled-back pages
+                resolvers.replace(_apply_one_by_one(conn, db_path, group, handlers, before))
+                applier = Applier(conn.cursor(), handlers, resolvers.get())
+                applier.stats = before
+            _set_offset(conn, end_offset)
+            conn.commit()
+            offset = end_offset
+            applier.stats["groups"] += bool(group)
+        if offset:
+            _truncate_if_drained(conn, path, offset)
+    except sqlite3.OperationalError:
+        conn.rollback()
+        resolvers.replace(None)
+        raise
+    return applier.stats
+
+
+def _report(stats):
+    parts = [f"{stats['intents']} intent(s) in {stats['groups']} transaction(s)"]
+    parts += [f"{n} {k.replace('_', ' ')}" for k, n in stats.items()
+              if k not in ("intents", "groups", "missing") and n]
+    line = ", ".join(parts)
+    if stats["missing"]:
+        line += f"; missing slugs: {', '.join(sorted(stats['missing']))}"
+    return line
+
+
+def _run_idle(on_idle, conn):
+    """Run the writer's on_idle hook; False (retry later) if the DB was busy."""
+    if on_idle is None:
+        return True
+    try:
+        on_idle(conn)
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        print(f"  Warning: index upkeep failed: {e}; retrying when idle")
+        return False
+    return True
+
+
+def run_writer(db_path, handlers=None, interval=FLUSH_INTERVAL, once=False, on_idle=None):
+    """Be db_path's writer: drain the spool every interval seconds until stopped.
+
+    once=True drains what is there and returns (cron). on_idle(conn) runs
+    whenever the writer has caught up after applying intents (derived-index
+    upkeep), not after every group. Returns 1 if another writer already
+    holds the lock, else 0.
+    """
+    lock = open(_lock_path(db_path), "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        print(f"ERROR: another writer is draining {spool_path(db_path)}")
+        return 1
+
+    conn = brain_db.get_db(db_path)
+    path = spool_path(db_path)
+    if not once:
+        print(f"✍️  Writer on {path} (groups of {GROUP_MAX}, checking every {interval}s)")
+    applied = False
+    resolvers = _SharedResolver(conn)
+    try:
+        while True:
+            stats = None
+            size = path.stat().st_size if path.exists() else 0
+            if size and size != _offset(conn):
+                try:
+                    stats = drain(conn, db_path, handlers, resolvers=resolvers)
+                except sqlite3.OperationalError as e:
+                    print(f"  Warning: {e}; {'giving up' if once else 'retrying'}")
+            if stats and stats["intents"]:
+                applied = True
+            if once:
+                print(f"✅ Writer: {_report(stats)}" if stats else "✅ Writer: spool empty, nothing to apply")
+                if applied:
+                    _run_idle(on_idle, conn)
+                break
+            if stats and stats["intents"]:
+                print(f"  [{time.strftime('%H:%M:%S')}] {_report(stats)}")
+                continue   # more may have arrived while this drain ran
+            if applied:
+                applied = not _run_idle(on_idle, conn)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n👋 Writer stopped.")
+    finally:
+        conn.close()
+        lock.close()
+    return 0
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Knowledge Brain — resident query server and its client.
+
+Used by: knowledge-brain.py (serve; get/search/query/list/stats go through
+         the server when one is up), knowledge-brain-briefing.py
+
+A long-running process keeps warm pooled connections (with sqlite3's
+per-connection prepared-statement cache and a hot page cache) and answers
+over a Unix socket next to the DB (knowledge.db → knowledge.sock, mode
+0600). Each client connection gets its own thread, so readers run
+concurrently under WAL.
+
+Protocol: one JSON object per line each way.
+  → {"op": "search", "args": {"query": "Proximie", "limit": 5}}
+  ← {"ok": true, "result": [...], "output": "<what the CLI would print>"}
+  ← {"ok": false, "error": "KeyError: 'slug'"}
+Several requests may share a connection. The server captures each
+request's printed output per thread, so a CLI call routed through it prints
+exactly what a local run would.
+"""
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import brain_db
+
+CLIENT_TIMEOUT = 30.0
+SERVER_POOL_IDLE = 16
+CACHE_FLUSH_INTERVAL = 30.0   # seconds between writes of query-cache hit counts
+
+
+def socket_path(db_path):
+    """Server socket for a brain DB (knowledge.db → knowledge.sock)."""
+    return Path(db_path).with_suffix(".sock")
+
+
+def _json_default(value):
+    if isinstance(value, sqlite3.Row):
+        return dict(value)
+    return str(value)
+
+
+class _ThreadStdout(io.TextIOBase):
+    """sys.stdout stand-in: threads with a capture buffer write there."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        buffer = getattr(self.local, "buffer", None)
+        (buffer or self.stream).flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                response = self.server.dispatch(line)
+                self.wfile.write(json.dumps(response, default=_json_default).encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+
+class BrainServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix-socket server dispatching ops to handler callables."""
+
+    daemon_threads = True
+    request_queue_size = 128   # listen backlog: bursts of agents connecting at once
+
+    def __init__(self, path, handlers, stdout):
+        self.handlers = handlers
+        self.stdout = stdout
+        super().__init__(str(path), _Handler)
+
+    def dispatch(self, line):
+        try:
+            request = json.loads(line)
+            handler = self.handlers[request["op"]]
+            args = {k: tuple(v) if isinstance(v, list) else v
+                    for k, v in (request.get("args") or {}).items()}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return {"ok": False, "error": f"bad request: {e!r}"}
+
+        self.stdout.local.buffer = output = io.StringIO()
+        try:
+            result = handler(**args)
+            return {"ok": True, "result": result, "output": output.getvalue()}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}", "output": output.getvalue()}
+        finally:
+            self.stdout.local.buffer = None
+
+
+def _flush_cache_counters(pool):
+    """Write the query cache's in-memory hit/miss counts (brain_db.cache_flush)."""
+    conn = pool.acquire()
+    try:
+        brain_db.cache_flush(conn)
+    except sqlite3.Error as e:
+        print(f"⚠️  Query cache counters not flushed: {e}")
+    finally:
+        conn.close()
+
+
+def _flush_cache_periodically(pool, stop):
+    while not stop.wait(CACHE_FLUSH_INTERVAL):
+        _flush_cache_counters(pool)
+
+
+def serve(db_path, handlers):
+    """Serve handlers ({op: callable(**args)}) on db_path's socket until stopped."""
+    path = socket_path(db_path)
+    if path.exists():
+        if request(db_path, "ping") is not None:
+            print(f"ERROR: a brain server is already listening on {path}")
+            return 1
+        path.unlink()   # stale socket from a server that died
+
+    handlers = {"ping": lambda: "pong", **handlers}
+    stdout = _ThreadStdout(sys.stdout)
+    sys.stdout = stdout
+
+    # Warm up: open connections, load the schema and the first pages
+    pool = brain_db.get_pool(db_path)
+    pool.max_idle = SERVER_POOL_IDLE
+    conn = pool.acquire()
+    conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+    conn.close()
+
+    server = BrainServer(path, handlers, stdout)
+    os.chmod(path, 0o600)
+    # Cache hits are read-only; their counters are written here in batches
+    stop_flushing = threading.Event()
+    threading.Thread(target=_flush_cache_periodically, args=(pool, stop_flushing), daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"🧠 Brain server on {path} ({', '.join(sorted(handlers))})")
+    stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_flushing.set()
+        server.server_close()
+        _flush_cache_counters(pool)
+        if path.exists():
+            path.unlink()
+        sys.stdout = stdout.stream
+        print("\n👋 Brain server stopped.")
+    return 0
+
+
+def request(db_path, op, args=None, timeout=CLIENT_TIMEOUT):
+    """Send one request to db_path's server; None when no server answers."""
+    path = socket_path(db_path)
+    if not path.exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.sendall(json.dumps({"op": op, "args": args or {}}).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reply:
+                line = reply.readline()
+    except OSError:
+        return None
+    return json.loads(line) if line else None
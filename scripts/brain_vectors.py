@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Knowledge Brain — local vector index over page sections.
+
+Used by: knowledge-brain.py (query --rank vector|hybrid, vectors, import,
+         watch, writer), knowledge-brain-ingest.py
+
+Offline, no model download: each section (## heading block, plus the
+timeline) becomes a hashed TF-IDF vector. Features are words and character
+trigrams (so "HealthTech" still meets "health tech"), signed-hashed into
+VECTOR_DIM buckets, weighted by sublinear tf × idf and L2-normalized.
+
+Storage:
+  knowledge.vectors   raw float32 matrix, one VECTOR_DIM row per section,
+                      next to knowledge.db and read through mmap
+  vector_rows         matrix row → (page_id, section, content_hash);
+                      page_id NULL marks a free row
+  vector_idf          idf per bucket, frozen at the last full build
+  vector_dirty        pages changed since the last sync (filled by triggers)
+
+sync() re-embeds only dirty pages and writes just their rows; a full
+rebuild (fresh idf) happens when the index is empty or a quarter of it has
+changed since the last build. sync runs on the write side (vectors, import,
+watch, ingest, the queue writer) under an flock on knowledge.vectors.lock;
+queries use the index as it is and never write. Queries are sparse (a few
+dozen buckets), so top-k gathers only those matrix columns: NumPy when
+available, else a pure-Python pass over the mmap.
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import re
+import zlib
+from array import array
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+VECTOR_DIM = 1024
+REBUILD_FRACTION = 0.25
+TRIGRAM_WEIGHT = 0.5
+ROW_BYTES = VECTOR_DIM * 4
+
+
+def vector_path(db_path):
+    """Sidecar matrix file for a brain DB (knowledge.db → knowledge.vectors)."""
+    return Path(db_path).with_suffix(".vectors")
+
+
+def page_sections(title, compiled_truth, timeline):
+    """[(section_name, text)] for a page: intro, each ## section, timeline."""
+    sections = []
+    name, lines = "", []
+    for line in (compiled_truth or "").splitlines():
+        if line.startswith("## "):
+            sections.append((name, "\n".join(lines)))
+            name, lines = line[3:].strip(), []
+        else:
+            lines.append(line)
+    sections.append((name, "\n".join(lines)))
+    if timeline and timeline.strip():
+        sections.append(("timeline", timeline))
+
+    result, seen = [], {}
+    for name, text in sections:
+        if not text.strip() and name:
+            continue
+        seen[name] = seen.get(name, 0) + 1
+        key = name if seen[name] == 1 else f"{name} #{seen[name]}"
+        # Title and heading give every section its page context
+        result.append((key, f"{title}\n{name}\n{text}"))
+    return result
+
+
+@lru_cache(maxsize=1 << 18)
+def _word_features(word):
+    """((bucket, signed weight), ...) for a word and its trigrams.
+
+    crc32 rather than hash() so buckets are stable across processes.
+    """
+    grams = [(word, 1.0)]
+    if len(word) > 3:
+        padded = f"<{word}>"
+        grams += [(padded[i:i + 3], TRIGRAM_WEIGHT) for i in range(len(padded) - 2)]
+    features = []
+    for gram, weight in grams:
+        h = zlib.crc32(gram.encode("utf-8"))
+        features.append((h % VECTOR_DIM, weight if h & 0x80000000 else -weight))
+    return tuple(features)
+
+
+def terms(text):
+    """Lowercased words a text's vector is built from (order is irrelevant)."""
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _features(text):
+    """{bucket: signed weight} of raw term counts for text."""
+    counts = {}
+    for word, n in Counter(terms(text)).items():
+        for bucket, weight in _word_features(word):
+            counts[bucket] = counts.get(bucket, 0.0) + weight * n
+    return counts
+
+
+def _weigh(counts, idf):
+    """Sublinear tf × idf, L2-normalized; sparse {bucket: value}."""
+    vec = {}
+    for bucket, c in counts.items():
+        if c:
+            tf = 1.0 + math.log(abs(c)) if abs(c) >= 1 else abs(c)
+            vec[bucket] = math.copysign(tf, c) * idf.get(bucket, 1.0)
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    return {b: v / norm for b, v in vec.items()} if norm else {}
+
+
+def _dense(vec):
+    row = array("f", bytes(ROW_BYTES))
+    for bucket, value in vec.items():
+        row[bucket] = value
+    return row
+
+
+def _content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _config_int(conn, key):
+    row = conn.execute("SELECT value FROM config WHERE key = ?", (key,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _set_config(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def _bump_generation(conn):
+    """New vectors change vector/hybrid results: invalidate the query cache."""
+    conn.execute("UPDATE config SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+
+
+def _lock(db_path):
+    """Exclusive flock serializing index writers; closing the file releases it."""
+    lock = open(Path(db_path).with_suffix(".vectors.lock"), "a")
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def _build_path(db_path, build):
+    return Path(db_path).with_suffix(f".vectors.{build}.tmp")
+
+
+def _recover(conn, db_path):
+    """Finish or discard a rebuild interrupted between its commit and replace."""
+    build = _config_int(conn, "vector_build")
+    db = Path(db_path)
+    for tmp in db.parent.glob(f"{db.stem}.vectors.*.tmp"):
+        if tmp == _build_path(db_path, build):
+            os.replace(tmp, vector_path(db_path))   # committed: the DB already describes it
+        else:
+            tmp.unlink()
+
+    # Rows a crashed sync wrote past the committed mapping or into free rows
+    path = vector_path(db_path)
+    if not path.exists() or not _config_int(conn, "vector_rows_unclean"):
+        return
+    used = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vector_rows").fetchone()[0]
+    stale = [r[0] for r in conn.execute("SELECT row FROM vector_rows WHERE page_id IS NULL")]
+    stale += range(used, path.stat().st_size // ROW_BYTES)
+    with open(path, "r+b") as f:
+        for row in stale:
+            f.seek(row * ROW_BYTES)
+            f.write(bytes(ROW_BYTES))
+    _set_config(conn, "vector_rows_unclean", 0)
+    conn.commit()
+
+
+def _rebuild(conn, db_path):
+    """Re-embed every page with fresh idf into a new matrix (caller holds _lock).
+
+    The matrix is written to a build-numbered temp file, the DB side commits,
+    then the file replaces the old one; _recover completes a replace that a
+    crash cut off. Readers keep their mmap of the old file until they reopen;
+    one landing between the commit and the replace ranks a single query
+    against the previous matrix.
+    """
+    rows = []
+    for page_id, title, truth, timeline in conn.execute(
+            "SELECT id, title, compiled_truth, timeline FROM pages ORDER BY id"):
+        for section, text in page_sections(title, truth, timeline):
+            rows.append((page_id, section, _content_hash(text), _features(text)))
+
+    df = {}
+    for *_, counts in rows:
+        for bucket in counts:
+            df[bucket] = df.get(bucket, 0) + 1
+    n = len(rows)
+    idf = {b: math.log((n + 1) / (d + 1)) + 1.0 for b, d in df.items()}
+
+    build = _config_int(conn, "vector_build") + 1
+    tmp = _build_path(db_path, build)
+    with open(tmp, "wb") as f:
+        for *_, counts in rows:
+            f.write(_dense(_weigh(counts, idf)).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    try:
+        conn.execute("DELETE FROM vector_rows")
+        conn.executemany("INSERT INTO vector_rows (row, page_id, section, content_hash) VALUES (?, ?, ?, ?)",
+                         [(i, page_id, section, h) for i, (page_id, section, h, _) in enumerate(rows)])
+        conn.execute("DELETE FROM vector_idf")
+        conn.executemany("INSERT INTO vector_idf (bucket, idf) VALUES (?, ?)", idf.items())
+        conn.execute("DELETE FROM vector_dirty")
+        _set_config(conn, "vector_rows_built", n)
+        _set_config(conn, "vector_rows_changed", 0)
+        _set_config(conn, "vector_rows_unclean", 0)
+        _set_config(conn, "vector_build", build)
+        _bump_generation(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        tmp.unlink()
+        raise
+    os.replace(tmp, vector_path(db_path))
+    return n
+
+
+def rebuild(conn, db_path):
+    """Re-embed every page with fresh idf and rewrite the matrix."""
+    with _lock(db_path):
+        _recover(conn, db_path)
+        return _rebuild(conn, db_path)
+
+
+def sync(conn, db_path, force=False):
+    """Bring the vector index up to date; returns sections (re)embedded.
+
+    A write-side operation (vectors, import, watch, ingest, the queue
+    writer): queries only read the index. Writers are serialized by an
+    flock on the sidecar. Changed sections are written copy-on-write into
+    free or appended rows, never over rows the committed mapping still
+    points at; the old rows are freed and zeroed only after the commit.
+    """
+    with _lock(db_path):
+        _recover(conn, db_path)
+        path = vector_path(db_path)
+        built = _config_int(conn, "vector_rows_built")
+        changed = _config_int(conn, "vector_rows_changed")
+        if force or not built or not path.exists() or changed > built * REBUILD_FRACTION:
+            return _rebuild(conn, db_path)
+        dirty = [r[0] for r in conn.execute("SELECT page_id FROM vector_dirty")]
+        if not dirty:
+            return 0
+
+        idf = dict(conn.execute("SELECT bucket, idf FROM vector_idf"))
+        free = [r[0] for r in conn.execute("SELECT row FROM vector_rows WHERE page_id IS NULL ORDER BY row")]
+        next_row = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vector_rows").fetchone()[0]
+        # Until the final commit, the file holds rows the DB doesn't describe
+        _set_config(conn, "vector_rows_unclean", 1)
+        conn.commit()
+
+        released = []
+        embedded = 0
+        try:
+            with open(path, "r+b") as f:
+                for page_id in dirty:
+                    page = conn.execute("SELECT title, compiled_truth, timeline FROM pages WHERE id = ?",
+                                        (page_id,)).fetchone()
+                    sections = dict(page_sections(*page)) if page else {}
+                    existing = {section: (row, h) for row, section, h in conn.execute(
+                        "SELECT row, section, content_hash FROM vector_rows WHERE page_id = ?", (page_id,))}
+
+                    for section, (row, h) in existing.items():
+                        if section in sections and _content_hash(sections[section]) == h:
+                            continue
+                        conn.execute("UPDATE vector_rows SET page_id = NULL, section = NULL, content_hash = NULL "
+                                     "WHERE row = ?", (row,))
+                        released.append(row)
+
+                    for section, text in sections.items():
+                        h = _content_hash(text)
+                        if section in existing and existing[section][1] == h:
+                            continue
+                        if free:
+                            row = free.pop(0)
+                        else:
+                            row, next_row = next_row, next_row + 1
+                        f.seek(row * ROW_BYTES)
+                        f.write(_dense(_weigh(_features(text), idf)).tobytes())
+                        conn.execute("INSERT OR REPLACE INTO vector_rows (row, page_id, section, content_hash) "
+                                     "VALUES (?, ?, ?, ?)", (row, page_id, section, h))
+                        embedded += 1
+                f.flush()
+                os.fsync(f.fileno())
+
+                conn.execute(f"DELETE FROM vector_dirty WHERE page_id IN ({','.join('?' * len(dirty))})", dirty)
+                _set_config(conn, "vector_rows_changed", changed + embedded)
+                if embedded:
+                    _bump_generation(conn)
+                conn.commit()
+
+                # Rows the committed mapping no longer uses: zero them so they can't crowd top-k
+                for row in released:
+                    f.seek(row * ROW_BYTES)
+                    f.write(bytes(ROW_BYTES))
+        except BaseException:
+            conn.rollback()
+            raise
+        _set_config(conn, "vector_rows_unclean", 0)
+        conn.commit()
+        return embedded
+
+
+def refresh(conn, db_path):
+    """sync() if this brain has a vector index; 0 (no build) otherwise.
+
+    Write paths call this so an index built with `vectors` stays current
+    without making every import pay for building one nobody queries.
+    """
+    if not _config_int(conn, "vector_rows_built") or not vector_path(db_path).exists():
+        return 0
+    return sync(conn, db_path)
+
+
+def top_k(conn, db_path, text, k=20):
+    """Best sections for text: [(page_id, section, cosine)], highest first."""
+    idf = dict(conn.execute("SELECT bucket, idf FROM vector_idf"))
+    query = _weigh(_features(text), idf)
+    path = vector_path(db_path)
+    if not query or not path.exists() or not path.stat().st_size:
+        return []
+    buckets = list(query)
+    weights = [query[b] for b in buckets]
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if np is not None:
+            matrix = np.frombuffer(mm, dtype=np.float32).reshape(-1, VECTOR_DIM)
+            scores = matrix[:, buckets] @ np.asarray(weights, dtype=np.float32)
+            k_eff = min(k, len(scores))
+            best = np.argpartition(-scores, k_eff - 1)[:k_eff]
+            hits = [(int(i), float(scores[i])) for i in best]
+            del matrix, scores
+        else:
+            values = memoryview(mm).cast("f")
+            pairs = list(zip(buckets, weights))
+            scores = []
+            for row in range(len(values) // VECTOR_DIM):
+                base = row * VECTOR_DIM
+                scores.append((sum(values[base + b] * w for b, w in pairs), row))
+            values.release()
+            hits = [(row, score) for score, row in sorted(scores, reverse=True)[:k]]
+
+    hits = [(row, score) for row, score in hits if score > 0]
+    if not hits:
+        return []
+    placeholders = ",".join("?" * len(hits))
+    owners = {row: (page_id, section) for row, page_id, section in conn.execute(
+        f"SELECT row, page_id, section FROM vector_rows WHERE row IN ({placeholders}) AND page_id IS NOT NULL",
+        [row for row, _ in hits])}
+    results = [(*owners[row], score) for row, score in hits if row in owners]
+    results.sort(key=lambda r: r[2], reverse=True)
+    return results
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Knowledge Brain — filesystem watcher for memory/entities.
+
+Used by: knowledge-brain.py (watch)
+
+Watches a root directory and its immediate subdirectories (the entity type
+dirs) and yields debounced batches of touched paths, relative to the root:
+  - Linux: inotify through ctypes (no extra package); a new subdirectory is
+    picked up as it appears, and a queue overflow asks for a full rescan
+  - elsewhere, or with poll=True: a stat snapshot every poll_interval
+    seconds, diffed against the last one
+
+A batch is emitted once events have been quiet for `debounce` seconds, or
+`max_delay` seconds after its first event during a steady stream, so an
+editor's save burst becomes one batch and a bulk copy is split into chunks.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+FILE_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT = struct.Struct("iIII")   # wd, mask, cookie, len (then len bytes of name)
+
+DEBOUNCE = 0.5
+MAX_DELAY = 5.0
+POLL_INTERVAL = 2.0
+
+
+def _libc_inotify():
+    """libc with inotify symbols, or None (non-Linux, no libc found)."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    except (OSError, TypeError):
+        return None
+    return libc if hasattr(libc, "inotify_init1") and hasattr(libc, "inotify_add_watch") else None
+
+
+class InotifySource:
+    """inotify watches on root and each subdirectory."""
+
+    def __init__(self, root, libc):
+        self.root = Path(root)
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}   # wd → subdirectory name ("" for root)
+        self._add(self.root, "")
+        for entry in os.scandir(self.root):
+            if entry.is_dir():
+                self._add(Path(entry.path), entry.name)
+
+    def _add(self, path, name):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), FILE_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self._dirs[wd] = name
+
+    def read(self, timeout):
+        """(touched relative paths, rescan) seen within timeout seconds."""
+        touched, rescan = set(), False
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return touched, rescan
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return touched, rescan
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, offset)
+            name = buf[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0").decode(
+                "utf-8", "surrogateescape")
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+                continue
+            subdir = self._dirs.get(wd)
+            if subdir is None:
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+            elif subdir == "":
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # New type dir: watch it, and report what it already holds
+                    try:
+                        self._add(self.root / name, name)
+                        touched.update(f"{name}/{f}" for f in os.listdir(self.root / name))
+                    except FileNotFoundError:
+                        rescan = True   # gone again before we got to it
+                elif mask & IN_ISDIR and mask & (IN_DELETE | IN_MOVED_FROM):
+                    rescan = True
+            elif name and not mask & IN_ISDIR:
+                touched.add(f"{subdir}/{name}")
+        return touched, rescan
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Stat snapshot of root/*/* every interval seconds."""
+
+    def __init__(self, root, interval=POLL_INTERVAL):
+        self.root = Path(root)
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next = time.monotonic() + interval
+
+    def _scan(self):
+        snapshot = {}
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[f"{sub.name}/{entry.name}"] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def read(self, timeout):
+        wait = self._next - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return set(), False
+        time.sleep(max(wait, 0))
+        self._next = time.monotonic() + self.interval
+        current = self._scan()
+        touched = {p for p in current.keys() | self._snapshot.keys()
+                   if current.get(p) != self._snapshot.get(p)}
+        self._snapshot = current
+        return touched, False
+
+    def close(self):
+        pass
+
+
+def open_source(root, poll=False, poll_interval=POLL_INTERVAL):
+    """InotifySource where available (and not poll), else PollingSource."""
+    libc = None if poll else _libc_inotify()
+    if libc is not None:
+        try:
+            return InotifySource(root, libc)
+        except OSError as e:
+            print(f"  Warning: inotify unavailable ({e}), polling every {poll_interval}s")
+    return PollingSource(root, poll_interval)
+
+
+def batches(source, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+    """Yield (paths, rescan) batches from source until the caller stops."""
+    pending, rescan, first = set(), False, None
+    while True:
+        touched, overflow = source.read(debounce if first is not None else 3600)
+        if touched or overflow:
+            pending |= touched
+            rescan = rescan or overflow
+            first = first or time.monotonic()
+            if time.monotonic() - first < max_delay:
+                continue
+        if first is None:
+            continue
+        yield pending, rescan
+        pending, rescan, first = set(), False, None
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+jd_cache.py - Shared job-description cache in data/jd-cache/.
+
+Used by: jobs-source-linkedin-jobspy.py
+
+One JSON file per job ID (same layout as the existing cache entries):
+  {"job_id": ..., "jd_text": ..., "source": ..., "cached_at": ..., "content_hash": ...}
+
+Entries older than the TTL are treated as misses and refetched. Reads and
+writes are thread-safe so parallel search workers share one cache, and a
+posting seen by several overlapping searches is fetched once: get_or_fetch()
+holds a per-ID future while a fetch is in flight, so concurrent misses for the
+same ID wait for that fetch instead of starting their own.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+def normalize_job_id(job_id: str) -> str:
+    """Strip source prefixes ("li-4395053017" → "4395053017")."""
+    return str(job_id).split("-")[-1].strip()
+
+
+class JDCache:
+    """TTL cache of JD text keyed by job ID, backed by one file per job."""
+
+    def __init__(self, cache_dir: Path, ttl_days: float = 14, source: str = ""):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = timedelta(days=ttl_days)
+        self.source = source
+        self.hits = 0
+        self.misses = 0
+        self.fetch_failures = 0
+        self._memory = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _path(self, job_id: str) -> Path:
+        return self.cache_dir / f"{job_id}.json"
+
+    def _load(self, job_id: str) -> str | None:
+        """Memory or unexpired on-disk JD text for a normalized job_id."""
+        with self._lock:
+            if job_id in self._memory:
+                return self._memory[job_id]
+        jd_text = None
+        try:
+            entry = json.loads(self._path(job_id).read_text())
+            cached_at = datetime.strptime(entry.get("cached_at", ""), "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+            if datetime.now(timezone.utc) - cached_at <= self.ttl:
+                jd_text = entry.get("jd_text") or None
+        except (OSError, ValueError):
+            pass
+        if jd_text:
+            with self._lock:
+                self._memory[job_id] = jd_text
+        return jd_text
+
+    def get(self, job_id: str) -> str | None:
+        """Cached JD text for job_id, or None if missing/expired."""
+        job_id = normalize_job_id(job_id)
+        if not re.fullmatch(r"[\w.]+", job_id):
+            return None
+        jd_text = self._load(job_id)
+        with self._lock:
+            if jd_text:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return jd_text
+
+    def get_or_fetch(self, job_id: str, fetch) -> str:
+        """Cached JD text, else fetch(job_id) once per ID and cache the result.
+
+        A caller that finds a fetch for the same ID already in flight waits
+        for it and counts as a hit; only the thread that fetches counts a miss.
+        If fetch raises, nothing is cached, the failure is counted once, and
+        the exception is re-raised to the fetching thread and every waiter.
+        """
+        key = normalize_job_id(job_id)
+        if not re.fullmatch(r"[\w.]+", key):
+            try:
+                return fetch(job_id) or ""
+            except Exception:
+                with self._lock:
+                    self.fetch_failures += 1
+                raise
+        jd_text = self._load(key)
+        with self._lock:
+            if jd_text:
+                self.hits += 1
+                return jd_text
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not owner:
+            return future.result()
+        try:
+            jd_text = fetch(job_id) or ""
+            self.put(key, jd_text)
+            future.set_result(jd_text)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                with self._lock:
+                    self.fetch_failures += 1
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return jd_text
+
+    def put(self, job_id: str, jd_text: str) -> None:
+        """Store JD text (atomic write; empty text is not cached)."""
+        job_id = normalize_job_id(job_id)
+        if not jd_text or not re.fullmatch(r"[\w.]+", job_id):
+            return
+        with self._lock:
+            self._memory[job_id] = jd_text
+        entry = {
+            "job_id": job_id,
+            "jd_text": jd_text,
+            "source": self.source,
+            "cached_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "content_hash": hashlib.sha1(jd_text.encode("utf-8")).hexdigest(),
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._path(job_id).with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(entry, indent=2))
+            os.replace(tmp, self._path(job_id))
+        except OSError as e:
+            print(f"  Warning: could not write JD cache for {job_id}: {e}")
+
+    def kpi(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "jd_cache_hits": self.hits,
+            "jd_cache_misses": self.misses,
+            "jd_cache_hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "jd_fetch_failures": self.fetch_failures,
+        }
@@ -9,6 +9,7 @@ Features:
   - Checks freshness (skip stale files older than TTL)
   - Merges all jobs into single list
   - Dedup by URL exact match, then title+company fuzzy match (>85%)
+    via a blocked trigram index (jobs_dedup.py)
   - Cross-reference with applied-job-ids.txt
   - Apply search policy filters
   - Track which sources found each job
@@ -20,7 +21,6 @@ import os
 import re
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from difflib import SequenceMatcher
 
 # Pipeline DB (safe fallback)
 try:
@@ -33,6 +33,7 @@ except ImportError:
 sys.path.insert(0, str(Path(__file__).parent))
 
 from _imports import agent_common, jobs_source_common
+from jobs_dedup import FuzzyKeyIndex, load_history_index, sync_history_keys
 
 # Import from agent_common
 AgentResult = agent_common.AgentResult
@@ -59,6 +60,9 @@ APPLIED_IDS_FILE = WORKSPACE / "jobs-bank" / "applied-job-ids.txt"
 SEARCH_POLICY_FILE = WORKSPACE / "jobs-bank" / "search-policy.md"
 FRESHNESS_HOURS = 25  # Max age for source files (survives 1 failed pipeline run)
 FUZZY_MATCH_THRESHOLD = 0.85  # 85% similarity for title+company dedup
+APPLIED_MATCH_THRESHOLD = 0.82  # Stage 3b: duplicate of an applied job
+REPOST_MATCH_THRESHOLD = 0.88   # Stage 3c: repost of a previously scored job
+PIPELINE_DB = Path(__file__).parent.parent / "data" / "nasr-pipeline.db"
 
 # Cairo timezone
 CAIRO_TZ = timezone(timedelta(hours=2))
@@ -109,9 +113,9 @@ def is_stale(meta: dict, max_hours: int) -> bool:
         return True
 
 
-def fuzzy_match(s1: str, s2: str) -> float:
-    """Calculate similarity ratio between two strings."""
-    return SequenceMatcher(None, s1.lower(), s2.lower()).ratio()
+# Bump whenever normalize_title_company's output changes: the persisted
+# history keys (jobs_dedup.sync_history_keys) are rebuilt on a new version.
+NORMALIZER_VERSION = "1"
 
 
 def normalize_title_company(title: str, company: str) -> str:
@@ -125,20 +129,6 @@ def normalize_title_company(title: str, company: str) -> str:
     return f"{title}|||{company}"
 
 
-def find_fuzzy_duplicate(job: dict, existing_jobs: list[dict], threshold: float = FUZZY_MATCH_THRESHOLD) -> dict | None:
-    """Find if a job is a fuzzy duplicate of any existing job."""
-    job_key = normalize_title_company(job.get("title", ""), job.get("company", ""))
-
-    for existing in existing_jobs:
-        existing_key = normalize_title_company(existing.get("title", ""), existing.get("company", ""))
-
-        similarity = fuzzy_match(job_key, existing_key)
-        if similarity >= threshold:
-            return existing
-
-    return None
-
-
 # ── Country extraction ────────────────────────────────────────────────────────
 GCC_COUNTRY_MAP = {
     "gcc": "GCC",  # pass-through for Google source; not a real country but better than Unknown
@@ -202,6 +192,42 @@ NEGATIVE_TITLE_KEYWORDS = [
 ]
 
 
+class PolicyMatcher:
+    """Policy keyword lists compiled once per run; one match() call per job.
+
+    Negative keywords are tested against the title, industry words against
+    "title jd_text". CPython's substring search runs in C, so per-keyword `in`
+    tests over prebuilt tuples measured 3-10x faster than a combined regex on
+    multi-KB JDs. The saving is scanning each job once instead of once for the
+    policy loop, again for the bonus and again in sort_key.
+    """
+
+    def __init__(self, negative, excluded, target):
+        self.negative = tuple(negative)
+        self.excluded = tuple(excluded)
+        self.target = tuple(target)
+
+    def match(self, title: str, jd_text: str) -> dict:
+        """Keyword hits for a job, each list in keyword-list order.
+
+        Stops at the first stage that rejects the job: a negative title hit
+        skips lowering the JD entirely, and an excluded-industry hit skips the
+        target scan. Later lists are then empty, which is all the policy loop
+        reads before `continue`.
+        """
+        title_lower = title.lower()
+        hits = {"negative": [], "excluded": [], "target": []}
+        hits["negative"] = [kw for kw in self.negative if kw in title_lower]
+        if hits["negative"]:
+            return hits
+        combined_text = f"{title_lower} {(jd_text or '').lower()}"
+        hits["excluded"] = [w for w in self.excluded if w in combined_text]
+        if hits["excluded"]:
+            return hits
+        hits["target"] = [w for w in self.target if w in combined_text]
+        return hits
+
+
 ## Aggregator / listing page patterns to filter out
 AGGREGATOR_DOMAINS = {
     "glassdoor.com", "trovit.com", "indeed.com", "linkedin.com/jobs/search",
@@ -443,10 +469,14 @@ def run_merge(result: AgentResult):
             url_deduped_per_source[src] = url_deduped_per_source.get(src, 0) + 1
 
     # Stage 2: Fuzzy title+company dedup
+    # Blocked index: first kept job whose key's SequenceMatcher ratio is >= the
+    # threshold, as a scan of every kept job would find, without the O(n²) scan
     fuzzy_deduped = []
+    fuzzy_index = FuzzyKeyIndex(FUZZY_MATCH_THRESHOLD)
 
     for job in url_deduped:
-        existing = find_fuzzy_duplicate(job, fuzzy_deduped)
+        job_key = normalize_title_company(job.get("title", ""), job.get("company", ""))
+        existing = fuzzy_index.find(job_key)
         if existing:
             existing_sources = existing.get("_sources", [])
             job_source = job.get("_source_file", "")
@@ -456,8 +486,9 @@ def run_merge(result: AgentResult):
                 existing["source_count"] = len(existing_sources)
         else:
             fuzzy_deduped.append(job)
+            fuzzy_index.add(job_key, job)
 
-    print(f"After fuzzy dedup: {len(fuzzy_deduped)} jobs")
+    print(f"After fuzzy dedup: {len(fuzzy_deduped)} jobs ({fuzzy_index.comparisons} exact comparisons)")
 
     # Stage 3: Filter already-applied jobs
     not_applied = []
@@ -486,78 +517,55 @@ def run_merge(result: AgentResult):
     # Stage 3b: DB-backed fuzzy dedup against ALL applied jobs (by applied_date)
     # Catches same role re-posted with different URL/ID (e.g., LinkedIn reposts)
     # Bug fix: query by applied_date IS NOT NULL, not status (many applied have status='skipped')
-    # Also check against all historical jobs, not just those marked 'applied'
-    db_deduped = []
-    db_dedup_filtered = 0
-    try:
-        import sqlite3
-        _db = sqlite3.connect(str(Path(__file__).parent.parent / "data" / "nasr-pipeline.db"))
-        applied_rows = _db.execute(
-            "SELECT id, title, company, applied_date, verdict FROM jobs WHERE applied_date IS NOT NULL"
-        ).fetchall()
-        applied_keys = []
-        for row in applied_rows:
-            ak = normalize_title_company(row[1] or "", row[2] or "")
-            applied_keys.append((row[0], ak, row[3], row[4]))
-        _db.close()
-
-        for job in not_applied:
-            job_key = normalize_title_company(job.get("title", ""), job.get("company", ""))
-            is_dup = False
-            for aid, ak, apply_dt, vrd in applied_keys:
-                if fuzzy_match(job_key, ak) >= 0.82:
-                    db_dedup_filtered += 1
-                    is_dup = True
-                    break
-            if not is_dup:
-                db_deduped.append(job)
-
-        print(f"After DB applied dedup: {len(db_deduped)} jobs (removed {db_dedup_filtered} duplicates of applied jobs)")
-    except Exception as e:
-        print(f"  Warning: DB applied dedup failed ({e}), skipping")
-        db_deduped = not_applied
-
     # Stage 3c: Dedup against ALL historical jobs by company+title fuzzy match
     # Catches re-posted roles that we've already scored (SUBMIT/REVIEW/SKIP)
     # so we don't re-evaluate the same role under a new URL
+    # Both stages share one lookup into the persisted job_history_keys index
+    # (jobs_dedup.py): only rows new or changed since the last run get normalized,
+    # and only history keys sharing trigrams with today's jobs are loaded.
+    db_deduped = []
+    db_dedup_filtered = 0
     db_deduped2 = []
     repost_filtered = 0
     try:
         import sqlite3
-        _db = sqlite3.connect(str(Path(__file__).parent.parent / "data" / "nasr-pipeline.db"))
-        scored_rows = _db.execute(
-            "SELECT id, title, company, verdict, url_hash FROM jobs WHERE verdict IS NOT NULL AND verdict != '' AND url_hash IS NOT NULL"
-        ).fetchall()
-        historical_keys = []
-        for row in scored_rows:
-            hk = normalize_title_company(row[1] or "", row[2] or "")
-            historical_keys.append((row[0], hk, row[3], row[4]))
+        _db = sqlite3.connect(str(PIPELINE_DB))
+        synced = sync_history_keys(_db, normalize_title_company, NORMALIZER_VERSION)
+        job_keys = [normalize_title_company(job.get("title", ""), job.get("company", "")) for job in not_applied]
+        history_index = load_history_index(_db, APPLIED_MATCH_THRESHOLD, job_keys)
         _db.close()
+        print(f"History index: {len(history_index)} applied/scored keys near today's jobs ({synced} newly normalized)")
 
-        for job in db_deduped:
-            job_key = normalize_title_company(job.get("title", ""), job.get("company", ""))
+        for job, job_key in zip(not_applied, job_keys):
+            job_url_hash = job.get("job_url_hash", "")
+            is_dup = False
             is_repost = False
-            for hid, hk, h_verdict, h_hash in historical_keys:
+            for (hid, applied, scored, h_hash), similarity in history_index.matches(job_key):
+                if applied:
+                    is_dup = True
+                    break
                 # Only dedup if URL is different (same hash = already caught by URL dedup)
-                job_url_hash = job.get("job_url_hash", "")
-                if job_url_hash and job_url_hash == h_hash:
-                    continue
-                if fuzzy_match(job_key, hk) >= 0.88:
+                if scored and similarity >= REPOST_MATCH_THRESHOLD and not (job_url_hash and job_url_hash == h_hash):
                     is_repost = True
-                    break
-            if not is_repost:
-                db_deduped2.append(job)
-            else:
+            if is_dup:
+                db_dedup_filtered += 1
+                continue
+            db_deduped.append(job)
+            if is_repost:
                 repost_filtered += 1
+            else:
+                db_deduped2.append(job)
 
+        print(f"After DB applied dedup: {len(db_deduped)} jobs (removed {db_dedup_filtered} duplicates of applied jobs)")
         print(f"After historical repost dedup: {len(db_deduped2)} jobs (removed {repost_filtered} reposts of previously scored roles)")
     except Exception as e:
         print(f"  Warning: DB dedup failed ({e}), skipping")
-        db_deduped2 = db_deduped  # not_applied already in db_deduped
+        db_deduped2 = not_applied
 
     # Stage 4: Apply search policy
     policy_passed = []
     policy_filtered = 0
+    policy_matcher = PolicyMatcher(NEGATIVE_TITLE_KEYWORDS, EXCLUDED_INDUSTRY_WORDS, TARGET_INDUSTRY_WORDS)
 
     for job in db_deduped2:
         # Clean title first (strip location leakage)
@@ -573,35 +581,25 @@ def run_merge(result: AgentResult):
             url=job.get("url", ""),
         )
 
+        hits = policy_matcher.match(job.get("title", ""), job.get("jd_text", ""))
+
         # Negative keyword filter (block education/HR/finance/noise titles)
-        title_lower = job.get("title", "").lower()
-        negated = False
-        for neg_kw in NEGATIVE_TITLE_KEYWORDS:
-            if neg_kw in title_lower:
-                job["policy_status"] = f"negative-filter:{neg_kw}"
-                policy_filtered += 1
-                negated = True
-                break
-        if negated:
+        if hits["negative"]:
+            job["policy_status"] = f"negative-filter:{hits['negative'][0]}"
+            policy_filtered += 1
             continue
 
         # Industry targeting — block excluded industries
-        jd_text = (job.get("jd_text", "") or "").lower()
-        combined_text = f"{title_lower} {jd_text}"
-        industry_blocked = False
-        for exc_word in EXCLUDED_INDUSTRY_WORDS:
-            if exc_word in combined_text:
-                job["policy_status"] = f"excluded-industry:{exc_word}"
-                policy_filtered += 1
-                industry_blocked = True
-                break
-        if industry_blocked:
+        if hits["excluded"]:
+            job["policy_status"] = f"excluded-industry:{hits['excluded'][0]}"
+            policy_filtered += 1
             continue
 
         keep, reason = apply_search_policy(job)
         if keep:
             # Bonus points for target industry match
-            industry_match_count = sum(1 for w in TARGET_INDUSTRY_WORDS if w in combined_text)
+            industry_match_count = len(hits["target"])
+            job["_industry_hits"] = industry_match_count
             if industry_match_count > 0:
                 job["industry_bonus"] = industry_match_count * 3
             job["policy_status"] = "pass"
@@ -615,13 +613,8 @@ def run_merge(result: AgentResult):
     # Sort by keyword score (descending) — with industry targeting boost
     def sort_key(j):
         base = j.get('keyword_score', 0)
-        boost = 0
-        # +5 points if job is in Ahmed's target industries
-        jd_and_title = (j.get('jd_text', '') + ' ' + j.get('title', '')).lower()
-        for w in TARGET_INDUSTRY_WORDS:
-            if w in jd_and_title:
-                boost += 5
-                break  # one-time boost, not per-word
+        # +5 points if job is in Ahmed's target industries (one-time boost, not per-word)
+        boost = 5 if j.get('_industry_hits') else 0
         return base + boost
     policy_passed.sort(key=sort_key, reverse=True)
 
@@ -734,6 +727,7 @@ def run_merge(result: AgentResult):
         "sources_loaded": len(sources_loaded),
         "stale_sources": len(stale_sources),
         "unique_after_dedup": len(fuzzy_deduped),
+        "fuzzy_comparisons": fuzzy_index.comparisons,
         "applied_filtered": applied_filtered,
         "policy_filtered": policy_filtered,
         "final_candidates": len(final_jobs),
@@ -16,6 +16,12 @@ Why this works: JobSpy calls LinkedIn's public job API (/jobs/view/) that return
 HTML for non-authenticated users. No login needed. Full JDs included.
 Reference: https://github.com/DaKheera47/job-ops
 
+JD cache: the same posting comes back from many overlapping searches, so full
+descriptions are cached in data/jd-cache/ (jd_cache.py). Searches list postings
+via JobSpy and only call JobSpy's /jobs/view/ description fetcher for job IDs
+that aren't cached yet; if that fetcher is unavailable, descriptions come from
+scrape_jobs(linkedin_fetch_description=True) as before.
+
 Output: data/jobs-raw/linkedin.json  (same file as old linkedin source)
 """
 
@@ -23,6 +29,8 @@ import sys
 import os
 import time
 import json
+import threading
+from functools import partial
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
@@ -35,11 +43,14 @@ except ImportError:
     _pdb = None
 
 from _imports import agent_common, jobs_source_common
+from search_scheduler import SearchScheduler, TokenBucket
+from jd_cache import JDCache, normalize_job_id
 
 AgentResult = agent_common.AgentResult
 agent_main = agent_common.agent_main
 is_dry_run = agent_common.is_dry_run
 JOBS_RAW_DIR = agent_common.JOBS_RAW_DIR
+DATA_DIR = agent_common.DATA_DIR
 
 ALL_TITLES = jobs_source_common.ALL_TITLES
 GCC_COUNTRIES = jobs_source_common.GCC_COUNTRIES
@@ -51,7 +62,25 @@ OUTPUT_FILE = JOBS_RAW_DIR / "linkedin.json"
 # JobSpy settings
 RESULTS_PER_SEARCH = 50
 HOURS_OLD = 720  # 30 days (still accepting apps, just age-rank lower)
-RATE_LIMIT_DELAY = 2.0  # seconds between searches (be respectful)
+# Request rate vs the old serial loop: that loop ran one search at a time and
+# slept RATE_LIMIT_DELAY after each one finished. A search is ~5 result pages
+# that JobSpy itself paces 3-7 s apart, so search-page traffic was ~0.2 req/s.
+# Now one token per search attempt (retries included) caps starts at
+# 1/RATE_LIMIT_DELAY, and JobSpy's page pacing inside each of the MAX_WORKERS
+# in-flight searches caps search-page traffic at ~MAX_WORKERS/5 ≈ 0.8 req/s.
+# /jobs/view/ detail requests are the bulk of the traffic: the old loop fetched
+# them back to back inside scrape_jobs (~2 req/s in bursts, ~1 req/s averaged
+# over a search). They now share their own DETAIL_FETCH_RATE bucket, so the
+# combined peak (~1.8 req/s) stays under the old burst rate, and cached IDs
+# send no request at all.
+RATE_LIMIT_DELAY = 2.0  # seconds between search starts, all workers combined (be respectful)
+MAX_WORKERS = 4  # searches in flight at once
+PER_COUNTRY_CONCURRENCY = 2  # max in-flight searches per country
+MAX_RETRIES = 2  # retries per search before it counts as failed
+RETRY_BACKOFF = 5.0  # seconds, doubled per retry
+DETAIL_FETCH_RATE = 1.0  # /jobs/view/ requests per second, all workers combined
+JD_CACHE_DIR = DATA_DIR / "jd-cache"
+JD_CACHE_TTL_DAYS = 14  # postings rarely change; refetch after two weeks
 
 # Priority: top titles × all 6 GCC countries
 PRIORITY_TITLES = [
@@ -112,69 +141,153 @@ LOCATION_MAP = {
 }
 
 
-def scrape_linkedin_jobspy(title: str, location: str, country: str = "", dry_run: bool = False) -> list[dict]:
-    """Scrape LinkedIn via JobSpy for a single title+location combo."""
+def make_linkedin_detail_fetcher(bucket=None):
+    """JobSpy's own /jobs/view/ description fetcher, or None if unavailable.
+
+    Same public endpoint linkedin_fetch_description=True uses, but called per
+    job ID so cached IDs can be skipped. It relies on JobSpy internals, so if
+    they don't match, callers fall back to fetching inside scrape_jobs.
+
+    With a TokenBucket, each detail request takes a token first. Pass a
+    bucket of its own, not the search bucket: a search holds its per-country
+    slot while its JDs are fetched.
+    """
     try:
-        from jobspy import scrape_jobs
-        import pandas as pd
+        from jobspy.linkedin import LinkedIn
+        from jobspy.model import DescriptionFormat, ScraperInput, Site
+    except ImportError:
+        try:
+            from jobspy.scrapers.linkedin import LinkedInScraper as LinkedIn
+            from jobspy.jobs import DescriptionFormat
+            from jobspy.scrapers import ScraperInput, Site
+        except ImportError:
+            return None
+    if not hasattr(LinkedIn, "_get_job_details"):
+        return None
+
+    local = threading.local()  # one HTTP session per worker thread
+
+    def fetch(job_id: str) -> str:
+        """JD text for job_id; request and parse errors propagate to the caller."""
+        scraper = getattr(local, "scraper", None)
+        if scraper is None:
+            scraper = LinkedIn()
+            scraper.scraper_input = ScraperInput(
+                site_type=[Site.LINKEDIN], description_format=DescriptionFormat.MARKDOWN
+            )
+            local.scraper = scraper
+        if bucket is not None:
+            bucket.acquire()
+        return (scraper._get_job_details(normalize_job_id(job_id)) or {}).get("description") or ""
+
+    return fetch
+
+
+def scrape_linkedin_jobspy(title: str, location: str, country: str = "", dry_run: bool = False,
+                           scrape_fn=None, jd_cache: JDCache | None = None, fetch_detail=None,
+                           search_bucket: TokenBucket | None = None) -> list[dict]:
+    """Scrape LinkedIn via JobSpy for a single title+location combo.
+
+    Raises on scrape errors so the scheduler can retry and count failures.
+    scrape_fn defaults to jobspy.scrape_jobs (pass a stub in tests).
+
+    With jd_cache and fetch_detail, the search lists postings without
+    descriptions and only fetches JDs for job IDs not already cached. If any
+    of those fetches fail, the search is re-run once with
+    linkedin_fetch_description=True (taking a search_bucket token) and the
+    failed IDs take their JDs from it. With jd_cache alone, descriptions come
+    from scrape_jobs and fill the cache.
+    """
+    import pandas as pd
+
+    if dry_run:
+        return []
 
-        if dry_run:
-            return []
+    if scrape_fn is None:
+        from jobspy import scrape_jobs as scrape_fn
 
-        jobs_df = scrape_jobs(
+    def search(fetch_description: bool):
+        return scrape_fn(
             site_name=["linkedin"],
             search_term=title,
             location=location,
             results_wanted=RESULTS_PER_SEARCH,
             hours_old=HOURS_OLD,
-            linkedin_fetch_description=True,
+            linkedin_fetch_description=fetch_description,
             description_format="markdown",
             verbose=0,
         )
 
-        if jobs_df is None or jobs_df.empty:
-            return []
-
-        results = []
-        for _, row in jobs_df.iterrows():
-            job_id = str(row.get("id", "")) or str(row.get("job_url", ""))
-            url = str(row.get("job_url", "")) or str(row.get("job_url_direct", ""))
-            description = str(row.get("description", "")) or ""
-            salary_raw = ""
-            if row.get("min_amount") and row.get("max_amount"):
-                currency = row.get("currency", "")
-                interval = row.get("interval", "")
-                salary_raw = f"{currency} {row['min_amount']}-{row['max_amount']} {interval}".strip()
-
-            job = standard_job_dict(
-                job_id=f"li-{job_id}" if job_id and not job_id.startswith("li-") else job_id,
-                title=str(row.get("title", "")),
-                company=str(row.get("company", "")),
-                location=str(row.get("location", "")),
-                url=url,
-                source="linkedin_jobspy",
-                raw_snippet=description[:300] if description else "",
-                posted=str(row.get("date_posted", "")) if pd.notna(row.get("date_posted")) else "",
-            )
-            # Attach extra fields that merge step can use
-            job["search_country"] = country  # critical for country extraction in merge step
-            if description:
-                job["jd_text"] = description
-            if salary_raw:
-                job["salary"] = salary_raw
-            results.append(job)
-
-        return results
+    cache_first = jd_cache is not None and fetch_detail is not None
+    jobs_df = search(not cache_first)
 
-    except ImportError:
-        print("  ERROR: jobspy not installed — run: pip install jobspy")
-        return []
-    except Exception as e:
-        print(f"  Error scraping '{title}' @ {location}: {e}")
+    if jobs_df is None or jobs_df.empty:
         return []
 
+    rows = []
+    failed = set()
+    for _, row in jobs_df.iterrows():
+        job_id = str(row.get("id", "")) or str(row.get("job_url", ""))
+        description = str(row.get("description", "")) or ""
+        if cache_first:
+            try:
+                description = jd_cache.get_or_fetch(job_id, fetch_detail)
+            except Exception as e:
+                print(f"  JD fetch failed for {job_id}: {e}")
+                failed.add(job_id)
+                description = ""
+        elif jd_cache is not None and description:
+            jd_cache.put(job_id, description)
+        rows.append((job_id, row, description))
+
+    if failed:
+        # Scrape errors here propagate: the scheduler retries the search, and
+        # the JDs fetched so far are already cached.
+        if search_bucket is not None:
+            search_bucket.acquire()
+        full_df = search(True)
+        refetched = {}
+        if full_df is not None:
+            for _, row in full_df.iterrows():
+                job_id = str(row.get("id", "")) or str(row.get("job_url", ""))
+                description = str(row.get("description", "")) or ""
+                if job_id in failed and description:
+                    refetched[job_id] = description
+                    jd_cache.put(job_id, description)
+        rows = [(job_id, row, refetched.get(job_id, description)) for job_id, row, description in rows]
+        print(f"  JD fallback for '{title}' @ {location}: {len(refetched)}/{len(failed)} recovered")
+
+    results = []
+    for job_id, row, description in rows:
+        url = str(row.get("job_url", "")) or str(row.get("job_url_direct", ""))
+        salary_raw = ""
+        if row.get("min_amount") and row.get("max_amount"):
+            currency = row.get("currency", "")
+            interval = row.get("interval", "")
+            salary_raw = f"{currency} {row['min_amount']}-{row['max_amount']} {interval}".strip()
+
+        job = standard_job_dict(
+            job_id=f"li-{job_id}" if job_id and not job_id.startswith("li-") else job_id,
+            title=str(row.get("title", "")),
+            company=str(row.get("company", "")),
+            location=str(row.get("location", "")),
+            url=url,
+            source="linkedin_jobspy",
+            raw_snippet=description[:300] if description else "",
+            posted=str(row.get("date_posted", "")) if pd.notna(row.get("date_posted")) else "",
+        )
+        # Attach extra fields that merge step can use
+        job["search_country"] = country  # critical for country extraction in merge step
+        if description:
+            job["jd_text"] = description
+        if salary_raw:
+            job["salary"] = salary_raw
+        results.append(job)
+
+    return results
 
-def run_linkedin_jobspy(result: AgentResult):
+
+def run_linkedin_jobspy(result: AgentResult, scrape_fn=None, sleep=time.sleep):
     """Main scraping logic."""
     dry_run = is_dry_run()
     all_jobs = {}
@@ -208,25 +321,61 @@ def run_linkedin_jobspy(result: AgentResult):
         result.set_kpi({"searches_planned": len(search_pairs), "dry_run": True})
         return
 
-    for i, (title, location, country_name, kind) in enumerate(all_searches, 1):
-        print(f"  [{i}/{len(all_searches)}] [{kind}] '{title}' @ {location}...", end=" ", flush=True)
-        jobs = scrape_linkedin_jobspy(title, location, country_name)
-
-        new_count = 0
-        for job in jobs:
+    if scrape_fn is None:
+        try:
+            from jobspy import scrape_jobs as scrape_fn
+        except ImportError:
+            print("  ERROR: jobspy not installed — run: pip install jobspy")
+
+    jd_cache = JDCache(JD_CACHE_DIR, ttl_days=JD_CACHE_TTL_DAYS, source="linkedin_jobspy")
+    search_bucket = TokenBucket(1.0 / RATE_LIMIT_DELAY, sleep=sleep)
+    detail_bucket = TokenBucket(DETAIL_FETCH_RATE, sleep=sleep)
+    fetch_detail = make_linkedin_detail_fetcher(detail_bucket) if scrape_fn is not None else None
+    if fetch_detail is None:
+        print("JD cache: JobSpy detail fetcher unavailable — descriptions fetched by scrape_jobs")
+
+    print(f"Scheduler: {MAX_WORKERS} workers, {PER_COUNTRY_CONCURRENCY}/country, "
+          f"1 search per {RATE_LIMIT_DELAY}s, {DETAIL_FETCH_RATE} JD fetches/s, {MAX_RETRIES} retries")
+    scheduler = SearchScheduler(
+        partial(scrape_linkedin_jobspy, scrape_fn=scrape_fn, jd_cache=jd_cache, fetch_detail=fetch_detail,
+                search_bucket=search_bucket),
+        max_workers=MAX_WORKERS,
+        bucket=search_bucket,
+        per_key_limit=PER_COUNTRY_CONCURRENCY,
+        max_retries=MAX_RETRIES,
+        backoff=RETRY_BACKOFF,
+        sleep=sleep,
+    )
+    tasks = [(country_name, (title, location, country_name)) for title, location, country_name, _ in all_searches]
+
+    # Collect per-search results, then merge in search order so output is
+    # identical to a serial run regardless of completion order.
+    search_results = [None] * len(all_searches)
+    if scrape_fn is None:
+        failed_searches = len(all_searches)
+        tasks = []
+    for done, (i, jobs, error, attempts) in enumerate(scheduler.run(tasks), 1):
+        title, location, country_name, kind = all_searches[i]
+        total_searches += 1
+        retry_note = f" after {attempts} attempts" if attempts > 1 else ""
+        if error is not None:
+            failed_searches += 1
+            print(f"  [{done}/{len(all_searches)}] [{kind}] '{title}' @ {location}: FAILED{retry_note} ({error})")
+            continue
+        search_results[i] = jobs
+        print(f"  [{done}/{len(all_searches)}] [{kind}] '{title}' @ {location}: {len(jobs)} found{retry_note}")
+
+    for jobs in search_results:
+        for job in jobs or []:
             jid = job.get("id", "") or job.get("url", "")
             if jid and jid not in all_jobs:
                 all_jobs[jid] = job
-                new_count += 1
-
-        print(f"{len(jobs)} found, {new_count} new (total: {len(all_jobs)})")
-        total_searches += 1
-
-        if i < len(search_pairs):
-            time.sleep(RATE_LIMIT_DELAY)
 
     jobs_list = list(all_jobs.values())
-    print(f"\nTotal unique LinkedIn jobs: {len(jobs_list)} from {total_searches} searches")
+    missing_jd = sum(1 for job in jobs_list if not job.get("jd_text"))
+    print(f"\nTotal unique LinkedIn jobs: {len(jobs_list)} from {total_searches} searches ({failed_searches} failed)")
+    print(f"JD cache: {jd_cache.hits} hits, {jd_cache.misses} misses, "
+          f"{jd_cache.fetch_failures} fetch failures, {missing_jd} jobs without JD")
 
     # Write output
     JOBS_RAW_DIR.mkdir(parents=True, exist_ok=True)
@@ -248,6 +397,9 @@ def run_linkedin_jobspy(result: AgentResult):
         "total_jobs": len(jobs_list),
         "searches": total_searches,
         "failed": failed_searches,
+        "retries": scheduler.retries_used,
+        **jd_cache.kpi(),
+        "jd_missing": missing_jd,
         "output_file": str(OUTPUT_FILE),
     })
 
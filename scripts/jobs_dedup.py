@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+jobs_dedup.py - Blocked fuzzy-match index for title+company dedup.
+
+Used by: jobs-merge.py (Stage 2 fuzzy dedup, Stage 3b/3c history dedup)
+
+The old dedup compared every job against every kept job with
+SequenceMatcher (O(n²)). FuzzyKeyIndex narrows candidates first with a
+character-trigram inverted index and a length window, then runs the exact
+SequenceMatcher check only on the survivors.
+
+The blocking is lossless: a pair with ratio >= t always passes both filters.
+  - length:   ratio = 2M/S <= 2*min(la, lb)/S
+  - trigrams: with M matched chars in k matching blocks, the blocks are
+              separated by unmatched chars so k - 1 <= S - 2M, and each
+              block of size s shares s - 2 trigrams, so
+              shared >= M - 2k >= 5M - 2S - 2 >= (2.5t - 2)S - 2
+So results are identical to the brute-force scan, including which kept job
+is returned (the earliest added one that matches). Survivors are further
+screened with SequenceMatcher's own quick_ratio() upper bound, using one
+matcher per kept key so its b-side tables are built once, not per pair.
+
+Historical applied/scored jobs live in the pipeline DB. Their normalized keys
+are persisted in a job_history_keys sidecar table that jobs-merge diffs
+against `jobs` on each run, so it only normalizes rows that are new or
+changed since the last one (or every row, once, when NORMALIZER_VERSION is
+bumped). Their trigram
+postings live in job_history_grams, so a run reads only the history rows
+that share trigrams with its own candidates instead of indexing everything.
+"""
+
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+NGRAM = 3
+
+
+def key_trigrams(key: str) -> set[tuple[str, int]]:
+    """Trigram occurrences of an (already lowercased) key.
+
+    Repeated trigrams are numbered ("dir", 1), ("dir", 2), ... so the size
+    of a set intersection equals the multiset intersection of trigrams.
+    """
+    seen = Counter()
+    grams = set()
+    for i in range(len(key) - NGRAM + 1):
+        gram = key[i:i + NGRAM]
+        seen[gram] += 1
+        grams.add((gram, seen[gram]))
+    return grams
+
+
+class FuzzyKeyIndex:
+    """Incremental index of normalized keys → payloads with fuzzy lookup.
+
+    find() returns the payload of the earliest-added key whose
+    SequenceMatcher ratio with the query is >= threshold, exactly as a
+    linear scan in insertion order would.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._keys = []                      # id → lowercased key
+        self._matchers = []                  # id → SequenceMatcher(seq2=key)
+        self._payloads = []                  # id → payload
+        self._postings = defaultdict(list)   # (trigram, occurrence) → [id]
+        self._by_length = defaultdict(list)  # len(key) → [id]
+        self._memo = {}                      # query key → matching id
+        self.comparisons = 0                 # exact ratio() calls (for KPIs)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: str, payload) -> None:
+        key = key.lower()
+        idx = len(self._keys)
+        self._keys.append(key)
+        matcher = SequenceMatcher(None)
+        matcher.set_seq2(key)
+        self._matchers.append(matcher)
+        self._payloads.append(payload)
+        self._by_length[len(key)].append(idx)
+        for gram in key_trigrams(key):
+            self._postings[gram].append(idx)
+
+    def _length_window(self, la: int) -> tuple[int, int]:
+        t = self.threshold
+        if t <= 0:
+            return 0, 1 << 30
+        lo = int(la * t / (2 - t))
+        hi = int(la * (2 - t) / t) + 1
+        return lo, hi
+
+    def _min_shared(self, la: int, lb: int) -> float:
+        return (2.5 * self.threshold - 2) * (la + lb) - 2
+
+    def candidates(self, key: str) -> list[int]:
+        """Ids that could reach the threshold, in insertion order."""
+        key = key.lower()
+        la = len(key)
+        lo, hi = self._length_window(la)
+
+        shared = Counter()
+        postings = self._postings
+        for gram in key_trigrams(key):
+            if gram in postings:
+                shared.update(postings[gram])
+
+        result = []
+        for lb in range(lo, hi + 1):
+            ids = self._by_length.get(lb)
+            if not ids:
+                continue
+            if self._min_shared(la, lb) <= 0:
+                # Short pairs: the trigram bound proves nothing, keep all
+                result.extend(ids)
+            else:
+                need = self._min_shared(la, lb)
+                result.extend(i for i in ids if shared.get(i, 0) >= need)
+        result.sort()
+        return result
+
+    def matches(self, key: str):
+        """Yield (payload, ratio) for every key at or above the threshold."""
+        key = key.lower()
+        t = self.threshold
+        for idx in self.candidates(key):
+            matcher = self._matchers[idx]
+            matcher.set_seq1(key)
+            if matcher.quick_ratio() < t:
+                continue
+            self.comparisons += 1
+            ratio = matcher.ratio()
+            if ratio >= t:
+                yield self._payloads[idx], ratio
+
+    def find(self, key: str):
+        """Return the earliest payload whose key matches, or None."""
+        key = key.lower()
+        if key in self._memo:
+            return self._payloads[self._memo[key]]
+        t = self.threshold
+        for idx in self.candidates(key):
+            matcher = self._matchers[idx]
+            matcher.set_seq1(key)
+            if matcher.quick_ratio() < t:
+                continue
+            self.comparisons += 1
+            if matcher.ratio() >= t:
+                # Later ids can never precede this match, so the memoized
+                # answer stays valid as the index grows.
+                self._memo[key] = idx
+                return self._payloads[idx]
+        return None
+
+
+# ── Persisted history keys (pipeline DB sidecar) ──────────────────────────────
+_APPLIED_SQL = "({row}.applied_date IS NOT NULL)"
+_SCORED_SQL = "({row}.verdict IS NOT NULL AND {row}.verdict != '' AND {row}.url_hash IS NOT NULL)"
+_SQL_BATCH = 900   # bound parameters per IN (...) list
+
+# jobs-merge owns these tables and nothing else: `jobs` belongs to the
+# pipeline writers and gets no triggers or columns from us. Each row keeps
+# the title/company/flags it was keyed from, so sync_history_keys() can find
+# new and changed jobs with one diff query instead of re-normalizing.
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_history_keys (
+    job_id       PRIMARY KEY,
+    title        TEXT,                       -- jobs.title the key was built from
+    company      TEXT,                       -- jobs.company the key was built from
+    fuzzy_key    TEXT NOT NULL,
+    applied      INTEGER NOT NULL DEFAULT 0, -- applied_date IS NOT NULL
+    scored       INTEGER NOT NULL DEFAULT 0, -- has verdict + url_hash
+    url_hash     TEXT,
+    key_len      INTEGER NOT NULL,           -- len(fuzzy_key)
+    key_version  TEXT NOT NULL               -- normalizer version that produced fuzzy_key
+);
+CREATE INDEX IF NOT EXISTS idx_job_history_keys_len ON job_history_keys(key_len);
+"""
+
+# Trigram postings of the persisted keys: gram is the trigram followed by its
+# occurrence number ("dir1", "dir2"; a trigram is always 3 chars), as in
+# key_trigrams(). key_len is in the key so a lookup reads one length range
+# per gram. Rows go with their key.
+HISTORY_GRAMS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_history_grams (
+    gram     TEXT    NOT NULL,
+    key_len  INTEGER NOT NULL,
+    job_id           NOT NULL,
+    PRIMARY KEY (gram, key_len, job_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_job_history_grams_job ON job_history_grams(job_id);
+
+CREATE TRIGGER IF NOT EXISTS job_history_grams_ad AFTER DELETE ON job_history_keys BEGIN
+    DELETE FROM job_history_grams WHERE job_id = old.job_id;
+END;
+"""
+
+# Earlier builds kept job_history_keys in sync with triggers on `jobs`
+# itself; their sidecar has no title/company columns and is rebuilt.
+_LEGACY_SCHEMA_CLEANUP = """
+DROP TRIGGER IF EXISTS job_history_keys_ai;
+DROP TRIGGER IF EXISTS job_history_keys_au;
+DROP TRIGGER IF EXISTS job_history_keys_ad;
+"""
+
+_STALE_HISTORY_SQL = f"""
+SELECT j.id, j.title, j.company, {_APPLIED_SQL.format(row="j")}, {_SCORED_SQL.format(row="j")}, j.url_hash
+FROM jobs j LEFT JOIN job_history_keys h ON h.job_id = j.id
+WHERE ({_APPLIED_SQL.format(row="j")} OR {_SCORED_SQL.format(row="j")})
+  AND (h.job_id IS NULL
+       OR h.title IS NOT j.title OR h.company IS NOT j.company
+       OR h.applied != {_APPLIED_SQL.format(row="j")} OR h.scored != {_SCORED_SQL.format(row="j")}
+       OR h.url_hash IS NOT j.url_hash
+       OR h.key_version != ?)
+"""
+
+_DROPPED_HISTORY_SQL = f"""
+DELETE FROM job_history_keys WHERE job_id NOT IN (
+    SELECT j.id FROM jobs j
+    WHERE {_APPLIED_SQL.format(row="j")} OR {_SCORED_SQL.format(row="j")}
+)
+"""
+
+
+def _gram_rows(job_id, key: str):
+    return [(f"{gram}{occ}", len(key), job_id) for gram, occ in key_trigrams(key)]
+
+
+def sync_history_keys(conn, normalize, version: str) -> int:
+    """Bring job_history_keys up to date; returns how many rows were normalized.
+
+    Diffs the applied/scored `jobs` rows against the sidecar: rows that are
+    new, whose title/company/flags changed, or that were keyed by another
+    normalizer version are normalized with normalize(title, company) and
+    re-posted into job_history_grams; rows that no longer qualify are
+    dropped. version must change whenever normalize's output does.
+    """
+    conn.executescript("BEGIN;" + _LEGACY_SCHEMA_CLEANUP + "COMMIT;")
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(job_history_keys)")}
+    if columns and "title" not in columns:
+        conn.executescript("BEGIN;"
+                           "DROP TABLE IF EXISTS job_history_grams;"
+                           "DROP TABLE job_history_keys;"
+                           "COMMIT;")
+    conn.executescript("BEGIN;" + HISTORY_SCHEMA + HISTORY_GRAMS_SCHEMA + "COMMIT;")
+
+    with conn:
+        conn.execute(_DROPPED_HISTORY_SQL)
+        pending = conn.execute(_STALE_HISTORY_SQL, (version,)).fetchall()
+        rows = []
+        for job_id, title, company, applied, scored, url_hash in pending:
+            key = normalize(title or "", company or "").lower()
+            rows.append((job_id, title, company, key, applied, scored, url_hash, len(key), version))
+        conn.executemany("DELETE FROM job_history_grams WHERE job_id = ?", [(r[0],) for r in rows])
+        conn.executemany(
+            "INSERT OR REPLACE INTO job_history_keys (job_id, title, company, fuzzy_key, applied, scored, "
+            "url_hash, key_len, key_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.executemany("INSERT OR IGNORE INTO job_history_grams (gram, key_len, job_id) VALUES (?, ?, ?)",
+                         [g for r in rows for g in _gram_rows(r[0], r[3])])
+    return len(pending)
+
+
+class HistoryIndex:
+    """Persisted history keys near a set of query keys, with FuzzyKeyIndex's matches().
+
+    Each query key's candidates come from the job_history_grams postings of
+    its own trigrams (plus, for short pairs where the trigram bound proves
+    nothing, the length window), filtered with the same lossless bounds as
+    FuzzyKeyIndex.candidates(). So matches() returns exactly what a
+    FuzzyKeyIndex over the whole history would, while a run only reads the
+    rows its candidates hit and builds a SequenceMatcher only for rows a
+    query reaches. Payload is (job_id, applied, scored, url_hash).
+    """
+
+    def __init__(self, conn, threshold: float, keys):
+        self.threshold = threshold
+        self._bounds = FuzzyKeyIndex(threshold)   # length window / trigram bound only
+        self._candidates = {}                     # query key → [job_id] (ascending)
+        self._keys = {}                           # job_id → history key
+        self._payloads = {}                       # job_id → payload
+        self._matchers = {}                       # job_id → SequenceMatcher(seq2=key), lazily
+        self.comparisons = 0
+
+        for key in {k.lower() for k in keys}:
+            self._candidates[key] = sorted(self._candidate_ids(conn, key))
+        ids = sorted(set().union(*self._candidates.values()))
+        for i in range(0, len(ids), _SQL_BATCH):
+            batch = ids[i:i + _SQL_BATCH]
+            for job_id, key, applied, scored, url_hash in conn.execute(
+                    "SELECT job_id, fuzzy_key, applied, scored, url_hash FROM job_history_keys "
+                    f"WHERE job_id IN ({','.join('?' * len(batch))})", batch):
+                self._keys[job_id] = key
+                self._payloads[job_id] = (job_id, bool(applied), bool(scored), url_hash)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _candidate_ids(self, conn, key: str) -> set:
+        la = len(key)
+        lo, hi = self._bounds._length_window(la)
+        # Lengths where min_shared <= 0 (it grows with lb) are kept on length alone
+        if self.threshold <= 0.8:
+            short_hi = hi   # the trigram bound is never positive
+        else:
+            short_hi = lo - 1
+            while short_hi < hi and self._bounds._min_shared(la, short_hi + 1) <= 0:
+                short_hi += 1
+
+        ids = set()
+        if short_hi >= lo:
+            ids.update(r[0] for r in conn.execute(
+                "SELECT job_id FROM job_history_keys WHERE key_len BETWEEN ? AND ?", (lo, short_hi)))
+        if hi > short_hi:
+            shared, lengths = Counter(), {}
+            grams = [f"{gram}{occ}" for gram, occ in key_trigrams(key)]
+            for i in range(0, len(grams), _SQL_BATCH):
+                batch = grams[i:i + _SQL_BATCH]
+                for job_id, count, lb in conn.execute(f"""
+                    SELECT job_id, COUNT(*), MAX(key_len) FROM job_history_grams
+                    WHERE gram IN ({','.join('?' * len(batch))}) AND key_len BETWEEN ? AND ?
+                    GROUP BY job_id
+                """, (*batch, short_hi + 1, hi)):
+                    shared[job_id] += count
+                    lengths[job_id] = lb
+            ids.update(i for i, n in shared.items() if n >= self._bounds._min_shared(la, lengths[i]))
+        return ids
+
+    def matches(self, key: str):
+        """Yield (payload, ratio) for every history key at or above the threshold.
+
+        key must be one of the keys the index was loaded for.
+        """
+        key = key.lower()
+        t = self.threshold
+        for job_id in self._candidates[key]:
+            matcher = self._matchers.get(job_id)
+            if matcher is None:
+                matcher = self._matchers[job_id] = SequenceMatcher(None)
+                matcher.set_seq2(self._keys[job_id])
+            matcher.set_seq1(key)
+            if matcher.quick_ratio() < t:
+                continue
+            self.comparisons += 1
+            ratio = matcher.ratio()
+            if ratio >= t:
+                yield self._payloads[job_id], ratio
+
+
+def load_history_index(conn, threshold: float, keys) -> HistoryIndex:
+    """HistoryIndex of the persisted keys that could match any of keys."""
+    return HistoryIndex(conn, threshold, keys)
@@ -9,6 +9,7 @@ Usage:
   python3 scripts/knowledge-brain-briefing.py              # today's briefing
   python3 scripts/knowledge-brain-briefing.py --output file.md  # write to file
   python3 scripts/knowledge-brain-briefing.py --json       # JSON output
+  python3 scripts/knowledge-brain-briefing.py --no-server  # skip the resident server (knowledge-brain.py serve)
 """
 import os
 import sys
@@ -18,129 +19,126 @@ from pathlib import Path
 
 WORKSPACE = Path("/root/.openclaw/workspace")
 sys.path.insert(0, str(WORKSPACE / "scripts"))
-import sqlite3
+import brain_db
+import brain_server
 
 BRAIN_DB = os.environ.get("KNOWLEDGE_DB", str(WORKSPACE / "knowledge.db"))
 
 
 def get_db():
-    conn = sqlite3.connect(BRAIN_DB)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    return brain_db.get_db(BRAIN_DB)
+
+
+# One pass over the pages the briefing needs (roles, people, anything with
+# open threads), filtered on the indexed frontmatter columns; latest timeline
+# entry and interaction count per page via window functions.
+BRIEFING_SQL = """
+    WITH latest AS (
+        SELECT page_id, date, summary,
+               COUNT(*) OVER (PARTITION BY page_id) AS interactions,
+               ROW_NUMBER() OVER (PARTITION BY page_id ORDER BY date DESC, id DESC) AS rn
+        FROM timeline_entries
+        WHERE page_id IN (SELECT id FROM pages WHERE type IN ('role', 'person'))
+    )
+    SELECT p.id, p.slug, p.type, p.title, p.updated_at,
+           COALESCE(p.status, 'unknown') AS status,
+           COALESCE(p.date_applied, 'unknown') AS date_applied,
+           CASE WHEN p.type = 'role' AND json_valid(p.frontmatter)
+                THEN COALESCE(json_extract(p.frontmatter, '$.notes'), '') ELSE '' END AS notes,
+           CASE WHEN p.open_thread_count > 0
+                THEN json_extract(p.frontmatter, '$.open_threads') END AS open_threads,
+           l.date AS last_date, l.summary AS last_summary,
+           COALESCE(l.interactions, 0) AS interactions
+    FROM pages p
+    LEFT JOIN latest l ON l.page_id = p.id AND l.rn = 1
+    WHERE p.type IN ('role', 'person') OR p.open_thread_count > 0
+    ORDER BY p.id
+"""
 
 
-def fm_status(frontmatter_json):
-    """Safely extract status from frontmatter JSON."""
-    try:
-        return json.loads(frontmatter_json or "{}").get("status", "unknown")
-    except Exception:
-        return "unknown"
+def fetch_pages(cursor):
+    """Every page with its decoded briefing fields, from a single query."""
+    cursor.execute(BRIEFING_SQL)
+    pages = []
+    for row in cursor.fetchall():
+        page = dict(row)
+        page["status"] = str(page["status"])
+        page["open_threads"] = json.loads(page["open_threads"]) if page["open_threads"] else []
+        pages.append(page)
+    return pages
 
 
-def get_hot_today(cursor):
+def get_hot_today(pages):
     """Items needing attention today (interviews, urgent threads)."""
     items = []
-    cursor.execute("SELECT title, slug, frontmatter FROM pages WHERE type = 'role'")
-    for row in cursor.fetchall():
-        status = fm_status(row["frontmatter"])
+    for page in pages:
+        if page["type"] != "role":
+            continue
+        status = page["status"]
         if "interview" in status or "screen" in status:
-            cursor.execute("""
-                SELECT summary FROM timeline_entries
-                WHERE page_id = (SELECT id FROM pages WHERE slug = ?)
-                ORDER BY date DESC LIMIT 1
-            """, (row["slug"],))
-            last = cursor.fetchone()
             items.append({
                 "type": "interview",
-                "title": row["title"],
-                "context": last["summary"][:120] if last else status,
+                "title": page["title"],
+                "context": page["last_summary"][:120] if page["last_summary"] else status,
                 "priority": "high"
             })
     return items
 
 
-def get_people_in_play(cursor):
+def get_people_in_play(pages):
     """Active contacts with recent activity."""
-    cursor.execute("""
-        SELECT p.title, p.slug, p.frontmatter, MAX(t.date) as last_contact, COUNT(t.id) as interactions
-        FROM pages p
-        JOIN timeline_entries t ON t.page_id = p.id
-        WHERE p.type = 'person'
-        GROUP BY p.id
-        ORDER BY MAX(t.date) DESC
-    """)
+    people = [p for p in pages if p["type"] == "person" and p["interactions"]]
+    people.sort(key=lambda p: p["last_date"], reverse=True)
     return [{
-        "name": r["title"],
-        "slug": r["slug"],
-        "last_contact": r["last_contact"],
-        "interactions": r["interactions"],
-        "priority": fm_status(r["frontmatter"]),
-        "status": fm_status(r["frontmatter"])
-    } for r in cursor.fetchall()]
+        "name": p["title"],
+        "slug": p["slug"],
+        "last_contact": p["last_date"],
+        "interactions": p["interactions"],
+        "priority": p["status"],
+        "status": p["status"]
+    } for p in people]
 
 
-def get_active_applications(cursor):
+def get_active_applications(pages):
     """Active job applications sorted by status."""
-    cursor.execute("""
-        SELECT title, slug, frontmatter, updated_at
-        FROM pages
-        WHERE type = 'role'
-        ORDER BY updated_at DESC
-    """)
-    apps = []
-    for row in cursor.fetchall():
-        fm = {}
-        try:
-            fm = json.loads(row["frontmatter"]) if row["frontmatter"] else {}
-        except Exception:
-            pass
-        apps.append({
-            "title": row["title"],
-            "slug": row["slug"],
-            "status": fm.get("status", "unknown"),
-            "date_applied": fm.get("date_applied", "unknown"),
-            "notes": fm.get("notes", ""),
-            "updated": row["updated_at"][:10]
-        })
+    roles = sorted((p for p in pages if p["type"] == "role"), key=lambda p: p["updated_at"], reverse=True)
+    apps = [{
+        "title": p["title"],
+        "slug": p["slug"],
+        "status": p["status"],
+        "date_applied": p["date_applied"],
+        "notes": p["notes"],
+        "updated": p["updated_at"][:10]
+    } for p in roles]
     # Sort: interview > applied > researching > other
     priority = {"interview": 1, "applied": 2, "researching": 3}
     apps.sort(key=lambda a: (priority.get(a["status"], 9), a["updated"]))
     return apps
 
 
-def get_open_threads(cursor):
+def get_open_threads(pages):
     """All open threads from entity frontmatter."""
-    cursor.execute("SELECT slug, type, title, frontmatter FROM pages")
-    threads = []
-    for row in cursor.fetchall():
-        try:
-            fm = json.loads(row["frontmatter"]) if row["frontmatter"] else {}
-        except Exception:
-            fm = {}
-        open_t = fm.get("open_threads", [])
-        if open_t:
-            threads.append({
-                "entity": row["title"],
-                "slug": row["slug"],
-                "type": row["type"],
-                "threads": open_t
-            })
-    return threads
+    return [{
+        "entity": p["title"],
+        "slug": p["slug"],
+        "type": p["type"],
+        "threads": p["open_threads"]
+    } for p in pages if p["open_threads"]]
 
 
 def generate_briefing():
     conn = get_db()
     cursor = conn.cursor()
     now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    pages = fetch_pages(cursor)
+    conn.close()
     briefing = {
         "date": now,
-        "hot": get_hot_today(cursor),
-        "people": get_people_in_play(cursor),
-        "applications": get_active_applications(cursor),
-        "threads": get_open_threads(cursor),
+        "hot": get_hot_today(pages),
+        "people": get_people_in_play(pages),
+        "applications": get_active_applications(pages),
+        "threads": get_open_threads(pages),
     }
-    conn.close()
     return briefing
 
 
@@ -176,7 +174,9 @@ def format_text(briefing):
 
 
 def main():
-    briefing = generate_briefing()
+    # A running brain server has the pages warm; fall back to a local query
+    response = None if "--no-server" in sys.argv else brain_server.request(BRAIN_DB, "briefing")
+    briefing = response["result"] if response and response["ok"] else generate_briefing()
 
     if "--json" in sys.argv:
         print(json.dumps(briefing, indent=2, default=str))
@@ -3,155 +3,251 @@
 Knowledge Brain — Ingestion Pipeline.
 
 Auto-ingests from daily sources into the knowledge brain:
-- Emails → timeline entries for people/companies
+- Emails (data/email-history.jsonl, new lines only) → timeline entries for people
 - New job applications → role entities
 - Outreach interactions → person timeline
 
 Usage:
   python3 scripts/knowledge-brain-ingest.py run        # run full pipeline
-  python3 scripts/knowledge-brain-ingest.py email      # ingest recent emails
+  python3 scripts/knowledge-brain-ingest.py email      # ingest emails appended since the last run
   python3 scripts/knowledge-brain-ingest.py jobs       # ingest active job apps
   python3 scripts/knowledge-brain-ingest.py status     # show ingest log
+  python3 scripts/knowledge-brain-ingest.py run --queue  # enqueue the writes for the brain writer
+                                                       # (knowledge-brain.py writer) instead of writing
 """
+import hashlib
 import os
+import re
 import sys
 import json
+from email.header import decode_header, make_header
+from email.utils import parseaddr, parsedate_to_datetime
 from pathlib import Path
 
 WORKSPACE = Path("/root/.openclaw/workspace")
 BRAIN_DB = os.environ.get("KNOWLEDGE_DB", str(WORKSPACE / "knowledge.db"))
 MEMORY_DIR = WORKSPACE / "memory"
 ENTITY_DIR = WORKSPACE / "memory/entities"
+EMAIL_HISTORY = WORKSPACE / "data/email-history.jsonl"
+EMAIL_CHUNK = 500  # history lines per transaction
+EMAIL_CATEGORIES = {"recruiter_reach", "interview_invite", "application_ack",
+                    "assessment", "rejection", "follow_up_needed"}
+# A job-related email only gets a person page if its sender looks like a
+# person: not a bulk/automated mailbox, and a 2-5 word name with none of the
+# words newsletters, platforms and companies sign with
+AUTOMATED_SENDER = re.compile(
+    r"^(no-?reply|do-?not-?reply|notify|notifications?|newsletters?|news|info|hello|help|"
+    r"support|team|system|jobalerts?|jobmessenger|careers|email|mailer)\b|"
+    r"@(\S+\.)?(jobalerts|mail|email|news|host|engage)\.|\bsender@", re.IGNORECASE)
+NON_PERSON_WORDS = {"daily", "weekly", "buzz", "news", "newsletter", "digest", "team", "careers",
+                    "jobs", "apply", "form", "course", "class", "clearance", "wisdom", "archive",
+                    "group", "bank", "solutions", "incorporated", "training", "recruitment",
+                    "notification", "notifications", "support", "alerts", "from"}
 
 sys.path.insert(0, str(WORKSPACE / "scripts"))
-import sqlite3
+import brain_chunks
+import brain_db
+import brain_queue
+import brain_vectors
+from brain_db import PageResolver, ensure_timeline_unique, insert_timeline_entries
 
 
 def get_db():
-    conn = sqlite3.connect(BRAIN_DB)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    conn = brain_db.get_db(BRAIN_DB)
+    ensure_timeline_unique(conn)
     return conn
 
 
-def find_or_create_page(cursor, title, entity_type, slug_suggestion="", frontmatter=None):
-    """Find existing page by slug or title, or create one."""
-    slug = slug_suggestion or f"{entity_type}/" + title.lower().replace(" ", "-").replace(",", "").replace("/", "-")
-
-    # Try exact slug
-    cursor.execute("SELECT id, slug FROM pages WHERE slug = ?", (slug,))
-    existing = cursor.fetchone()
-    if existing:
-        return dict(existing)["id"]
+def add_timeline_entry(cursor, page_id, date, source, summary, detail=""):
+    """Add timeline entry if not duplicate (UNIQUE index, no read-before-write)."""
+    inserted, _ = insert_timeline_entries(cursor, [(page_id, date, source, summary, detail)])
+    return inserted > 0
 
-    # Search by title
-    cursor.execute("SELECT id FROM pages WHERE title LIKE ?", (title,))
-    existing = cursor.fetchone()
-    if existing:
-        return dict(existing)["id"]
 
-    # Search by type + title prefix
-    cursor.execute("SELECT id FROM pages WHERE type = ? AND title LIKE ?", (entity_type, f"%{title[:20]}%"))
-    existing = cursor.fetchone()
-    if existing:
-        return dict(existing)["id"]
+def _decode_header(value):
+    """Decode MIME encoded-words (=?utf-8?B?...?=) in a header value."""
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
 
-    # Create new
-    import datetime
-    now = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    fm = json.dumps(frontmatter or {})
-    compiled = f"# {title}\n\n> [Auto-created by ingest]\n\n## State\n**Last Updated:** {now}\n**Status:** active\n\n---\n"
-    cursor.execute(
-        "INSERT INTO pages (slug, type, title, compiled_truth, timeline, frontmatter) VALUES (?, ?, ?, ?, ?, ?)",
-        (slug, entity_type, title, compiled, "", fm)
-    )
-    print(f"    + Created entity: {slug}")
-    return cursor.lastrowid
 
+def _email_record(line):
+    """Parsed email-history line as (sender_name, sender_email, date, subject, categories), or None."""
+    try:
+        email = json.loads(line)
+    except ValueError:
+        return None
+    subject = email.get("subject") or ""
+    categories = email.get("categories") or []
+    if not subject or not email.get("from") or not email.get("date"):
+        return None
+
+    # Only ingest job-related emails (the history has no Flagged bit)
+    if not (set(categories) & EMAIL_CATEGORIES or email.get("pipeline_match")):
+        return None
 
-def add_timeline_entry(cursor, page_id, date, source, summary, detail=""):
-    """Add timeline entry if not duplicate."""
-    cursor.execute(
-        "SELECT 1 FROM timeline_entries WHERE page_id=? AND date=? AND source=? AND summary=?",
-        (page_id, date, source, summary)
-    )
-    if not cursor.fetchone():
-        cursor.execute(
-            "INSERT INTO timeline_entries (page_id, date, source, summary, detail) VALUES (?, ?, ?, ?, ?)",
-            (page_id, date, source, summary, detail)
-        )
-        return True
-    return False
-
-
-def ingest_emails(conn, max_emails=50):
-    """Ingest recent flagged/important emails into knowledge brain."""
+    try:
+        date_clean = parsedate_to_datetime(email["date"]).strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+    subject = _decode_header(subject)
+    sender_name, sender_email = parseaddr(_decode_header(" ".join(email["from"].split())))
+    sender_name = re.sub(r"\s+via\s+\S+$", "", sender_name).strip()
+    return sender_name, sender_email, date_clean, subject, categories
+
+
+def _read_email_chunks(path, offset, chunk_size):
+    """Yield ([record, ...], end_offset) for complete lines after offset.
+
+    Lines are read one at a time from a binary handle, so memory stays at
+    one chunk; a trailing line without its newline is left for the next run.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = []
+        lines = 0
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            lines += 1
+            record = _email_record(raw.decode("utf-8", errors="replace"))
+            if record:
+                chunk.append(record)
+            if lines >= chunk_size:
+                yield chunk, offset
+                chunk, lines = [], 0
+        if lines:
+            yield chunk, offset
+
+
+def _history_identity(path):
+    """"inode:sha1(first line)" of the history file.
+
+    Stored with the byte offset: a different inode (file replaced) or first
+    line (rewritten in place) means the offset points into another file.
+    """
+    with open(path, "rb") as f:
+        first = f.readline()
+        ino = os.fstat(f.fileno()).st_ino
+    if not first.endswith(b"\n"):
+        first = b""
+    return f"{ino}:{hashlib.sha1(first).hexdigest()[:16]}"
+
+
+def _get_config(cursor, key, default=None):
+    cursor.execute("SELECT value FROM config WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    return row["value"] if row else default
+
+
+def _write(conn, intents, resolver=None, queue=False):
+    """Apply write intents in one transaction, or with queue=True enqueue them.
+
+    Returns brain_queue.Applier stats (applied) or {"queued": n}.
+    """
+    if queue:
+        return {"queued": brain_queue.enqueue(BRAIN_DB, intents)}
+    applier = brain_queue.Applier(conn.cursor(), resolver=resolver)
+    for intent in intents:
+        applier.apply(intent)
+    applier.flush()
+    conn.commit()
+    return applier.stats
+
+
+def _person_name(sender_name, sender_email):
+    """Sender's person name with any " - Company" suffix dropped, or None if not a person."""
+    name = re.split(r"\s+[-–—|]\s+", sender_name or "", maxsplit=1)[0].strip()
+    words = name.split()
+    if len(name) <= 5 or not 2 <= len(words) <= 5 or AUTOMATED_SENDER.search(sender_email or ""):
+        return None
+    if any(not w[0].isalpha() or w.lower().strip(".,") in NON_PERSON_WORDS for w in words):
+        return None
+    return name
+
+
+def _email_intents(records):
+    """Timeline intents for one chunk of email records (person pages by ref).
+
+    Senders that fail _person_name() get no page; the rest resolve by slug,
+    then title, through the Applier's PageResolver, so "Lee Abrahams - Proximie"
+    lands on the existing "Lee Abrahams" page.
+    """
+    intents = []
+    for sender_name, sender_email, date_clean, subject, categories in records:
+        sender_name = _person_name(sender_name, sender_email)
+        if not sender_name:
+            continue
+        slug_s = f"people/{sender_name.lower().replace(' ', '-').replace('.', '')}"
+
+        summary = f"Email: {subject[:80]}"
+        detail = f"From: {sender_email}\nCategories: {', '.join(categories)}" if categories else f"From: {sender_email}"
+
+        # Frontmatter status: raised once per page at flush, only if new entries landed
+        intents.append({"op": "timeline", "page": {"title": sender_name, "type": "person", "slug": slug_s},
+                        "date": date_clean, "source": f"email: {date_clean}", "summary": summary,
+                        "detail": detail, "max": ["last_updated", "last_email_date"]})
+    return intents
+
+
+def ingest_emails(conn, history_file=None, chunk_size=EMAIL_CHUNK, resolver=None, queue=False):
+    """Stream newly appended emails from data/email-history.jsonl into the brain.
+
+    Resumes from the byte offset checkpointed in config (email_history_offset),
+    unless the file's inode or first line no longer match the identity stored
+    with it (email_history_identity), or the file is shorter than the offset;
+    then it re-reads from the start. Each chunk's person pages, timeline rows and the advanced checkpoint
+    commit together, so an interrupted run picks up after the last chunk.
+    Each chunk is a list of write intents applied by brain_queue.Applier:
+    senders resolve by slug, then in memory (PageResolver); frontmatter
+    dates are collected per page and written once per chunk (json_set).
+
+    queue=True enqueues each chunk (checkpoint included) for the writer and
+    returns the number of entries queued. Until the writer has applied them
+    the stored offset lags, so a second run queues the same lines again;
+    the UNIQUE timeline index drops the repeats.
+    """
     cursor = conn.cursor()
-
-    # Check HIMAYALA email cache
-    cache_file = MEMORY_DIR / "email-cache.json"
-    if not cache_file.exists():
+    history_file = Path(history_file or EMAIL_HISTORY)
+    if not history_file.exists():
         return 0
 
-    import json
-    try:
-        emails = json.loads(cache_file.read_text())
-    except:
-        return 0
+    if not queue:
+        resolver = resolver or PageResolver(cursor)
+    offset = int(_get_config(cursor, "email_history_offset", 0))
+    identity = _history_identity(history_file)
+    stored_identity = _get_config(cursor, "email_history_identity")
+    if offset > history_file.stat().st_size:
+        print(f"    Email history shrank (offset {offset}); re-reading from the start")
+        offset = 0
+    elif offset and stored_identity not in (None, identity):
+        print(f"    Email history was replaced (offset {offset}); re-reading from the start")
+        offset = 0
 
     count = 0
-    for email in emails[:max_emails]:
-        subject = email.get("Subject", email.get("subject", ""))
-        sender_name = email.get("FromName", email.get("from_name", ""))
-        sender_email = email.get("From", email.get("from", ""))
-        date_str = email.get("date", email.get("Date", ""))[:10]
-        snippet = email.get("Snippet", email.get("snippet", ""))
-        flagged = email.get("Flagged", False)
-
-        if not date_str or not subject:
-            continue
-
-        # Only ingest flagged/important emails
-        if not flagged:
+    skipped = 0
+    for records, end_offset in _read_email_chunks(history_file, offset, chunk_size):
+        intents = _email_intents(records)
+        checkpoint = [{"op": "config", "key": "email_history_offset", "value": end_offset},
+                      {"op": "config", "key": "email_history_identity", "value": identity}]
+        result = _write(conn, intents + checkpoint, resolver, queue)
+        if queue:
+            count += len(intents)
             continue
+        count += result["timeline"]
+        skipped += result["timeline_skipped"]
 
-        # Extract date
-        if len(date_str) > 10:
-            date_clean = date_str[:10]
-        else:
-            date_clean = date_str
-
-        # Create/update person entity for sender
-        if sender_name and len(sender_name) > 5:
-            slug_s = f"people/{sender_name.lower().replace(' ', '-').replace('.', '')}"
-            person_id = find_or_create_page(cursor, sender_name, "person", slug_s)
-
-            summary = f"Email: {subject[:80]}"
-            detail = f"From: {sender_email}\nSnippet: {snippet[:200]}" if snippet else f"From: {sender_email}"
-
-            added = add_timeline_entry(cursor, person_id, date_clean, f"email: {date_clean}", summary, detail)
-            if added:
-                count += 1
-
-                # Update frontmatter status
-                cursor.execute("SELECT frontmatter FROM pages WHERE id = ?", (person_id,))
-                row = cursor.fetchone()
-                if row:
-                    try:
-                        fm = json.loads(row["frontmatter"])
-                        fm["last_updated"] = date_clean
-                        fm["last_email_date"] = date_clean
-                        cursor.execute("UPDATE pages SET frontmatter=?, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now') WHERE id = ?",
-                                      (json.dumps(fm), person_id))
-                    except:
-                        pass
-
+    if queue and count:
+        print(f"    Email timeline: {count} queued")
+    elif count or skipped:
+        print(f"    Email timeline: {count} inserted, {skipped} already present")
     return count
 
 
-def ingest_job_applications(conn):
+def ingest_job_applications(conn, resolver=None, queue=False):
     """Ingest active job applications from coordination pipeline."""
-    cursor = conn.cursor()
     pipeline_file = WORKSPACE / "coordination/pipeline.json"
 
     if not pipeline_file.exists():
@@ -161,7 +257,8 @@ def ingest_job_applications(conn):
     pipeline = json.loads(pipeline_file.read_text())
     applications = pipeline.get("applications", {}).get("active", [])
 
-    count = 0
+    intents = []
+    timeline_rows = 0
     for app in applications:
         company = app.get("company", "")
         title = app.get("title", "")
@@ -173,39 +270,42 @@ def ingest_job_applications(conn):
         if not company or not title:
             continue
 
-        # Create company entity
+        # Company entity
         slug_c = f"companies/{company.lower().replace(' ', '-').replace('—', '-').replace('/', '-')}"
-        company_id = find_or_create_page(cursor, company, "company", slug_c)
+        company_ref = {"title": company, "type": "company", "slug": slug_c}
+        intents.append({"op": "page", "page": company_ref})
 
-        # Create role entity
+        # Role entity
         slug_r = f"roles/{title.lower().replace(' ', '-')}—{company.lower().replace(' ', '-').replace('—', '-').replace('/', '-')}"[:120]
-        role_id = find_or_create_page(cursor, f"{title} — {company}", "role", slug_r,
-                                     frontmatter={
-                                         "date_applied": date_applied,
-                                         "status": status,
-                                         "notes": notes
-                                     })
+        role_ref = {"title": f"{title} — {company}", "type": "role", "slug": slug_r,
+                    "frontmatter": {
+                        "date_applied": date_applied,
+                        "status": status,
+                        "notes": notes
+                    }}
+        intents.append({"op": "page", "page": role_ref})
 
         # Timeline entry for role
         if date_applied:
-            summary = f"Applied: {title} at {company}"
-            added = add_timeline_entry(cursor, role_id, date_applied[:10], "pipeline", summary,
-                                      f"ID: {app_id}\nStatus: {status}\nNotes: {notes}")
-            if added:
-                count += 1
-
-        # Link company → role
-        if company_id and role_id:
-            cursor.execute(
-                "INSERT OR IGNORE INTO links (from_page_id, to_page_id, context) VALUES (?, ?, ?)",
-                (company_id, role_id, f"Company has opening: {title}")
-            )
-            cursor.execute(
-                "INSERT OR IGNORE INTO links (from_page_id, to_page_id, context) VALUES (?, ?, ?)",
-                (role_id, company_id, f"Role at: {company}")
-            )
-
-    return count
+            intents.append({"op": "timeline", "page": role_ref, "date": date_applied[:10], "source": "pipeline",
+                            "summary": f"Applied: {title} at {company}",
+                            "detail": f"ID: {app_id}\nStatus: {status}\nNotes: {notes}"})
+            timeline_rows += 1
+
+        # Link company → role, and back
+        intents.append({"op": "link", "from": company_ref, "to": role_ref,
+                        "context": f"Company has opening: {title}", "bidirectional": False})
+        intents.append({"op": "link", "from": role_ref, "to": company_ref,
+                        "context": f"Role at: {company}", "bidirectional": False})
+
+    result = _write(conn, intents, resolver, queue)
+    if queue:
+        if timeline_rows:
+            print(f"    Job timeline: {timeline_rows} queued")
+        return timeline_rows
+    if timeline_rows:
+        print(f"    Job timeline: {result['timeline']} inserted, {result['timeline_skipped']} already present")
+    return result["timeline"]
 
 
 def ingest_daily_notes(conn):
@@ -258,7 +358,10 @@ def show_status(conn):
 
 
 def main():
-    action = sys.argv[1] if len(sys.argv) > 1 else "status"
+    args = [a for a in sys.argv[1:] if a != "--queue"]
+    action = args[0] if args else "status"
+    queue = "--queue" in sys.argv
+    verb = "queued" if queue else "ingested"
 
     conn = get_db()
 
@@ -268,36 +371,32 @@ def main():
         import datetime
         print(f"\n🔄 Running ingestion pipeline at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
 
-        email_count = ingest_emails(conn)
-        print(f"  📧 Emails ingested: {email_count}")
+        # One page resolver for the whole run; both stages keep it current
+        resolver = None if queue else PageResolver(conn.cursor())
+        email_count = ingest_emails(conn, resolver=resolver, queue=queue)
+        print(f"  📧 Emails {verb}: {email_count}")
 
-        job_count = ingest_job_applications(conn)
-        print(f"  💼 Job applications ingested: {job_count}")
-
-        conn.commit()
+        job_count = ingest_job_applications(conn, resolver=resolver, queue=queue)
+        print(f"  💼 Job applications {verb}: {job_count}")
 
         # Log the ingest
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO ingest_log (source_type, source_ref, pages_updated, summary) VALUES (?, ?, ?, ?)",
-            ("pipeline", "automated", json.dumps([]), f"Emails: {email_count}, Jobs: {job_count}")
-        )
-        conn.commit()
-        print(f"\n✅ Pipeline complete")
+        _write(conn, [{"op": "log", "source_type": "pipeline", "source_ref": "automated", "pages_updated": [],
+                       "summary": f"Emails: {email_count}, Jobs: {job_count}"}], queue=queue)
+        print(f"\n✅ Pipeline complete" + (" (writes queued for the brain writer)" if queue else ""))
 
     elif action == "email":
-        count = ingest_emails(conn)
-        conn.commit()
-        print(f"  📧 Emails ingested: {count}")
+        count = ingest_emails(conn, queue=queue)
+        print(f"  📧 Emails {verb}: {count}")
     elif action == "jobs":
-        count = ingest_job_applications(conn)
-        conn.commit()
-        print(f"  💼 Jobs ingested: {count}")
-    elif action == "status":
-        show_status(conn)
+        count = ingest_job_applications(conn, queue=queue)
+        print(f"  💼 Jobs {verb}: {count}")
     else:
         print(__doc__)
 
+    if action in ("run", "email", "jobs") and not queue:
+        # Derived indexes follow the page writes (queued writes: the writer does this)
+        brain_chunks.sync(conn)
+        brain_vectors.refresh(conn, BRAIN_DB)
     conn.close()
 
 
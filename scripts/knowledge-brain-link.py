@@ -7,20 +7,33 @@ Usage:
   python3 scripts/knowledge-brain-link.py link companies/proximie roles/proximie-transformation-lead-uae "Proximie is hiring for this role"
   python3 scripts/knowledge-brain-link.py link people/lee-abrahams roles/proximie-transformation-lead-uae "Lee is handling this recruitment"
   python3 scripts/knowledge-brain-link.py link companies/proximie companies/network-international "Same sector: GCC FinTech/HealthTech"
+
+Bulk mode (one transaction for the whole file):
+  python3 scripts/knowledge-brain-link.py bulk links.jsonl     # {"from": ..., "to": ..., "context": ...} per line
+  python3 scripts/knowledge-brain-link.py bulk links.csv       # from,to,context (header optional)
+  some-export | python3 scripts/knowledge-brain-link.py bulk -  # stdin, JSONL or CSV
+  python3 scripts/knowledge-brain-link.py bulk links.csv --one-way
+
+Queued mode (append to the write queue and return; the brain writer,
+knowledge-brain.py writer, applies it and reports missing slugs):
+  python3 scripts/knowledge-brain-link.py bulk links.jsonl --queue
+  python3 scripts/knowledge-brain-link.py link people/lee-abrahams companies/proximie "Recruiter" --queue
 """
-import sqlite3
 import sys
 import os
+import csv
+import json
+
+import brain_db
+import brain_queue
+from brain_db import insert_links, resolve_slugs
 
 WORKSPACE = "/root/.openclaw/workspace"
 BRAIN_DB = os.environ.get("KNOWLEDGE_DB", f"{WORKSPACE}/knowledge.db")
 
 
 def get_db():
-    conn = sqlite3.connect(BRAIN_DB)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode = WAL")
-    return conn
+    return brain_db.get_db(BRAIN_DB)
 
 
 def link_entities(from_slug, to_slug, context, bidirectional=True):
@@ -70,14 +83,120 @@ def link_entities(from_slug, to_slug, context, bidirectional=True):
         print(f"  + Linked: {to_slug} → {from_slug}")
 
 
+def read_link_triples(lines):
+    """(from_slug, to_slug, context) triples from JSONL or CSV lines.
+
+    JSONL lines are objects ({"from", "to", "context"}) or arrays; anything
+    else is read as CSV with an optional from,to,context header.
+    """
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return []
+
+    if lines[0].lstrip()[0] in "{[":
+        triples = []
+        for n, line in enumerate(lines, 1):
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"  Warning: skipping line {n}: {e}")
+                continue
+            if isinstance(item, dict):
+                triple = (item.get("from") or item.get("from_slug"),
+                          item.get("to") or item.get("to_slug"),
+                          item.get("context") or "")
+            elif isinstance(item, list) and len(item) >= 2:
+                triple = (item[0], item[1], item[2] if len(item) > 2 else "")
+            else:
+                print(f"  Warning: skipping line {n}: expected an object or [from, to, context]")
+                continue
+            if triple[0] and triple[1]:
+                triples.append(triple)
+        return triples
+
+    rows = list(csv.reader(lines))
+    if rows and [c.strip().lower() for c in rows[0][:2]] in (["from", "to"], ["from_slug", "to_slug"]):
+        rows = rows[1:]
+    return [(r[0].strip(), r[1].strip(), r[2].strip() if len(r) > 2 else "")
+            for r in rows if len(r) >= 2 and r[0].strip() and r[1].strip()]
+
+
+def bulk_link(triples, bidirectional=True):
+    """Link many slug pairs: one slug lookup, one executemany, one commit.
+
+    Returns {"linked", "already_linked", "reverse_linked", "missing"}.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    ids = resolve_slugs(cursor, [s for f, t, _ in triples for s in (f, t)])
+
+    missing = sorted({s for f, t, _ in triples for s in (f, t) if s not in ids})
+    forward = [(ids[f], ids[t], c) for f, t, c in triples if f in ids and t in ids]
+    reverse = [(t, f, c) for f, t, c in forward] if bidirectional else []
+
+    linked, already = insert_links(cursor, forward)
+    reverse_linked, _ = insert_links(cursor, reverse)
+    conn.commit()
+    conn.close()
+
+    summary = {
+        "linked": linked,
+        "already_linked": already,
+        "reverse_linked": reverse_linked,
+        "missing": missing,
+    }
+    print(f"\n🔗 Bulk link: {len(triples)} pairs")
+    print(f"  + Linked:         {linked}" + (f" (+{reverse_linked} reverse)" if bidirectional else ""))
+    print(f"  ↺ Already linked: {already}")
+    print(f"  ✗ Missing slugs:  {len(missing)}")
+    for slug in missing:
+        print(f"    - {slug}")
+    return summary
+
+
+def queue_links(triples, bidirectional=True):
+    """Enqueue link intents for the brain writer; returns how many were queued."""
+    queued = brain_queue.enqueue(BRAIN_DB, [
+        {"op": "link", "from": f, "to": t, "context": c, "bidirectional": bidirectional}
+        for f, t, c in triples])
+    print(f"  📥 Queued {queued} link(s) for the brain writer")
+    return queued
+
+
 def main():
+    queue = "--queue" in sys.argv
+    sys.argv = [a for a in sys.argv if a != "--queue"]
+    if len(sys.argv) >= 2 and sys.argv[1] == "bulk":
+        args = [a for a in sys.argv[2:] if a != "--one-way"]
+        source = args[0] if args else "-"
+        if source == "-":
+            lines = sys.stdin.read().splitlines()
+        elif not os.path.exists(source):
+            print(f"ERROR: File not found: {source}")
+            sys.exit(1)
+        else:
+            with open(source, newline="") as f:
+                lines = f.read().splitlines()
+        triples = read_link_triples(lines)
+        if not triples:
+            print("No link pairs found in input.")
+            sys.exit(1)
+        if queue:
+            queue_links(triples, bidirectional="--one-way" not in sys.argv)
+        else:
+            bulk_link(triples, bidirectional="--one-way" not in sys.argv)
+        return
+
     if len(sys.argv) < 4 or sys.argv[1] != "link":
         print(__doc__)
         sys.exit(1)
 
     _, _, from_slug, to_slug, *rest = sys.argv
     context = rest[0] if rest else ""
-    link_entities(from_slug, to_slug, context)
+    if queue:
+        queue_links([(from_slug, to_slug, context)])
+    else:
+        link_entities(from_slug, to_slug, context)
 
 
 if __name__ == "__main__":
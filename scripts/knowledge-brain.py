@@ -9,23 +9,51 @@ Usage:
   python3 scripts/knowledge-brain.py init                       # create brain.db
   python3 scripts/knowledge-brain.py get people/lee-abrahams     # read entity
   python3 scripts/knowledge-brain.py search "Proximie"           # FTS5 search
-  python3 scripts/knowledge-brain.py query "what's new with Proximie?"  # ranked results
-  python3 scripts/knowledge-brain import entities               # import memory/entities/
+  python3 scripts/knowledge-brain.py query "what's new with Proximie?"  # ranked results (bm25 weights + recency)
+  python3 scripts/knowledge-brain.py query "Proximie" --weights 5,1,0.5 --half-life 30
+  python3 scripts/knowledge-brain import entities               # import memory/entities/ (changed files only)
+  python3 scripts/knowledge-brain.py import --force              # re-parse every entity file
+  python3 scripts/knowledge-brain.py import --force --workers 8  # parse on 8 processes (default: one per core)
+  python3 scripts/knowledge-brain.py watch                       # live sync of memory/entities (inotify, --poll fallback)
+  python3 scripts/knowledge-brain.py import --queue              # hand parsed files to the writer instead of writing
+  python3 scripts/knowledge-brain.py writer                      # single writer: apply queued intents in group commits
+  python3 scripts/knowledge-brain.py writer --once               # drain the queue once and exit (cron)
+  python3 scripts/knowledge-brain.py serve                       # resident query server (get/search/query/list/stats
+                                                                 # then answer through it; --no-server: run locally)
   python3 scripts/knowledge-brain.py list --type person          # list entities
   python3 scripts/knowledge-brain.py stats                       # brain stats
   python3 scripts/knowledge-brain.py maintain                    # lint + stale alerts
+  python3 scripts/knowledge-brain.py maintain --json             # same report as JSON (for cron agents)
+  python3 scripts/knowledge-brain.py query "who do I know in healthtech in Riyadh" --rank hybrid   # + local vectors
+  python3 scripts/knowledge-brain.py vectors                     # sync the vector index (--force: rebuild)
+  python3 scripts/knowledge-brain.py search "Open Threads" --chunks   # section/timeline-entry hits + parent slug
+  python3 scripts/knowledge-brain.py chunks                      # sync the chunk index (--force: re-chunk all)
+  python3 scripts/knowledge-brain.py optimize                    # compact the FTS index (--merge N: incremental)
+  python3 scripts/knowledge-brain.py neighbors people/lee-abrahams --depth 2   # linked pages, nearest first
+  python3 scripts/knowledge-brain.py path people/lee-abrahams --to roles/...    # shortest link chain
+  python3 scripts/knowledge-brain.py subgraph companies/proximie --json         # pages + links within N hops
 """
 import os
 import sys
 import json
+import math
 import re
-import sqlite3
 import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+
+import brain_chunks
+import brain_parse
+import brain_queue
+import brain_server
+import brain_vectors
+import brain_watch
+from brain_db import (BRAIN_DB, SLUG_BATCH, WORKSPACE, cache_get, cache_key, cache_put, cache_stats,
+                      ensure_query_cache, ensure_timeline_unique, get_db, insert_timeline_entries,
+                      migrate, PAGES_FTS_UPDATE_TRIGGER)
 
-WORKSPACE = Path("/root/.openclaw/workspace")
-BRAIN_DB = os.environ.get("KNOWLEDGE_DB", str(WORKSPACE / "knowledge.db"))
 ENTITIES_DIR = WORKSPACE / "memory/entities"
 
 TYPE_MAP = {
@@ -38,13 +66,17 @@ TYPE_MAP = {
 REVERSE_TYPE_MAP = {v: k for k, v in TYPE_MAP.items()}
 
 
-def get_db(path=BRAIN_DB):
-    """Open SQLite DB with WAL mode."""
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode = WAL")
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+# Imported entity files (change detection for incremental import)
+ENTITY_FILES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entity_files (
+        path          TEXT    PRIMARY KEY,   -- relative to entities_dir
+        slug          TEXT    NOT NULL,
+        mtime_ns      INTEGER NOT NULL,
+        size          INTEGER NOT NULL,
+        content_hash  TEXT    NOT NULL,
+        imported_at   TEXT    NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+    )
+"""
 
 
 def init_db(path=BRAIN_DB):
@@ -84,12 +116,7 @@ def init_db(path=BRAIN_DB):
         INSERT INTO page_fts(page_fts, rowid, title, compiled_truth, timeline)
         VALUES ('delete', old.id, old.title, old.compiled_truth, old.timeline);
     END;
-    CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE ON pages BEGIN
-        INSERT INTO page_fts(page_fts, rowid, title, compiled_truth, timeline)
-        VALUES ('delete', old.id, old.title, old.compiled_truth, old.timeline);
-        INSERT INTO page_fts(rowid, title, compiled_truth, timeline)
-        VALUES (new.id, new.title, new.compiled_truth, new.timeline);
-    END;
+""" + PAGES_FTS_UPDATE_TRIGGER + """
 
     -- Structured timeline entries
     CREATE TABLE IF NOT EXISTS timeline_entries (
@@ -145,74 +172,127 @@ def init_db(path=BRAIN_DB):
     INSERT OR IGNORE INTO config (key, value) VALUES ('chunk_strategy', 'section');
     INSERT OR IGNORE INTO config (key, value) VALUES ('entities_dir', 'memory/entities');
     """)
+    conn.execute(ENTITY_FILES_SCHEMA)
+    ensure_timeline_unique(conn)
+    ensure_query_cache(conn)
+    migrate(conn)
 
     conn.commit()
     conn.close()
     print(f"✅ brain.db initialized at {path}")
 
 
-def parse_entity_file(content, path=None):
-    """Parse a markdown entity file: frontmatter + compiled_truth + timeline."""
-    frontmatter = {}
-    compiled_truth = ""
-    timeline = ""
+ENTITY_FILE_UPSERT = """
+    INSERT INTO entity_files (path, slug, mtime_ns, size, content_hash)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(path) DO UPDATE SET slug=excluded.slug, mtime_ns=excluded.mtime_ns,
+        size=excluded.size, content_hash=excluded.content_hash,
+        imported_at=strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+"""
 
-    # Extract YAML frontmatter
-    fm_match = re.match(r'^<!--[\s\S]*?-->\s*\n', content)
-    if fm_match:
-        comment = fm_match.group(0)
-    else:
-        comment = ""
+# Below this many files to parse, the pool's start-up costs more than it saves
+PARALLEL_MIN_FILES = 64
 
-    body = content[len(comment):].strip() if comment else content
 
-    # Split on the horizontal rule --- that separates compiled_truth from timeline
-    hr_match = re.search(r'\n---\n', body)
-    if hr_match:
-        compiled_truth = body[:hr_match.start()].strip()
-        timeline = body[hr_match.end():].strip()
+def _parse_files(jobs, workers):
+    """brain_parse.parse_file over jobs, in order; a process pool for big batches."""
+    if workers > 1 and len(jobs) >= PARALLEL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(brain_parse.parse_file, jobs,
+                                chunksize=max(1, len(jobs) // (workers * 8)))
     else:
-        compiled_truth = body.strip()
-        timeline = ""
-
-    # Extract title from first # heading
-    title_match = re.search(r'^#\s+(.+)$', compiled_truth, re.MULTILINE)
-    title = title_match.group(1) if title_match else (path.stem if path else "Unknown")
-
-    # Extract State section for structured fields
-    state_match = re.search(r'## State\n([\s\S]*?)(?=###|\n---|\Z)', compiled_truth)
-    state_text = state_match.group(1) if state_match else ""
-
-    for key in ['Last Updated', 'Status', 'Relationship', 'Priority', 'Fit Score',
-                'Date Applied', 'Applied Via', 'Location', 'Company', 'Industry',
-                'Relationship Type']:
-        match = re.search(rf'\*\*{key}:\*\*\s*(.+)', state_text)
-        if match:
-            frontmatter[key.lower().replace(' ', '_')] = match.group(1).strip()
-
-    # Extract open threads for frontmatter
-    threads = re.findall(r'- \[ \]\s*(.*)', body)
-    if threads:
-        frontmatter['open_threads'] = threads
-
-    return {
-        "title": title,
-        "compiled_truth": compiled_truth,
-        "timeline": timeline,
-        "frontmatter": frontmatter,
-    }
+        yield from map(brain_parse.parse_file, jobs)
 
 
-def import_entities(db_path=BRAIN_DB):
-    """Import all entity files from memory/entities/."""
+def _entity_file_info(rel_path):
+    """(slug, entity_type) for "people/x.md", or None if it is not an entity file."""
+    type_dir, _, name = rel_path.partition("/")
+    if (type_dir not in TYPE_MAP or "/" in name or not name.endswith(".md")
+            or name.startswith(".") or name == "TEMPLATE.md"):
+        return None
+    return f"{type_dir}/{name[:-3]}", TYPE_MAP[type_dir]
+
+
+def _apply_entity_file(cursor, rel_path, slug, entity_type, mtime_ns, size, content_hash, parsed):
+    """Write one read entity file; returns (status, page id, timeline inserted, skipped).
+
+    status is "unchanged" (parsed None, or every field equal; page id None),
+    "updated" or "created". The file's stat and hash are recorded either way.
+    """
+    cursor.execute(ENTITY_FILE_UPSERT, (rel_path, slug, mtime_ns, size, content_hash))
+    if parsed is None:
+        # Touched but identical: the new stat is remembered, the page skipped
+        return "unchanged", None, 0, 0
+
+    frontmatter_json = parsed["frontmatter_json"]
+    cursor.execute("SELECT id, title, compiled_truth, timeline, frontmatter FROM pages WHERE slug = ?", (slug,))
+    existing = cursor.fetchone()
+
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    if existing and (existing["title"], existing["compiled_truth"], existing["timeline"],
+                     existing["frontmatter"]) == (parsed["title"], parsed["compiled_truth"],
+                                                  parsed["timeline"], frontmatter_json):
+        return "unchanged", None, 0, 0
+    elif existing:
+        cursor.execute("""
+            UPDATE pages SET title=?, compiled_truth=?, timeline=?,
+                   frontmatter=?, updated_at=? WHERE slug=?
+        """, (parsed["title"], parsed["compiled_truth"],
+               parsed["timeline"], frontmatter_json, now, slug))
+        page_id = existing["id"]
+        status = "updated"
+        print(f"  ↻ Updated: {slug}")
+    else:
+        cursor.execute("""
+            INSERT INTO pages (slug, type, title, compiled_truth, timeline, frontmatter)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (slug, entity_type, parsed["title"],
+               parsed["compiled_truth"], parsed["timeline"], frontmatter_json))
+        page_id = cursor.lastrowid
+        status = "created"
+        print(f"  + Created: {slug}")
+
+    # Timeline entries were parsed with the file; the UNIQUE index drops
+    # ones already present
+    inserted = skipped = 0
+    if parsed["entries"]:
+        inserted, skipped = insert_timeline_entries(
+            cursor, [(page_id, date, source, summary, '') for date, source, summary in parsed["entries"]])
+    return status, page_id, inserted, skipped
+
+
+def import_entities(db_path=BRAIN_DB, force=False, workers=None, queue=False):
+    """Import entity files from memory/entities/, skipping unchanged ones.
+
+    Each file's mtime, size and content hash are recorded in entity_files.
+    A file whose mtime+size match is not even read; one whose hash matches
+    only gets its stat refreshed. Pages are UPDATEd (firing the FTS trigger
+    and bumping updated_at) only when a parsed field actually differs, so
+    re-importing an unchanged tree does zero writes. force=True re-parses
+    every file but still skips identical pages.
+
+    Reading, hashing and parsing fan out over `workers` processes (default:
+    one per core) once there are PARALLEL_MIN_FILES to parse; all writes
+    stay in this process, in one transaction. queue=True only reads the DB
+    and hands the parsed files to the writer (entity_file intents, see
+    brain_queue) instead.
+    """
     if not ENTITIES_DIR.exists():
         print(f"ERROR: {ENTITIES_DIR} not found. Run 'init' first.")
         return
 
     conn = get_db(db_path)
     cursor = conn.cursor()
+    cursor.execute(ENTITY_FILES_SCHEMA)
+    ensure_timeline_unique(conn)
+
+    known = {r["path"]: r for r in cursor.execute(
+        "SELECT path, mtime_ns, size, content_hash FROM entity_files")}
 
     total = 0
+    unchanged = 0
+    candidates = []
     for type_dir, entity_type in TYPE_MAP.items():
         dir_path = ENTITIES_DIR / type_dir
         if not dir_path.exists():
@@ -220,104 +300,491 @@ def import_entities(db_path=BRAIN_DB):
         for md_file in sorted(dir_path.glob("*.md")):
             if md_file.name == "TEMPLATE.md":
                 continue
-            content = md_file.read_text()
-            parsed = parse_entity_file(content, md_file)
-            slug = f"{type_dir}/{md_file.stem}"
-
-            cursor.execute("SELECT id FROM pages WHERE slug = ?", (slug,))
-            existing = cursor.fetchone()
-
-            now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-            frontmatter_json = json.dumps(parsed["frontmatter"])
-
-            if existing:
-                cursor.execute("""
-                    UPDATE pages SET title=?, compiled_truth=?, timeline=?,
-                           frontmatter=?, updated_at=? WHERE slug=?
-                """, (parsed["title"], parsed["compiled_truth"],
-                       parsed["timeline"], frontmatter_json, now, slug))
-                print(f"  ↻ Updated: {slug}")
-            else:
-                cursor.execute("""
-                    INSERT INTO pages (slug, type, title, compiled_truth, timeline, frontmatter)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (slug, entity_type, parsed["title"],
-                       parsed["compiled_truth"], parsed["timeline"], frontmatter_json))
-                print(f"  + Created: {slug}")
-
             total += 1
+            rel_path = f"{type_dir}/{md_file.name}"
+            st = md_file.stat()
+            rec = known.get(rel_path)
+            if not force and rec and rec["mtime_ns"] == st.st_mtime_ns and rec["size"] == st.st_size:
+                unchanged += 1
+                continue
+            candidates.append((rel_path, f"{type_dir}/{md_file.stem}", entity_type, st, md_file,
+                               rec["content_hash"] if rec else None))
+
+    jobs = [(str(md_file), known_hash, force) for *_, md_file, known_hash in candidates]
+    results = _parse_files(jobs, workers or os.cpu_count() or 1)
+
+    if queue:
+        conn.close()
+        intents = [_entity_file_intent(rel_path, slug, entity_type, st, content_hash, parsed)
+                   for (rel_path, slug, entity_type, st, _, _), (_, content_hash, parsed)
+                   in zip(candidates, results)]
+        changed = [i["slug"] for i in intents if i["parsed"] is not None]
+        if changed:
+            intents.append({"op": "log", "source_type": "import", "source_ref": str(ENTITIES_DIR),
+                            "pages_updated": changed,
+                            "summary": f"Queued {len(changed)} changed of {total} entities from {ENTITIES_DIR}"})
+        brain_queue.enqueue(db_path, intents)
+        print(f"\n📥 Queued {len(changed)} changed entities for the writer "
+              f"({unchanged + len(candidates) - len(changed)} unchanged)")
+        return
 
-            # Also parse and insert timeline entries
-            if parsed["timeline"]:
-                _parse_and_insert_timeline(cursor, conn, slug, parsed["timeline"])
+    changed_slugs = []
+    timeline_inserted = timeline_skipped = 0
+    for (rel_path, slug, entity_type, st, _, _), (_, content_hash, parsed) in zip(candidates, results):
+        status, _, inserted, skipped = _apply_entity_file(cursor, rel_path, slug, entity_type, st.st_mtime_ns,
+                                                          st.st_size, content_hash, parsed)
+        if status == "unchanged":
+            unchanged += 1
+            continue
+        changed_slugs.append(slug)
+        timeline_inserted += inserted
+        timeline_skipped += skipped
 
+    if changed_slugs:
+        # Log the import
+        cursor.execute("""
+            INSERT INTO ingest_log (source_type, source_ref, pages_updated, summary)
+            VALUES (?, ?, ?, ?)
+        """, ("import", str(ENTITIES_DIR), json.dumps(changed_slugs),
+              f"Imported {len(changed_slugs)} changed of {total} entities from {ENTITIES_DIR}"))
     conn.commit()
+    if changed_slugs:
+        update_indexes(conn, db_path)
+    conn.close()
+    print(f"\n✅ Imported {len(changed_slugs)} changed entities into brain.db ({unchanged} unchanged)")
+    if changed_slugs:
+        print(f"   Timeline entries: {timeline_inserted} inserted, {timeline_skipped} already present")
+
+
+def update_indexes(conn, db_path):
+    """Bring derived indexes up to date after page writes (write paths only).
 
-    # Log the import
-    cursor.execute("""
-        INSERT INTO ingest_log (source_type, source_ref, pages_updated, summary)
-        VALUES (?, ?, ?, ?)
-    """, ("import", str(ENTITIES_DIR), json.dumps([f"{d}/{f.stem}" for d in TYPE_MAP for f in (ENTITIES_DIR / d).glob("*.md") if f.name != "TEMPLATE.md"]),
-          f"Imported {total} entities from {ENTITIES_DIR}"))
+    Queries read these indexes as they are; import, watch, ingest and the
+    queue writer keep them current. The vector index is only synced once
+    `vectors` has built it.
+    """
+    brain_chunks.sync(conn)
+    brain_vectors.refresh(conn, db_path)
+
+
+def _entity_file_intent(rel_path, slug, entity_type, st, content_hash, parsed):
+    """entity_file write intent for one read file (applied by _queue_entity_file)."""
+    if parsed is not None:
+        parsed = {k: parsed[k] for k in ("title", "compiled_truth", "timeline", "frontmatter_json", "entries")}
+    return {"op": "entity_file", "path": rel_path, "slug": slug, "type": entity_type,
+            "mtime_ns": st.st_mtime_ns, "size": st.st_size, "content_hash": content_hash, "parsed": parsed}
+
+
+def _queue_entity_file(applier, intent):
+    status, page_id, inserted, skipped = _apply_entity_file(
+        applier.cursor, intent["path"], intent["slug"], intent["type"], intent["mtime_ns"],
+        intent["size"], intent["content_hash"], intent["parsed"])
+    if page_id is not None:
+        applier.page_written(page_id, intent["slug"], intent["type"], intent["parsed"]["title"])
+    applier.stats[status] = applier.stats.get(status, 0) + 1
+    applier.stats["timeline"] += inserted
+    applier.stats["timeline_skipped"] += skipped
+
+
+# Write-queue ops beyond brain_queue's own (see writer)
+QUEUE_OPS = {"entity_file": _queue_entity_file}
+
+
+def writer(db_path=BRAIN_DB, once=False):
+    """Drain db_path's write queue (brain_queue) until interrupted, or once."""
+    conn = get_db(db_path)
+    conn.execute(ENTITY_FILES_SCHEMA)
+    ensure_timeline_unique(conn)
     conn.commit()
     conn.close()
-    print(f"\n✅ Imported {total} entities into brain.db")
+    return brain_queue.run_writer(db_path, QUEUE_OPS, once=once,
+                                  on_idle=lambda conn: update_indexes(conn, db_path))
 
 
-def _parse_and_insert_timeline(cursor, conn, slug, timeline_text):
-    """Parse timeline markdown entries and insert as structured rows."""
-    cursor.execute("SELECT id FROM pages WHERE slug = ?", (slug,))
-    page = cursor.fetchone()
-    if not page:
-        return
-    page_id = page["id"]
+# watch: files per write transaction (a bulk copy commits in steps)
+WATCH_BATCH = 100
+
 
-    # Pattern: - **YYYY-MM-DD** | Source — Summary
-    for match in re.finditer(r'-\s+\*\*(\d{4}-\d{2}-\d{2})\*\*\s*\|\s*([^\—]+)\s*[—\-]\s*(.+)', timeline_text):
-        date, source, summary = match.group(1), match.group(2).strip(), match.group(3).strip()
+def sync_entity_paths(conn, rel_paths):
+    """Bring specific entity files (paths relative to ENTITIES_DIR) into the brain.
+
+    Present files are re-imported like import_entities does. A tracked file
+    that is gone deletes its page (links, tags and timeline cascade) unless
+    an untracked file in the same batch has the same content hash: that is a
+    rename, and the page is re-slugged in place so its id, links and
+    timeline survive. Pages not backed by a file (ingest-created) are never
+    touched. Commits every WATCH_BATCH files; returns counts per outcome.
+    """
+    cursor = conn.cursor()
+    cursor.execute(ENTITY_FILES_SCHEMA)
+    ensure_timeline_unique(conn)
+
+    paths = sorted(p for p in set(rel_paths) if _entity_file_info(p))
+    known = {}
+    for i in range(0, len(paths), SLUG_BATCH):
+        chunk = paths[i:i + SLUG_BATCH]
+        known.update({r["path"]: r for r in cursor.execute(
+            f"SELECT path, slug, mtime_ns, size, content_hash FROM entity_files "
+            f"WHERE path IN ({','.join('?' * len(chunk))})", chunk)})
+
+    present, gone = [], []
+    for rel_path in paths:
+        try:
+            present.append((rel_path, (ENTITIES_DIR / rel_path).stat()))
+        except FileNotFoundError:
+            if rel_path in known:
+                gone.append(rel_path)
+
+    counts = {"created": 0, "updated": 0, "renamed": 0, "deleted": 0, "unchanged": 0}
+    changed_slugs = []
+    parsed_files = {}
+    for rel_path, st in present:
+        rec = known.get(rel_path)
+        if rec and rec["mtime_ns"] == st.st_mtime_ns and rec["size"] == st.st_size:
+            counts["unchanged"] += 1
+            continue
+        try:
+            _, content_hash, parsed = brain_parse.parse_file(
+                (str(ENTITIES_DIR / rel_path), rec["content_hash"] if rec else None, False))
+        except FileNotFoundError:
+            continue   # removed since the stat; the next batch sees the delete
+        parsed_files[rel_path] = (st, content_hash, parsed)
+
+    # Renames: a vanished file whose content reappears under an untracked path
+    new_by_hash = {}
+    for rel_path, (_, content_hash, _) in parsed_files.items():
+        if rel_path not in known:
+            new_by_hash.setdefault(content_hash, []).append(rel_path)
+    for old_path in list(gone):
+        targets = new_by_hash.get(known[old_path]["content_hash"])
+        if not targets:
+            continue
+        new_path = targets.pop(0)
+        new_slug, new_type = _entity_file_info(new_path)
+        if cursor.execute("SELECT 1 FROM pages WHERE slug = ?", (new_slug,)).fetchone():
+            continue   # target slug taken: plain delete + import
+        old_slug = known[old_path]["slug"]
+        cursor.execute("UPDATE pages SET slug = ?, type = ? WHERE slug = ?", (new_slug, new_type, old_slug))
+        cursor.execute("DELETE FROM entity_files WHERE path = ?", (old_path,))
+        gone.remove(old_path)
+        counts["renamed"] += 1
+        changed_slugs.append(new_slug)
+        print(f"  ⇢ Renamed: {old_slug} → {new_slug}")
+
+    for old_path in gone:
+        slug = known[old_path]["slug"]
+        cursor.execute("DELETE FROM pages WHERE slug = ?", (slug,))
+        cursor.execute("DELETE FROM entity_files WHERE path = ?", (old_path,))
+        counts["deleted"] += 1
+        changed_slugs.append(slug)
+        print(f"  - Deleted: {slug}")
+
+    for n, (rel_path, (st, content_hash, parsed)) in enumerate(parsed_files.items(), 1):
+        slug, entity_type = _entity_file_info(rel_path)
+        status, _, _, _ = _apply_entity_file(cursor, rel_path, slug, entity_type, st.st_mtime_ns, st.st_size,
+                                             content_hash, parsed)
+        counts[status] += 1
+        if status != "unchanged":
+            changed_slugs.append(slug)
+        if n % WATCH_BATCH == 0:
+            conn.commit()
+
+    if changed_slugs:
         cursor.execute("""
-            SELECT id FROM timeline_entries WHERE page_id=? AND date=? AND source=? AND summary=?
-        """, (page_id, date, source, summary))
-        if not cursor.fetchone():
-            cursor.execute("""
-                INSERT INTO timeline_entries (page_id, date, source, summary, detail)
-                VALUES (?, ?, ?, ?, '')
-            """, (page_id, date, source, summary))
+            INSERT INTO ingest_log (source_type, source_ref, pages_updated, summary)
+            VALUES (?, ?, ?, ?)
+        """, ("watch", str(ENTITIES_DIR), json.dumps(changed_slugs),
+              ", ".join(f"{n} {k}" for k, n in counts.items() if n and k != "unchanged")))
+    conn.commit()
+    return counts
+
 
+def _tracked_entity_paths(conn):
+    """Every entity file on disk plus every one entity_files remembers."""
+    conn.execute(ENTITY_FILES_SCHEMA)
+    paths = {r[0] for r in conn.execute("SELECT path FROM entity_files")}
+    for type_dir in TYPE_MAP:
+        if (ENTITIES_DIR / type_dir).is_dir():
+            paths.update(f"{type_dir}/{f.name}" for f in (ENTITIES_DIR / type_dir).glob("*.md"))
+    return paths
 
-def search(query, limit=10, db_path=BRAIN_DB):
-    """FTS5 full-text search."""
+
+def watch_entities(db_path=BRAIN_DB, debounce=brain_watch.DEBOUNCE, poll=False):
+    """Keep the brain in step with memory/entities until interrupted.
+
+    Starts with one stat-only pass over every known and on-disk file (to
+    catch up on changes made while not watching), then re-imports only the
+    files named by filesystem events (inotify, or polling with poll=True),
+    in debounced batches. An inotify queue overflow falls back to another
+    full pass.
+    """
+    if not ENTITIES_DIR.exists():
+        print(f"ERROR: {ENTITIES_DIR} not found. Run 'init' first.")
+        return
+
+    source = brain_watch.open_source(ENTITIES_DIR, poll=poll)
     conn = get_db(db_path)
-    cursor = conn.cursor()
+    counts = sync_entity_paths(conn, _tracked_entity_paths(conn))
+    update_indexes(conn, db_path)
+    print(f"👀 Watching {ENTITIES_DIR} ({type(source).__name__}, debounce {debounce}s) — "
+          + ", ".join(f"{n} {k}" for k, n in counts.items() if n))
+    try:
+        for paths, rescan in brain_watch.batches(source, debounce=debounce):
+            if rescan:
+                paths = _tracked_entity_paths(conn)
+            counts = sync_entity_paths(conn, paths)
+            changed = {k: n for k, n in counts.items() if n and k != "unchanged"}
+            if changed:
+                update_indexes(conn, db_path)
+                stamp = datetime.now().strftime("%H:%M:%S")
+                print(f"  [{stamp}] " + ", ".join(f"{n} {k}" for k, n in changed.items()))
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching.")
+    finally:
+        source.close()
+        conn.close()
 
-    cursor.execute("""
-        SELECT p.slug, p.type, p.title,
-               page_fts.rank as score
-        FROM page_fts
-        JOIN pages p ON p.id = page_fts.rowid
-        WHERE page_fts MATCH ?
-        ORDER BY page_fts.rank
-        LIMIT ?
-    """, (query, limit))
 
-    results = cursor.fetchall()
+# Chunk hits: one row per matching section / timeline entry, with its page
+CHUNK_SEARCH_SQL = """
+    SELECT p.slug, p.type, p.title, c.kind, c.heading,
+           snippet(chunk_fts, 1, '**', '**', '…', 16) AS snippet,
+           chunk_fts.rank AS score
+    FROM chunk_fts
+    JOIN chunks c ON c.id = chunk_fts.rowid
+    JOIN pages p ON p.id = c.page_id
+    WHERE chunk_fts MATCH ?
+    ORDER BY chunk_fts.rank
+    LIMIT ?
+"""
+
+
+def _warn_chunk_backlog(cursor):
+    """Chunk searches read the index as last synced; say so when it lags."""
+    pending = cursor.execute("SELECT COUNT(*) FROM chunk_dirty").fetchone()[0]
+    if pending:
+        print(f"⚠️  {pending} page(s) not yet re-chunked — sync with: knowledge-brain.py chunks")
+
+
+def _print_chunk_hit(r):
+    heading = f" § {r['heading']}" if r["heading"] else ""
+    snippet = (r["snippet"] or "").replace("\n", " ")
+    print(f"  [{r['type']}] {r['title']}{heading} → {r['slug']}  (score: {r['score']:.2f})")
+    print(f"    {snippet}\n")
+
+
+def search(query, limit=10, db_path=BRAIN_DB, use_cache=True, chunks=False):
+    """FTS5 full-text search (cached until the brain's generation changes).
+
+    chunks=True searches the chunk index instead and returns one hit per
+    matching section or timeline entry, with its parent page's slug.
+    """
+    conn = get_db(db_path)
+    cursor = conn.cursor()
+    ensure_query_cache(conn)
+
+    key = cache_key("search_chunks" if chunks else "search", query, limit)
+    results = cache_get(conn, key) if use_cache else None
+    cached = results is not None
+    if not cached and chunks:
+        _warn_chunk_backlog(cursor)
+        cursor.execute(CHUNK_SEARCH_SQL, (query, limit))
+        results = [dict(r) for r in cursor.fetchall()]
+        if use_cache:
+            cache_put(conn, key, results)
+    elif not cached:
+        cursor.execute("""
+            SELECT p.slug, p.type, p.title,
+                   page_fts.rank as score
+            FROM page_fts
+            JOIN pages p ON p.id = page_fts.rowid
+            WHERE page_fts MATCH ?
+            ORDER BY page_fts.rank
+            LIMIT ?
+        """, (query, limit))
+        results = [dict(r) for r in cursor.fetchall()]
+        if use_cache:
+            cache_put(conn, key, results)
     conn.close()
 
     if not results:
         print(f"No results for: {query}")
         return []
 
-    print(f"\n🔍 Search: '{query}'\n")
+    print(f"\n🔍 Search: '{query}'{' (cached)' if cached else ''}\n")
+    if chunks:
+        for r in results:
+            _print_chunk_hit(r)
+        return results
     for r in results:
         print(f"  [{r['type']}] {r['title']}")
         print(f"    → {r['slug']}  (score: {r['score']:.2f})")
     return results
 
 
-def query_semantic(question, limit=5, db_path=BRAIN_DB):
-    """Search + ranked results. For now, FTS5 with question-as-query."""
+# query ranking: bm25 column weights (title, compiled_truth, timeline) and
+# recency blend (share of the score that decays with age, decay half-life)
+QUERY_WEIGHTS = (5.0, 1.0, 0.5)
+RECENCY_WEIGHT = 0.3
+RECENCY_HALF_LIFE_DAYS = 30.0
+VECTOR_WEIGHT = 0.5   # hybrid: share of the score from vector similarity
+CHUNK_WEIGHTS = (2.0, 1.0)   # --chunks: bm25 weights (heading, content)
+
+
+WEIGHTED_QUERY_SQL = """
+    WITH hits AS (
+        SELECT rowid AS page_id,
+               -bm25(page_fts, :w_title, :w_truth, :w_timeline) AS relevance,
+               snippet(page_fts, -1, '**', '**', '…', 16) AS snippet
+        FROM page_fts
+        WHERE page_fts MATCH :q
+    ),
+    scored AS (
+        SELECT p.id AS page_id, p.slug, p.type, p.title, h.snippet, h.relevance,
+               julianday('now') - MAX(
+                   julianday(p.updated_at),
+                   COALESCE((SELECT julianday(MAX(t.date)) FROM timeline_entries t
+                             WHERE t.page_id = p.id), 0)
+               ) AS age_days
+        FROM hits h
+        JOIN pages p ON p.id = h.page_id
+    )
+    SELECT page_id, slug, type, title, snippet, relevance, age_days,
+           relevance * ((1.0 - :rw) + :rw / (1.0 + MAX(age_days, 0) / :half_life)) AS score
+    FROM scored
+    ORDER BY score DESC
+    LIMIT :limit
+"""
+
+
+# Weighted ranking over chunks. A timeline entry's age is its own date (the
+# chunk heading); sections age with their page.
+CHUNK_QUERY_SQL = """
+    WITH hits AS (
+        SELECT rowid AS chunk_id,
+               -bm25(chunk_fts, :w_heading, :w_content) AS relevance,
+               snippet(chunk_fts, 1, '**', '**', '…', 16) AS snippet
+        FROM chunk_fts
+        WHERE chunk_fts MATCH :q
+    ),
+    scored AS (
+        SELECT p.slug, p.type, p.title, c.kind, c.heading, h.snippet, h.relevance,
+               julianday('now') - COALESCE(CASE WHEN c.kind = 'timeline' THEN julianday(c.heading) END,
+                                           julianday(p.updated_at)) AS age_days
+        FROM hits h
+        JOIN chunks c ON c.id = h.chunk_id
+        JOIN pages p ON p.id = c.page_id
+    )
+    SELECT slug, type, title, kind, heading, snippet, relevance, age_days,
+           relevance * ((1.0 - :rw) + :rw / (1.0 + MAX(age_days, 0) / :half_life)) AS score
+    FROM scored
+    ORDER BY score DESC
+    LIMIT :limit
+"""
+
+
+def _weighted_chunks(cursor, query_str, limit, weights, recency_weight, half_life_days):
+    if not query_str:
+        return []
+    w_heading, w_content = weights
+    cursor.execute(CHUNK_QUERY_SQL, {
+        "q": query_str, "w_heading": w_heading, "w_content": w_content,
+        "rw": recency_weight, "half_life": half_life_days, "limit": limit})
+    return [dict(r) for r in cursor.fetchall()]
+
+
+def _weighted_fts(cursor, query_str, limit, weights, recency_weight, half_life_days):
+    """bm25 column weights blended with recency, one SQL statement."""
+    if not query_str:
+        return []
+    w_title, w_truth, w_timeline = weights
+    cursor.execute(WEIGHTED_QUERY_SQL, {
+        "q": query_str, "w_title": w_title, "w_truth": w_truth, "w_timeline": w_timeline,
+        "rw": recency_weight, "half_life": half_life_days, "limit": limit})
+    return [dict(r) for r in cursor.fetchall()]
+
+
+def _vector_ranked(conn, db_path, question, query_str, limit, rank, weights,
+                   recency_weight, half_life_days, vector_weight):
+    """Pages ranked by vector similarity, optionally blended with weighted FTS.
+
+    Read-only: uses the vector index as the write paths last left it.
+    """
+    if not brain_vectors.vector_path(db_path).exists():
+        print("⚠️  No vector index yet — build it with: knowledge-brain.py vectors")
+    pool = limit * 4
+    vector = {}
+    for page_id, section, similarity in brain_vectors.top_k(conn, db_path, question, pool):
+        if page_id not in vector:   # best section first
+            vector[page_id] = (similarity, section)
+
+    fts = {}
+    if rank == "hybrid":
+        fts = {r["page_id"]: r for r in _weighted_fts(conn.cursor(), query_str, pool, weights,
+                                                      recency_weight, half_life_days)}
+    top_fts = max((r["score"] for r in fts.values()), default=0) or 1.0
+    fts_weight = 1.0 - vector_weight if rank == "hybrid" else 0.0
+
+    missing = [pid for pid in vector if pid not in fts]
+    pages = {r["id"]: dict(r) for r in conn.execute(
+        f"SELECT id, slug, type, title FROM pages WHERE id IN ({','.join('?' * len(missing))})",
+        missing)} if missing else {}
+
+    results = []
+    for page_id in set(vector) | set(fts):
+        similarity, section = vector.get(page_id, (0.0, None))
+        row = fts.get(page_id) or pages.get(page_id)
+        if not row:
+            continue
+        fts_score = fts[page_id]["score"] / top_fts if page_id in fts else 0.0
+        results.append({
+            "slug": row["slug"], "type": row["type"], "title": row["title"],
+            "snippet": row.get("snippet") or (f"§ {section}" if section else None),
+            "section": section,
+            "vector_score": similarity,
+            "fts_score": fts_score,
+            "score": fts_weight * fts_score + (1.0 - fts_weight) * similarity,
+        })
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results[:limit]
+
+
+def _truth_previews(conn, slugs):
+    """slug → first 200 chars of compiled_truth, for hits without a snippet."""
+    previews = {}
+    for i in range(0, len(slugs), SLUG_BATCH):
+        batch = slugs[i:i + SLUG_BATCH]
+        previews.update(conn.execute(
+            f"SELECT slug, substr(compiled_truth, 1, 200) FROM pages WHERE slug IN ({','.join('?' * len(batch))})",
+            batch).fetchall())
+    return previews
+
+
+def query_semantic(question, limit=5, db_path=BRAIN_DB, rank="weighted",
+                   weights=QUERY_WEIGHTS, recency_weight=RECENCY_WEIGHT,
+                   half_life_days=RECENCY_HALF_LIFE_DAYS, use_cache=True,
+                   vector_weight=VECTOR_WEIGHT, chunks=False):
+    """Search + ranked results, FTS5 with question-as-query.
+
+    rank="weighted" scores each hit in one SQL statement:
+      relevance = -bm25(page_fts, w_title, w_truth, w_timeline)
+      recency   = 1 / (1 + age_days / half_life), age from the later of
+                  updated_at and the page's latest timeline entry
+      score     = relevance * ((1 - recency_weight) + recency_weight * recency)
+    and returns an FTS5 snippet() around the hit. rank="fts" is the plain
+    page_fts.rank ordering. rank="vector" ranks pages by their best section's
+    cosine similarity in the local vector index (brain_vectors); "hybrid"
+    blends that with the weighted FTS score (normalized to the top hit):
+      score = (1 - vector_weight) * fts / max(fts) + vector_weight * cosine
+    chunks=True ranks sections and timeline entries instead of pages (fts or
+    weighted, with CHUNK_WEIGHTS for heading/content; a timeline entry's
+    recency is its own date). Results are cached until the brain's
+    generation changes; cached rows carry the slug, score and snippet, not
+    the page body, which is read only to preview hits without a snippet.
+    """
     conn = get_db(db_path)
     cursor = conn.cursor()
+    ensure_query_cache(conn)
 
     # Extract key terms from the question for FTS5
     stop_words = {"what", "who", "when", "where", "how", "why", "is", "are", "the", "a", "an",
@@ -329,28 +796,61 @@ def query_semantic(question, limit=5, db_path=BRAIN_DB):
 
     query_str = " OR ".join(terms[:10])
 
-    cursor.execute("""
-        SELECT p.slug, p.type, p.title, p.compiled_truth,
-               page_fts.rank as score
-        FROM page_fts
-        JOIN pages p ON p.id = page_fts.rowid
-        WHERE page_fts MATCH ?
-        ORDER BY page_fts.rank
-        LIMIT ?
-    """, (query_str, limit))
-
-    results = cursor.fetchall()
+    # Key on the case-folded terms each ranker actually uses; vector ranks
+    # embed the whole question, not just the FTS terms
+    key_text = query_str
+    if rank in ("vector", "hybrid"):
+        key_text += " | " + " ".join(sorted(brain_vectors.terms(question)))
+    key = cache_key("query_chunks" if chunks else "query", key_text, limit, rank, weights,
+                    recency_weight, half_life_days, vector_weight)
+    results = cache_get(conn, key) if use_cache else None
+    cached = results is not None
+    if not cached and chunks:
+        _warn_chunk_backlog(cursor)
+        if rank == "fts":
+            cursor.execute(CHUNK_SEARCH_SQL, (query_str, limit))
+            results = [dict(r) for r in cursor.fetchall()]
+        else:
+            results = _weighted_chunks(cursor, query_str, limit, CHUNK_WEIGHTS,
+                                       recency_weight, half_life_days)
+        if use_cache:
+            cache_put(conn, key, results)
+    elif not cached:
+        if rank == "fts":
+            cursor.execute("""
+                SELECT p.slug, p.type, p.title,
+                       page_fts.rank as score,
+                       snippet(page_fts, -1, '**', '**', '…', 16) as snippet
+                FROM page_fts
+                JOIN pages p ON p.id = page_fts.rowid
+                WHERE page_fts MATCH ?
+                ORDER BY page_fts.rank
+                LIMIT ?
+            """, (query_str, limit))
+            results = [dict(r) for r in cursor.fetchall()]
+        elif rank == "weighted":
+            results = _weighted_fts(cursor, query_str, limit, weights, recency_weight, half_life_days)
+        else:
+            results = _vector_ranked(conn, db_path, question, query_str, limit, rank, weights,
+                                     recency_weight, half_life_days, vector_weight)
+        if use_cache:
+            cache_put(conn, key, results)
+    previews = {} if chunks else _truth_previews(conn, [r["slug"] for r in results if not r["snippet"]])
     conn.close()
 
     if not results:
         print(f"No results for: {question}\nTerms used: {query_str}")
         return []
 
-    print(f"\n❓ Query: '{question}'\n")
+    print(f"\n❓ Query: '{question}'{' (cached)' if cached else ''}\n")
+    if chunks:
+        for r in results:
+            _print_chunk_hit(r)
+        return results
     for r in results:
-        snippet = r['compiled_truth'][:200].replace('\n', ' ')
-        print(f"  [{r['type']}] {r['title']} → {r['slug']}")
-        print(f"    {snippet}...\n")
+        snippet = (r['snippet'] or previews.get(r['slug'], '')).replace('\n', ' ')
+        print(f"  [{r['type']}] {r['title']} → {r['slug']}  (score: {r['score']:.2f})")
+        print(f"    {snippet}\n")
     return results
 
 
@@ -404,6 +904,160 @@ def list_entities(entity_type=None, tag=None, limit=50, db_path=BRAIN_DB):
     return results
 
 
+# ── Graph traversal ──────────────────────────────────────────────────────────
+# Links are walked as an undirected graph (recruiter → company → role) with
+# recursive CTEs, so a multi-hop question is one query, not one per hop.
+# Edges come from the materialized adjacency cache; use_cache=False walks
+# links directly (both indexes per hop).
+GRAPH_MAX_DEPTH = 4
+ADJACENCY_EDGES = "SELECT page_id AS a, neighbor_id AS b FROM adjacency"
+LINK_EDGES = ("SELECT from_page_id AS a, to_page_id AS b FROM links "
+              "UNION SELECT to_page_id, from_page_id FROM links")
+
+# Pages within :depth hops, with the hop count and the page it was reached from
+WALK_SQL = """
+    WITH RECURSIVE
+    edges(a, b) AS NOT MATERIALIZED ({edges}),
+    walk(id, depth, via) AS (
+        SELECT id, 0, NULL FROM pages WHERE slug = :slug
+        UNION
+        SELECT e.b, w.depth + 1, w.id FROM walk w JOIN edges e ON e.a = w.id
+        WHERE w.depth < :depth
+    ),
+    reached AS (
+        SELECT id, MIN(depth) AS depth, via FROM walk GROUP BY id
+    )
+"""
+
+NEIGHBORS_SQL = WALK_SQL + """
+    SELECT r.depth, p.slug, p.type, p.title, v.slug AS via,
+           COALESCE((SELECT context FROM links WHERE from_page_id = r.via AND to_page_id = r.id),
+                    (SELECT context FROM links WHERE from_page_id = r.id AND to_page_id = r.via)) AS context
+    FROM reached r
+    JOIN pages p ON p.id = r.id
+    LEFT JOIN pages v ON v.id = r.via
+    WHERE r.depth > 0
+    ORDER BY r.depth, p.type, p.title
+    LIMIT :limit
+"""
+
+# Nodes and the links among them, as one result set (kind = node | edge)
+SUBGRAPH_SQL = WALK_SQL + """
+    SELECT 'node' AS kind, r.depth, p.slug, p.type, p.title, NULL AS target, NULL AS context
+    FROM reached r JOIN pages p ON p.id = r.id
+    UNION ALL
+    SELECT 'edge', NULL, f.slug, NULL, NULL, t.slug, l.context
+    FROM reached rf
+    CROSS JOIN links l ON l.from_page_id = rf.id
+    JOIN reached rt ON rt.id = l.to_page_id
+    JOIN pages f ON f.id = l.from_page_id
+    JOIN pages t ON t.id = l.to_page_id
+"""
+
+# Shortest simple path, breadth-first: the queue is ordered by depth and the
+# outer LIMIT stops the walk at the first arrival.
+PATH_SQL = """
+    WITH RECURSIVE
+    edges(a, b) AS NOT MATERIALIZED ({edges}),
+    target(id) AS (SELECT id FROM pages WHERE slug = :target),
+    walk(id, depth, trail) AS (
+        SELECT id, 0, ',' || id || ',' FROM pages WHERE slug = :slug
+        UNION ALL
+        SELECT e.b, w.depth + 1, w.trail || e.b || ','
+        FROM walk w JOIN edges e ON e.a = w.id
+        WHERE w.depth < :depth
+          AND w.id != (SELECT id FROM target)
+          AND instr(w.trail, ',' || e.b || ',') = 0
+        ORDER BY 2
+    )
+    SELECT trail FROM walk WHERE id = (SELECT id FROM target) LIMIT 1
+"""
+
+
+def _graph_edges(use_cache):
+    return ADJACENCY_EDGES if use_cache else LINK_EDGES
+
+
+def _clamp_depth(depth):
+    return max(1, min(int(depth), GRAPH_MAX_DEPTH))
+
+
+def neighbors(slug, depth=1, limit=50, db_path=BRAIN_DB, use_cache=True, as_json=False):
+    """Pages within `depth` hops of slug, nearest first."""
+    depth = _clamp_depth(depth)
+    conn = get_db(db_path)
+    rows = [dict(r) for r in conn.execute(NEIGHBORS_SQL.format(edges=_graph_edges(use_cache)),
+                                          {"slug": slug, "depth": depth, "limit": limit})]
+    conn.close()
+
+    if as_json:
+        print(json.dumps(rows, indent=2))
+        return rows
+    if not rows:
+        print(f"No neighbors within {depth} hop(s) of {slug}.")
+        return rows
+    print(f"\n🔗 Neighbors of {slug} (≤ {depth} hops)\n")
+    for r in rows:
+        via = f" via {r['via']}" if r["depth"] > 1 else ""
+        context = f" — {r['context']}" if r["context"] else ""
+        print(f"  {r['depth']}. [{r['type']}] {r['title']} → {r['slug']}{via}{context}")
+    return rows
+
+
+def find_path(from_slug, to_slug, max_depth=GRAPH_MAX_DEPTH, db_path=BRAIN_DB, use_cache=True, as_json=False):
+    """Shortest chain of pages linking from_slug to to_slug (list of page dicts)."""
+    conn = get_db(db_path)
+    row = conn.execute(PATH_SQL.format(edges=_graph_edges(use_cache)),
+                       {"slug": from_slug, "target": to_slug, "depth": _clamp_depth(max_depth)}).fetchone()
+    chain = []
+    if row:
+        ids = [int(i) for i in row["trail"].strip(",").split(",")]
+        pages = {r["id"]: dict(r) for r in conn.execute(
+            f"SELECT id, slug, type, title FROM pages WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        chain = [pages[i] for i in ids]
+    conn.close()
+
+    if as_json:
+        print(json.dumps(chain, indent=2))
+        return chain
+    if not chain:
+        print(f"No path from {from_slug} to {to_slug} within {_clamp_depth(max_depth)} hops.")
+        return chain
+    print(f"\n🧭 Path ({len(chain) - 1} hop(s))\n")
+    print("  " + "\n    → ".join(f"[{p['type']}] {p['title']} ({p['slug']})" for p in chain))
+    return chain
+
+
+def subgraph(slug, depth=2, db_path=BRAIN_DB, use_cache=True, as_json=False):
+    """Pages within `depth` hops of slug plus the links among them."""
+    depth = _clamp_depth(depth)
+    conn = get_db(db_path)
+    graph = {"nodes": [], "edges": []}
+    for r in conn.execute(SUBGRAPH_SQL.format(edges=_graph_edges(use_cache)), {"slug": slug, "depth": depth}):
+        if r["kind"] == "node":
+            graph["nodes"].append({"slug": r["slug"], "type": r["type"], "title": r["title"], "depth": r["depth"]})
+        else:
+            graph["edges"].append({"from": r["slug"], "to": r["target"], "context": r["context"]})
+    conn.close()
+    graph["nodes"].sort(key=lambda n: (n["depth"], n["type"], n["title"]))
+
+    if as_json:
+        print(json.dumps(graph, indent=2))
+        return graph
+    if not graph["nodes"]:
+        print(f"Entity not found: {slug}")
+        return graph
+    print(f"\n🕸️  Subgraph around {slug} (≤ {depth} hops): "
+          f"{len(graph['nodes'])} pages, {len(graph['edges'])} links\n")
+    for n in graph["nodes"]:
+        print(f"  {n['depth']}. [{n['type']}] {n['title']} → {n['slug']}")
+    print()
+    for e in graph["edges"]:
+        context = f"  ({e['context']})" if e["context"] else ""
+        print(f"  {e['from']} → {e['to']}{context}")
+    return graph
+
+
 def stats(db_path=BRAIN_DB):
     """Brain statistics."""
     conn = get_db(db_path)
@@ -432,6 +1086,9 @@ def stats(db_path=BRAIN_DB):
     cursor.execute("SELECT source_type, source_ref, timestamp, summary FROM ingest_log ORDER BY id DESC LIMIT 1")
     latest_ingest = cursor.fetchone()
 
+    ensure_query_cache(conn)
+    cache = cache_stats(conn)
+
     conn.close()
 
     print(f"\n🧠 Knowledge Brain Stats")
@@ -443,76 +1100,119 @@ def stats(db_path=BRAIN_DB):
     print(f"  Links:            {link_count}")
     print(f"  Tags:             {tag_count}")
     print(f"  DB size:          {size_str}")
+    print(f"  Query cache:      {cache['entries']} entries, {cache['hits']} hits / {cache['misses']} misses "
+          f"({cache['hit_rate']:.0%}), generation {cache['generation']}")
     if latest_ingest:
         print(f"\n  Latest ingest: {latest_ingest[0]} — {latest_ingest[2][:16]} — {latest_ingest[3][:80]}")
 
 
-def maintain(db_path=BRAIN_DB):
-    """Lint checks: stale alerts, contradictions, timeline gaps, orphans."""
-    conn = get_db(db_path)
-    cursor = conn.cursor()
-    now = datetime.now(timezone.utc)
-    alerts = []
+STALE_DAYS = 30
+GAP_DAYS = 14
+
+# All four lint checks in one statement. Day counts come from julianday(),
+# orphan detection is an anti-join against the indexed links columns, and
+# open threads are unpacked with json_each only for pages whose indexed
+# open_thread_count says they have any.
+MAINTAIN_SQL = """
+    WITH
+    stale AS (
+        SELECT 1 AS section, id, slug, type, title, updated_at AS ref,
+               CAST(julianday('now') - julianday(updated_at) AS INTEGER) AS days, NULL AS detail
+        FROM pages
+        WHERE updated_at < strftime('%Y-%m-%dT%H:%M:%SZ', 'now', :stale)
+    ),
+    orphans AS (
+        SELECT 2, p.id, p.slug, p.type, p.title, NULL, NULL, NULL
+        FROM pages p
+        WHERE p.type != 'source'
+          AND NOT EXISTS (SELECT 1 FROM links WHERE to_page_id = p.id)
+          AND NOT EXISTS (SELECT 1 FROM links WHERE from_page_id = p.id)
+    ),
+    gaps AS (
+        SELECT 3, p.id, p.slug, p.type, p.title, t.last_activity,
+               CAST(julianday('now') - julianday(t.last_activity) AS INTEGER), NULL
+        FROM (SELECT page_id, MAX(date) AS last_activity FROM timeline_entries GROUP BY page_id) t
+        JOIN pages p ON p.id = t.page_id
+        WHERE t.last_activity < date('now', :gap)
+    ),
+    threads AS (
+        SELECT 4, p.id, p.slug, p.type, p.title, NULL, NULL, j.value
+        FROM pages p, json_each(p.frontmatter, '$.open_threads') j
+        WHERE p.open_thread_count > 0
+    )
+    SELECT * FROM stale
+    UNION ALL SELECT * FROM orphans
+    UNION ALL SELECT * FROM gaps
+    UNION ALL SELECT * FROM threads
+    ORDER BY section, ref, id
+"""
 
-    # 1. Stale entities — not updated in 30+ days
-    stale_threshold = (now - timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
-    cursor.execute("""
-        SELECT slug, type, title, updated_at FROM pages
-        WHERE updated_at < ? ORDER BY updated_at ASC
-    """, (stale_threshold,))
-    stale = cursor.fetchall()
-    if stale:
-        alerts.append(f"\n⚠️  STALE ENTITIES ({len(stale)}):")
-        for s in stale:
-            days = (now - datetime.strptime(s["updated_at"][:19], "%Y-%m-%dT%H:%M:%S")).days
-            alerts.append(f"  [{s['type']}] {s['title']} — stale {days}d ({s['updated_at'][:10]})")
-
-    # 2. Orphan entities — no inbound links
-    cursor.execute("""
-        SELECT slug, type, title FROM pages
-        WHERE id NOT IN (SELECT to_page_id FROM links)
-        AND id NOT IN (SELECT from_page_id FROM links)
-        AND type != 'source'
-    """)
-    orphans = cursor.fetchall()
-    if orphans:
-        alerts.append(f"\n🔗 ORPHAN ENTITIES ({len(orphans)}):")
-        for o in orphans:
-            alerts.append(f"  [{o['type']}] {o['title']} — no inbound or outbound links")
 
-    # 3. Timeline gaps — entities with activity >14 days ago, no recent activity
-    gap_threshold = (now - timedelta(days=14)).strftime("%Y-%m-%d")
-    cursor.execute("""
-        SELECT DISTINCT p.slug, p.type, p.title, MAX(t.date) as last_activity
-        FROM pages p
-        JOIN timeline_entries t ON t.page_id = p.id
-        GROUP BY p.id
-        HAVING last_activity < ?
-        ORDER BY last_activity ASC
-    """, (gap_threshold,))
-    gaps = cursor.fetchall()
-    if gaps:
-        alerts.append(f"\n📅 TIMELINE GAPS ({len(gaps)}):")
-        for g in gaps:
+def maintenance_report(conn, stale_days=STALE_DAYS, gap_days=GAP_DAYS):
+    """Structured lint findings: stale, orphans, gaps, open_threads."""
+    report = {
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "stale": [],
+        "orphans": [],
+        "gaps": [],
+        "open_threads": [],
+    }
+    threads_by_page = {}
+    for r in conn.execute(MAINTAIN_SQL, {"stale": f"-{stale_days} days", "gap": f"-{gap_days} days"}):
+        entity = {"slug": r["slug"], "type": r["type"], "title": r["title"]}
+        if r["section"] == 1:
+            report["stale"].append({**entity, "updated_at": r["ref"], "days": r["days"]})
+        elif r["section"] == 2:
+            report["orphans"].append(entity)
+        elif r["section"] == 3:
+            report["gaps"].append({**entity, "last_activity": r["ref"], "days": r["days"]})
+        else:
+            if r["id"] not in threads_by_page:
+                threads_by_page[r["id"]] = {**entity, "threads": []}
+                report["open_threads"].append(threads_by_page[r["id"]])
+            threads_by_page[r["id"]]["threads"].append(r["detail"])
+    report["counts"] = {k: len(report[k]) for k in ("stale", "orphans", "gaps", "open_threads")}
+    return report
+
+
+def format_maintenance(report):
+    """Emoji text lines for a maintenance report (empty when all clear)."""
+    alerts = []
+    if report["stale"]:
+        alerts.append(f"\n⚠️  STALE ENTITIES ({len(report['stale'])}):")
+        for s in report["stale"]:
+            alerts.append(f"  [{s['type']}] {s['title']} — stale {s['days']}d ({s['updated_at'][:10]})")
+    if report["orphans"]:
+        alerts.append(f"\n🔗 ORPHAN ENTITIES ({len(report['orphans'])}):")
+        for o in report["orphans"]:
+            alerts.append(f"  [{o['type']}] {o['title']} — no inbound or outbound links")
+    if report["gaps"]:
+        alerts.append(f"\n📅 TIMELINE GAPS ({len(report['gaps'])}):")
+        for g in report["gaps"]:
             alerts.append(f"  [{g['type']}] {g['title']} — last activity: {g['last_activity']}")
+    if report["open_threads"]:
+        alerts.append(f"\n📋 OPEN THREADS ({len(report['open_threads'])}):")
+        for p in report["open_threads"]:
+            for t in p["threads"]:
+                alerts.append(f"  [{p['type']}] {p['title']}: {t}")
+    return alerts
+
 
-    # 4. Entities with open threads but no recent activity
-    # (check frontmatter for open_threads)
-    cursor.execute("SELECT slug, type, title, frontmatter FROM pages")
-    all_pages = cursor.fetchall()
-    open_threads = []
-    for p in all_pages:
-        fm = json.loads(p["frontmatter"]) if p["frontmatter"] else {}
-        if fm.get("open_threads"):
-            open_threads.append((p["slug"], p["type"], p["title"], fm["open_threads"]))
-    if open_threads:
-        alerts.append(f"\n📋 OPEN THREADS ({len(open_threads)}):")
-        for slug, typ, title, threads in open_threads:
-            for t in threads:
-                alerts.append(f"  [{typ}] {title}: {t}")
+def maintain(db_path=BRAIN_DB, as_json=False):
+    """Lint checks: stale alerts, timeline gaps, orphans, open threads.
 
+    Prints the emoji report, or the structured report as JSON for cron
+    agents (as_json=True). Returns the report dict either way.
+    """
+    conn = get_db(db_path)
+    report = maintenance_report(conn)
     conn.close()
 
+    if as_json:
+        print(json.dumps(report, indent=2))
+        return report
+
+    alerts = format_maintenance(report)
     if not alerts:
         print("✅ All clear. No maintenance issues found.")
     else:
@@ -520,51 +1220,231 @@ def maintain(db_path=BRAIN_DB):
         for a in alerts:
             print(a)
 
-    return alerts
+    return report
+
+
+def index_vectors(db_path=BRAIN_DB, force=False):
+    """Sync (or with force, rebuild) the local vector index and report its size."""
+    conn = get_db(db_path)
+    embedded = brain_vectors.sync(conn, db_path, force=force)
+    sections = conn.execute("SELECT COUNT(*) FROM vector_rows WHERE page_id IS NOT NULL").fetchone()[0]
+    conn.close()
+    path = brain_vectors.vector_path(db_path)
+    size = path.stat().st_size if path.exists() else 0
+    print(f"✅ Vector index: {embedded} section(s) embedded, {sections} indexed "
+          f"({size / (1024 * 1024):.1f} MB at {path})"
+          + ("" if brain_vectors.np is not None else " — numpy not installed, queries use the slow path"))
+    return {"embedded": embedded, "sections": sections}
+
+
+def index_chunks(db_path=BRAIN_DB, force=False):
+    """Sync (or with force, re-chunk) the chunk index and report its size."""
+    conn = get_db(db_path)
+    result = brain_chunks.sync(conn, force=force)
+    counts = dict(conn.execute("SELECT kind, COUNT(*) FROM chunks GROUP BY kind").fetchall())
+    strategy = brain_chunks.chunk_strategy(conn)
+    conn.close()
+    print(f"✅ Chunk index ({strategy}): {result['pages']} page(s) re-chunked, "
+          f"{result['written']} chunk(s) written, {result['deleted']} removed")
+    print("  " + ", ".join(f"{kind}: {n}" for kind, n in sorted(counts.items())) if counts else "  (empty)")
+    return {**result, "chunks": counts}
+
+
+def _fts_segments(conn):
+    return conn.execute("SELECT COUNT(DISTINCT segid) FROM page_fts_idx").fetchone()[0]
+
+
+def optimize_fts(db_path=BRAIN_DB, merge=None):
+    """Compact the FTS index: full 'optimize', or an incremental 'merge' of N pages.
+
+    Run periodically (cron) so segment count, and with it query cost, stays
+    flat as ingest adds rows. Also refreshes planner stats (PRAGMA optimize).
+    """
+    conn = get_db(db_path)
+    before = _fts_segments(conn)
+    if merge:
+        conn.execute("INSERT INTO page_fts(page_fts, rank) VALUES ('merge', ?)", (merge,))
+    else:
+        conn.execute("INSERT INTO page_fts(page_fts) VALUES ('optimize')")
+    conn.commit()
+    after = _fts_segments(conn)
+    conn.execute("PRAGMA optimize")
+    conn.close()
+
+    print(f"✅ FTS {'merge' if merge else 'optimize'}: {before} → {after} segment(s)")
+    return {"segments_before": before, "segments_after": after}
+
+
+def _briefing(db_path):
+    """knowledge-brain-briefing.generate_briefing() against db_path."""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(
+        "knowledge_brain_briefing", Path(__file__).with_name("knowledge-brain-briefing.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.BRAIN_DB = db_path
+    return module.generate_briefing
+
+
+# Read-only actions the resident server answers (see serve)
+SERVED = {
+    "get": get_entity,
+    "search": search,
+    "query": query_semantic,
+    "list": list_entities,
+    "stats": stats,
+}
+
+
+def serve(db_path=BRAIN_DB):
+    """Run the resident query server for db_path (until interrupted)."""
+    handlers = {op: functools.partial(fn, db_path=db_path) for op, fn in SERVED.items()}
+    handlers["briefing"] = _briefing(db_path)
+    return brain_server.serve(db_path, handlers)
+
+
+def _run(op, db_path, use_server=True, **kwargs):
+    """Run a SERVED action through the server when one is up, else locally."""
+    if use_server:
+        response = brain_server.request(db_path, op, kwargs)
+        if response is not None:
+            sys.stdout.write(response.get("output", ""))
+            if not response["ok"]:
+                print(f"ERROR: {response['error']}")
+                sys.exit(1)
+            return response["result"]
+    return SERVED[op](db_path=db_path, **kwargs)
+
+
+def _positive_float(value):
+    """argparse type: a finite float > 0 (e.g. --half-life, used as a divisor)."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a number: {value!r}")
+    if not (math.isfinite(number) and number > 0):
+        raise argparse.ArgumentTypeError(f"must be a positive number: {value!r}")
+    return number
+
+
+def _bm25_weights(value):
+    """argparse type: exactly three finite non-negative floats, "title,truth,timeline"."""
+    try:
+        weights = tuple(float(w) for w in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"weights must be numbers: {value!r}")
+    if len(weights) != 3:
+        raise argparse.ArgumentTypeError(f"needs three values title,truth,timeline: {value!r}")
+    if not all(math.isfinite(w) and w >= 0 for w in weights):
+        raise argparse.ArgumentTypeError(f"weights must be non-negative: {value!r}")
+    return weights
 
 
 def main():
     parser = argparse.ArgumentParser(description="Knowledge Brain CLI")
     parser.add_argument("action", nargs="?", default="stats",
                        choices=["init", "get", "search", "query", "list",
-                               "import", "stats", "maintain"])
+                               "import", "watch", "serve", "writer", "stats", "maintain", "optimize", "vectors", "chunks",
+                               "neighbors", "path", "subgraph"])
     parser.add_argument("--slug", "-s", help="Entity slug")
     parser.add_argument("query_pos", nargs="?", help="Query string (positional for search)")
     parser.add_argument("--type", "-t", help="Entity type filter")
     parser.add_argument("--tag", help="Tag filter")
     parser.add_argument("--limit", "-l", type=int, default=50, help="Result limit")
     parser.add_argument("--db", help="Path to brain.db")
+    parser.add_argument("--force", action="store_true",
+                        help="import: re-parse files even if unchanged; vectors: full rebuild; "
+                             "chunks: re-chunk every page")
+    parser.add_argument("--workers", type=int,
+                        help="import: parser processes (default: one per core; 1 = no pool)")
+    parser.add_argument("--queue", action="store_true",
+                        help="import: enqueue writes for the writer instead of writing the DB")
+    parser.add_argument("--once", action="store_true", help="writer: drain the queue once, then exit")
+    parser.add_argument("--no-server", action="store_true",
+                        help="get/search/query/list/stats: run locally even if a server is up")
+    parser.add_argument("--poll", action="store_true", help="watch: poll file stats instead of inotify")
+    parser.add_argument("--debounce", type=float, default=brain_watch.DEBOUNCE,
+                        help="watch: seconds of quiet before a batch is imported")
+    parser.add_argument("--rank", choices=["weighted", "fts", "vector", "hybrid"], default="weighted",
+                        help="query: bm25 column weights + recency (weighted), plain FTS rank, "
+                             "local vector similarity, or vector blended with weighted FTS (hybrid)")
+    parser.add_argument("--chunks", action="store_true",
+                        help="search/query: hits per section / timeline entry (config chunk_strategy)")
+    parser.add_argument("--vector-weight", type=float, default=VECTOR_WEIGHT,
+                        help="query --rank hybrid: share of the score from vector similarity")
+    parser.add_argument("--weights", type=_bm25_weights, default=QUERY_WEIGHTS,
+                        help="query: bm25 weights title,truth,timeline (e.g. 5,1,0.5)")
+    parser.add_argument("--half-life", type=_positive_float, default=RECENCY_HALF_LIFE_DAYS,
+                        help="query: recency half-life in days")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="search/query: bypass the result cache; graph: walk links, not adjacency")
+    parser.add_argument("--json", action="store_true", help="maintain/graph: print results as JSON")
+    parser.add_argument("--merge", type=int, help="optimize: incremental merge of N pages instead of a full optimize")
+    parser.add_argument("--to", help="path: target entity slug")
+    parser.add_argument("--depth", "-d", type=int, help=f"graph: max hops (capped at {GRAPH_MAX_DEPTH})")
 
     args = parser.parse_args()
     db_path = args.db or BRAIN_DB
+    use_server = not args.no_server
 
     if args.action == "init":
         init_db(db_path)
     elif args.action == "import":
-        import_entities(db_path)
+        import_entities(db_path, force=args.force, workers=args.workers, queue=args.queue)
+    elif args.action == "serve":
+        sys.exit(serve(db_path))
+    elif args.action == "writer":
+        sys.exit(writer(db_path, once=args.once))
+    elif args.action == "watch":
+        watch_entities(db_path, debounce=args.debounce, poll=args.poll)
     elif args.action == "get":
         if not args.slug:
             print("Usage: knowledge-brain.py get --slug people/lee-abrahams")
             sys.exit(1)
-        get_entity(args.slug, db_path)
+        _run("get", db_path, use_server, slug=args.slug)
     elif args.action == "search":
         q = args.query_pos or args.query or ""
         if not q:
             print("Usage: knowledge-brain.py search 'Proximie'")
             sys.exit(1)
-        search(q, args.limit, db_path)
+        _run("search", db_path, use_server, query=q, limit=args.limit,
+             use_cache=not args.no_cache, chunks=args.chunks)
     elif args.action == "query":
         q = args.query_pos or ""
         if not q:
             print("Usage: knowledge-brain.py query 'job applications status'")
             sys.exit(1)
-        query_semantic(q, args.limit, db_path)
+        if args.chunks and args.rank in ("vector", "hybrid"):
+            print("--chunks ranks with --rank weighted or fts")
+            sys.exit(1)
+        _run("query", db_path, use_server, question=q, limit=args.limit, rank=args.rank,
+             weights=args.weights, half_life_days=args.half_life, use_cache=not args.no_cache,
+             vector_weight=args.vector_weight, chunks=args.chunks)
     elif args.action == "list":
-        list_entities(args.type, args.tag, args.limit, db_path)
+        _run("list", db_path, use_server, entity_type=args.type, tag=args.tag, limit=args.limit)
     elif args.action == "stats":
-        stats(db_path)
+        _run("stats", db_path, use_server)
     elif args.action == "maintain":
-        maintain(db_path)
+        maintain(db_path, as_json=args.json)
+    elif args.action == "optimize":
+        optimize_fts(db_path, merge=args.merge)
+    elif args.action == "vectors":
+        index_vectors(db_path, force=args.force)
+    elif args.action == "chunks":
+        index_chunks(db_path, force=args.force)
+    elif args.action in ("neighbors", "path", "subgraph"):
+        slug = args.slug or args.query_pos
+        if not slug or (args.action == "path" and not args.to):
+            print(f"Usage: knowledge-brain.py {args.action} --slug people/lee-abrahams"
+                  + (" --to roles/proximie-transformation-lead-uae" if args.action == "path" else ""))
+            sys.exit(1)
+        if args.action == "neighbors":
+            neighbors(slug, args.depth or 1, args.limit, db_path, use_cache=not args.no_cache, as_json=args.json)
+        elif args.action == "path":
+            find_path(slug, args.to, args.depth or GRAPH_MAX_DEPTH, db_path,
+                      use_cache=not args.no_cache, as_json=args.json)
+        else:
+            subgraph(slug, args.depth or 2, db_path, use_cache=not args.no_cache, as_json=args.json)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+search_scheduler.py - Bounded, rate-limited, retrying runner for source searches.
+
+Used by: jobs-source-linkedin-jobspy.py
+
+Runs independent searches on a small thread pool while keeping the overall
+start rate inside a politeness budget:
+  - TokenBucket: global limit on search attempts per second (retries included)
+  - per-key caps: at most N searches in flight per key (e.g. per country)
+  - retry with exponential backoff + jitter; a search only counts as failed
+    once its retries are exhausted
+
+Clock and sleep are injectable so the scheduler can be exercised with a stub
+search function and no real waiting.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, holding up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+def interleave_by_key(tasks: list[tuple]) -> list[tuple]:
+    """Round-robin tasks across keys (task[0]) so per-key caps don't idle workers."""
+    buckets = {}
+    for task in tasks:
+        buckets.setdefault(task[0], []).append(task)
+    queues = list(buckets.values())
+    ordered = []
+    while queues:
+        for q in queues:
+            ordered.append(q.pop(0))
+        queues = [q for q in queues if q]
+    return ordered
+
+
+class SearchScheduler:
+    """Run func(*args) for each (key, args) task on a bounded worker pool.
+
+    run() yields (index, result, error, attempts) as searches finish, where
+    index is the task's position in the input list; error is the last
+    exception when all attempts failed, else None. Each attempt takes one
+    token from bucket (built from rate unless one is passed in).
+    """
+
+    def __init__(self, func, max_workers: int = 4, rate: float = 0.5,
+                 per_key_limit: int = 2, max_retries: int = 2, backoff: float = 5.0,
+                 clock=time.monotonic, sleep=time.sleep, bucket: TokenBucket | None = None):
+        self.func = func
+        self.max_workers = max_workers
+        self.per_key_limit = per_key_limit
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._sleep = sleep
+        self.bucket = bucket if bucket is not None else TokenBucket(rate, clock=clock, sleep=sleep)
+        self._key_locks = {}
+        self._key_locks_guard = threading.Lock()
+        self.retries_used = 0
+        self._stats_lock = threading.Lock()
+
+    def _key_lock(self, key) -> threading.BoundedSemaphore:
+        with self._key_locks_guard:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.BoundedSemaphore(self.per_key_limit)
+            return self._key_locks[key]
+
+    def _run_one(self, key, args):
+        error = None
+        with self._key_lock(key):
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    with self._stats_lock:
+                        self.retries_used += 1
+                    self._sleep(self.backoff * (2 ** (attempt - 1)) * (1 + random.random() / 2))
+                self.bucket.acquire()
+                try:
+                    return self.func(*args), None, attempt + 1
+                except Exception as e:
+                    error = e
+        return None, error, self.max_retries + 1
+
+    def run(self, tasks: list[tuple]):
+        """tasks: [(key, args_tuple), ...]. Yields (index, result, error, attempts)."""
+        indexed = [(key, i, args) for i, (key, args) in enumerate(tasks)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self._run_one, key, args): i
+                for key, i, args in interleave_by_key(indexed)
+            }
+            for future in as_completed(futures):
+                result, error, attempts = future.result()
+                yield futures[future], result, error, attempts
@@ -0,0 +1,16 @@
+"""Shared pytest setup: the scripts are run from scripts/, not installed."""
+import importlib.util
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+
+def load_script(filename, name=None):
+    """Import a script whose file name isn't a module name (knowledge-brain.py)."""
+    name = name or filename.removesuffix(".py").replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
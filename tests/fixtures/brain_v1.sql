@@ -0,0 +1,102 @@
+-- A knowledge brain at schema version 1 (the tables init_db created before
+-- brain_db migrations existed), with a few pages, links and timeline rows.
+
+CREATE TABLE pages (
+        id            INTEGER PRIMARY KEY AUTOINCREMENT,
+        slug          TEXT    NOT NULL UNIQUE,
+        type          TEXT    NOT NULL,
+        title         TEXT    NOT NULL,
+        compiled_truth TEXT   NOT NULL DEFAULT '',
+        timeline      TEXT    NOT NULL DEFAULT '',
+        frontmatter   TEXT    NOT NULL DEFAULT '{}',
+        created_at    TEXT    NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+        updated_at    TEXT    NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+    );
+CREATE INDEX idx_pages_type ON pages(type);
+CREATE INDEX idx_pages_slug ON pages(slug);
+CREATE VIRTUAL TABLE page_fts USING fts5(
+        title, compiled_truth, timeline,
+        content='pages', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+/* page_fts(title,compiled_truth,timeline) */;
+CREATE TRIGGER pages_ai AFTER INSERT ON pages BEGIN
+        INSERT INTO page_fts(rowid, title, compiled_truth, timeline)
+        VALUES (new.id, new.title, new.compiled_truth, new.timeline);
+    END;
+CREATE TRIGGER pages_ad AFTER DELETE ON pages BEGIN
+        INSERT INTO page_fts(page_fts, rowid, title, compiled_truth, timeline)
+        VALUES ('delete', old.id, old.title, old.compiled_truth, old.timeline);
+    END;
+CREATE TRIGGER pages_au AFTER UPDATE ON pages BEGIN
+        INSERT INTO page_fts(page_fts, rowid, title, compiled_truth, timeline)
+        VALUES ('delete', old.id, old.title, old.compiled_truth, old.timeline);
+        INSERT INTO page_fts(rowid, title, compiled_truth, timeline)
+        VALUES (new.id, new.title, new.compiled_truth, new.timeline);
+    END;
+CREATE TABLE timeline_entries (
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        page_id   INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+        date      TEXT    NOT NULL,
+        source    TEXT    NOT NULL DEFAULT '',
+        summary   TEXT    NOT NULL,
+        detail    TEXT    NOT NULL DEFAULT '',
+        created_at TEXT   NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+    );
+CREATE INDEX idx_timeline_page ON timeline_entries(page_id);
+CREATE INDEX idx_timeline_date ON timeline_entries(date);
+CREATE TABLE tags (
+        id      INTEGER PRIMARY KEY AUTOINCREMENT,
+        page_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+        tag     TEXT    NOT NULL,
+        UNIQUE(page_id, tag)
+    );
+CREATE INDEX idx_tags_tag ON tags(tag);
+CREATE INDEX idx_tags_page ON tags(page_id);
+CREATE TABLE links (
+        id           INTEGER PRIMARY KEY AUTOINCREMENT,
+        from_page_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+        to_page_id   INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+        context      TEXT    NOT NULL DEFAULT '',
+        created_at   TEXT    NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+        UNIQUE(from_page_id, to_page_id)
+    );
+CREATE INDEX idx_links_from ON links(from_page_id);
+CREATE INDEX idx_links_to ON links(to_page_id);
+CREATE TABLE ingest_log (
+        id            INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_type   TEXT    NOT NULL,
+        source_ref    TEXT    NOT NULL,
+        pages_updated TEXT    NOT NULL DEFAULT '[]',
+        summary       TEXT    NOT NULL DEFAULT '',
+        timestamp     TEXT    NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+    );
+CREATE TABLE config (
+        key   TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+
+INSERT INTO config (key, value) VALUES ('version', '1'), ('chunk_strategy', 'section'),
+    ('entities_dir', 'memory/entities');
+INSERT INTO pages (id, slug, type, title, compiled_truth, timeline, frontmatter) VALUES
+    (1, 'people/lee-abrahams', 'person', 'Lee Abrahams',
+     '# Lee Abrahams
+
+> Director, Talent @ Proximie.
+
+## State
+**Status:** active
+', '', '{"status": "active", "priority": "high", "open_threads": ["follow up", "send CV"]}'),
+    (2, 'companies/proximie', 'company', 'Proximie', '# Proximie
+
+Surgical video platform.
+', '', '{"status": "target"}'),
+    (3, 'roles/cto-proximie', 'role', 'CTO — Proximie', '# CTO — Proximie
+', '', '{"status": "applied", "date_applied": "2026-03-28"}'),
+    (4, 'people/broken-frontmatter', 'person', 'Broken Frontmatter', '', '', 'not json');
+INSERT INTO links (from_page_id, to_page_id, context) VALUES
+    (1, 2, 'works at'), (2, 1, 'works at'), (3, 2, 'role at');
+INSERT INTO timeline_entries (page_id, date, source, summary) VALUES
+    (1, '2026-04-05', 'email: 2026-04-05', 'Email: Interview invite'),
+    (3, '2026-03-28', 'pipeline', 'Applied');
+INSERT INTO ingest_log (source_type, source_ref, summary) VALUES ('pipeline', 'automated', 'Emails: 1, Jobs: 1');
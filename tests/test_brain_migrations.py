@@ -0,0 +1,98 @@
+"""brain_db.migrate() on a v1 brain: every step applies once and matches a fresh init."""
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import brain_db
+from conftest import load_script
+
+FIXTURE = Path(__file__).parent / "fixtures" / "brain_v1.sql"
+
+
+@pytest.fixture
+def v1_db(tmp_path):
+    path = tmp_path / "v1.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(FIXTURE.read_text())
+    conn.execute("PRAGMA foreign_keys = ON")
+    yield conn
+    conn.close()
+
+
+def _objects(conn):
+    return {name: sql for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'")}
+
+
+def test_migrates_v1_to_latest_once(v1_db):
+    assert brain_db.schema_version(v1_db) == 1
+    assert brain_db.migrate(v1_db) == list(range(2, brain_db.SCHEMA_VERSION + 1))
+    assert brain_db.schema_version(v1_db) == brain_db.SCHEMA_VERSION == 7
+    assert brain_db.migrate(v1_db) == []
+
+
+def test_existing_rows_survive_and_backfill(v1_db):
+    brain_db.migrate(v1_db)
+    assert v1_db.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 4
+    assert v1_db.execute("SELECT COUNT(*) FROM timeline_entries").fetchone()[0] == 2
+
+    # v2: generated frontmatter columns, NULL/0 on invalid JSON, and indexed
+    rows = v1_db.execute("SELECT slug, status, priority, date_applied, open_thread_count FROM pages "
+                         "ORDER BY id").fetchall()
+    assert rows == [("people/lee-abrahams", "active", "high", None, 2),
+                    ("companies/proximie", "target", None, None, 0),
+                    ("roles/cto-proximie", "applied", None, "2026-03-28", 0),
+                    ("people/broken-frontmatter", None, None, None, 0)]
+    plan = " ".join(r[-1] for r in v1_db.execute(
+        "EXPLAIN QUERY PLAN SELECT slug FROM pages WHERE type = 'role' AND status = 'applied'"))
+    assert "idx_pages_type_status" in plan
+
+    # v3: adjacency holds every link in both directions, once
+    assert sorted(v1_db.execute("SELECT page_id, neighbor_id FROM adjacency")) == [
+        (1, 2), (2, 1), (2, 3), (3, 2)]
+
+    # v6: every existing page is queued for chunking
+    assert sorted(r[0] for r in v1_db.execute("SELECT page_id FROM chunk_dirty")) == [1, 2, 3, 4]
+
+
+def test_migrated_triggers(v1_db):
+    brain_db.migrate(v1_db)
+    v1_db.execute("DELETE FROM vector_dirty")
+
+    # v4: frontmatter-only writes leave FTS (and the vector queue) alone
+    v1_db.execute("UPDATE pages SET frontmatter = '{\"status\": \"closed\"}' WHERE id = 2")
+    assert v1_db.execute("SELECT COUNT(*) FROM vector_dirty").fetchone()[0] == 0
+    v1_db.execute("UPDATE pages SET title = 'Proximie Ltd' WHERE id = 2")
+    v1_db.execute("INSERT INTO page_fts(page_fts) VALUES ('integrity-check')")
+    assert v1_db.execute("SELECT rowid FROM page_fts WHERE page_fts MATCH 'ltd'").fetchall() == [(2,)]
+    assert v1_db.execute("SELECT page_id FROM vector_dirty").fetchall() == [(2,)]
+
+    # v3: new links reach adjacency through the trigger
+    v1_db.execute("INSERT INTO links (from_page_id, to_page_id) VALUES (1, 3)")
+    assert v1_db.execute("SELECT COUNT(*) FROM adjacency WHERE page_id = 3 AND neighbor_id = 1").fetchone()[0] == 1
+
+    # v7: a log intent id is recorded once; plain log rows stay unconstrained
+    v1_db.execute("INSERT INTO ingest_log (source_type, source_ref, intent_id) VALUES ('x', 'y', 'abc')")
+    with pytest.raises(sqlite3.IntegrityError):
+        v1_db.execute("INSERT INTO ingest_log (source_type, source_ref, intent_id) VALUES ('x', 'y', 'abc')")
+    v1_db.execute("INSERT INTO ingest_log (source_type, source_ref) VALUES ('x', 'y')")
+
+
+def test_schema_matches_fresh_init(v1_db, tmp_path, capsys):
+    brain_db.migrate(v1_db)
+    fresh_path = tmp_path / "fresh.db"
+    load_script("knowledge-brain.py").init_db(fresh_path)
+    brain_db.get_pool(fresh_path).close_all()
+    fresh = sqlite3.connect(fresh_path)
+    try:
+        fresh_objects = _objects(fresh)
+        version = brain_db.schema_version(fresh)
+    finally:
+        fresh.close()
+
+    assert version == brain_db.SCHEMA_VERSION
+    # init_db also creates lazily-ensured tables (entity_files, query cache);
+    # everything the migrations built must be identical there
+    migrated = _objects(v1_db)
+    assert {name: fresh_objects.get(name) for name in migrated} == migrated
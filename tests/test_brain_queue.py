@@ -0,0 +1,105 @@
+"""Write queue recovery: replays apply once, bad intents are quarantined once."""
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import brain_db
+import brain_queue
+
+FIXTURE = Path(__file__).parent / "fixtures" / "brain_v1.sql"
+
+
+@pytest.fixture
+def brain(tmp_path):
+    path = tmp_path / "knowledge.db"
+    seed = sqlite3.connect(path)
+    seed.executescript(FIXTURE.read_text())
+    seed.close()
+    conn = brain_db.get_db(path)   # migrates to the current schema
+    brain_db.ensure_timeline_unique(conn)
+    yield conn, path
+    brain_db.get_pool(path).close_all()
+    conn.pool = None
+    conn.close()
+
+
+INTENTS = [
+    {"op": "timeline", "page": "people/lee-abrahams", "date": "2026-04-06", "source": "email: 2026-04-06",
+     "summary": "Email: Offer", "max": ["last_email_date"]},
+    {"op": "link", "from": "people/lee-abrahams", "to": {"title": "Noon", "type": "company",
+                                                         "slug": "companies/noon"}, "context": "met at"},
+    {"op": "log", "source_type": "pipeline", "source_ref": "automated", "summary": "Emails: 1"},
+    {"op": "config", "key": "email_history_offset", "value": 123},
+]
+
+
+def _counts(conn):
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("pages", "timeline_entries", "links", "ingest_log")}
+
+
+def test_replayed_spool_applies_once(brain, monkeypatch):
+    conn, path = brain
+    # Keep the spool around, as if the writer died before truncating it
+    monkeypatch.setattr(brain_queue, "_truncate_if_drained", lambda conn, path, offset: False)
+    brain_queue.enqueue(path, INTENTS)
+    first = brain_queue.drain(conn, path)
+    after_first = _counts(conn)
+    assert first["timeline"] == 1 and first["links"] == 2
+    assert after_first["ingest_log"] == 2
+
+    conn.execute("UPDATE config SET value = '0' WHERE key = 'spool_offset'")
+    conn.commit()
+    replay = brain_queue.drain(conn, path)
+    assert replay["intents"] == len(INTENTS)
+    assert replay["timeline"] == replay["links"] == 0
+    assert _counts(conn) == after_first
+    assert conn.execute("SELECT json_extract(frontmatter, '$.last_email_date') FROM pages "
+                        "WHERE slug = 'people/lee-abrahams'").fetchone()[0] == "2026-04-06"
+
+
+def test_log_intent_enqueued_twice_logs_once(brain):
+    conn, path = brain
+    log = {"op": "log", "source_type": "pipeline", "source_ref": "automated", "summary": "x", "id": "fixed"}
+    brain_queue.enqueue(path, [log])
+    brain_queue.enqueue(path, [log])
+    brain_queue.drain(conn, path)
+    assert conn.execute("SELECT COUNT(*) FROM ingest_log WHERE intent_id = 'fixed'").fetchone()[0] == 1
+
+
+def test_failing_intent_is_quarantined_once(brain, monkeypatch):
+    conn, path = brain
+    monkeypatch.setattr(brain_queue, "_truncate_if_drained", lambda conn, path, offset: False)
+
+    def boom(applier, intent):
+        applier.page({"title": "Ghost", "type": "person", "slug": "people/ghost"})
+        raise RuntimeError("boom")
+
+    handlers = {"boom": boom}
+    brain_queue.enqueue(path, [INTENTS[0], {"op": "boom"}, INTENTS[2]])
+    stats = brain_queue.drain(conn, path, handlers)
+    assert stats["rejected"] == 1 and stats["timeline"] == 1
+    rejected = [json.loads(line) for line in brain_queue.rejected_path(path).read_text().splitlines()]
+    assert [r["intent"] for r in rejected] == [{"op": "boom"}]
+    assert rejected[0]["error"] == "RuntimeError: boom"
+    # The failed intent's page was rolled back with it, and not cached by the resolver
+    assert conn.execute("SELECT COUNT(*) FROM pages WHERE slug = 'people/ghost'").fetchone()[0] == 0
+    brain_queue.enqueue(path, [{"op": "timeline", "page": "people/ghost", "date": "2026-04-07",
+                                "source": "s", "summary": "after"}])
+    assert brain_queue.drain(conn, path, handlers)["missing"] == {"people/ghost"}
+
+    # The offset moved past the group: nothing is re-applied or re-rejected
+    assert brain_queue.pending_bytes(conn, path) == 0
+    assert len(brain_queue.rejected_path(path).read_text().splitlines()) == 1
+
+
+def test_torn_line_does_not_swallow_next_intent(brain):
+    conn, path = brain
+    with open(brain_queue.spool_path(path), "ab") as f:
+        f.write(b'{"op": "timeline", "page": "people/lee-abr')   # producer died mid-write
+    brain_queue.enqueue(path, [INTENTS[0]])
+    stats = brain_queue.drain(conn, path)
+    assert stats["timeline"] == 1
+    assert brain_queue.pending_bytes(conn, path) == 0
@@ -0,0 +1,46 @@
+"""JDCache.get_or_fetch: one fetch per ID, failures counted once and never cached."""
+import threading
+
+import pytest
+
+from jd_cache import JDCache
+
+
+def test_concurrent_misses_share_one_fetch(tmp_path):
+    cache = JDCache(tmp_path, source="test")
+    started, release = threading.Event(), threading.Event()
+    fetched = []
+
+    def fetch(job_id):
+        fetched.append(job_id)
+        started.set()
+        release.wait(5)
+        return "full description"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("li-42", fetch)))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    started.wait(5)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert fetched == ["li-42"]
+    assert results == ["full description"] * 4
+    assert (cache.misses, cache.hits) == (1, 3)
+    assert JDCache(tmp_path).get("42") == "full description"   # persisted
+
+
+def test_fetch_failure_reaches_caller_and_is_not_cached(tmp_path):
+    cache = JDCache(tmp_path)
+
+    def rate_limited(job_id):
+        raise RuntimeError("429 Too Many Requests")
+
+    with pytest.raises(RuntimeError, match="429"):
+        cache.get_or_fetch("li-7", rate_limited)
+    assert cache.kpi()["jd_fetch_failures"] == 1
+    assert cache.get_or_fetch("li-7", lambda job_id: "recovered") == "recovered"
+    assert cache.kpi()["jd_fetch_failures"] == 1
@@ -0,0 +1,66 @@
+"""FuzzyKeyIndex must agree with the brute-force SequenceMatcher scan it replaced."""
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from jobs_dedup import FuzzyKeyIndex
+
+TITLES = ["pmo director", "head of pmo", "vp digital transformation", "chief technology officer",
+          "program director", "head of delivery", "director of strategy", "cto", "coo"]
+COMPANIES = ["proximie", "mastercard", "emirates nbd", "aramco", "stc", "noon", "careem", "g42"]
+
+
+def _mutate(rng, text):
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        op = rng.choice("ids")
+        pos = rng.randrange(len(chars) + 1)
+        if op == "i":
+            chars.insert(pos, rng.choice("abcdeilnorst -"))
+        elif chars and pos < len(chars):
+            if op == "d":
+                del chars[pos]
+            else:
+                chars[pos] = rng.choice("abcdeilnorst -")
+    return "".join(chars)
+
+
+def _keys(seed, n):
+    rng = random.Random(seed)
+    return [f"{_mutate(rng, rng.choice(TITLES))}|||{_mutate(rng, rng.choice(COMPANIES))}"
+            for _ in range(n)]
+
+
+def _ratio(query, key):
+    return SequenceMatcher(None, query, key).ratio()
+
+
+@pytest.mark.parametrize("threshold", [0.75, 0.85, 0.9, 0.95])
+@pytest.mark.parametrize("seed", range(3))
+def test_find_matches_linear_scan(threshold, seed):
+    index = FuzzyKeyIndex(threshold)
+    kept = []
+    for key in _keys(seed, 150):
+        expected = next((i for i, k in enumerate(kept) if _ratio(key, k) >= threshold), None)
+        assert index.find(key) == expected
+        if expected is None:
+            index.add(key, len(kept))
+            kept.append(key)
+
+
+@pytest.mark.parametrize("threshold", [0.75, 0.85, 0.95])
+def test_matches_returns_every_key_over_threshold(threshold):
+    keys = _keys(42, 150)
+    index = FuzzyKeyIndex(threshold)
+    for i, key in enumerate(keys):
+        index.add(key, i)
+    for query in _keys(7, 60) + ["", "ab", "cto|||g42"]:
+        expected = {i: _ratio(query, k) for i, k in enumerate(keys) if _ratio(query, k) >= threshold}
+        assert dict(index.matches(query)) == pytest.approx(expected)
+
+
+def test_keys_are_case_insensitive():
+    index = FuzzyKeyIndex(0.85)
+    index.add("PMO Director|||Proximie", "job")
+    assert index.find("pmo director|||proximie") == "job"
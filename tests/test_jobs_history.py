@@ -0,0 +1,88 @@
+"""jobs-merge's history sidecar: diff-synced against `jobs`, no triggers on it."""
+import sqlite3
+
+import pytest
+
+from jobs_dedup import FuzzyKeyIndex, load_history_index, sync_history_keys
+
+THRESHOLD = 0.85
+
+
+def normalize(title, company):
+    return f"{title.lower().strip()}|||{company.lower().strip()}"
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    conn = sqlite3.connect(tmp_path / "pipeline.db")
+    conn.execute("""CREATE TABLE jobs (id INTEGER PRIMARY KEY, title TEXT, company TEXT,
+                                       applied_date TEXT, verdict TEXT, url_hash TEXT)""")
+    conn.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?)", [
+        (1, "PMO Director", "Proximie", "2026-03-01", None, None),
+        (2, "PMO Directors", "Proximie", None, "SKIP", "h2"),
+        (3, "Head of PMO", "Aramco", None, "SUBMIT", "h3"),
+        (4, "Head of PMO", "Aramco", None, "SKIP", None),       # no url_hash: not history
+        (5, "Chief Technology Officer", "Noon", None, None, None),
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _full_index(conn):
+    index = FuzzyKeyIndex(THRESHOLD)
+    for job_id, title, company, applied, verdict, url_hash in conn.execute("SELECT * FROM jobs"):
+        scored = bool(verdict and url_hash)
+        if applied or scored:
+            index.add(normalize(title, company), (job_id, bool(applied), scored, url_hash))
+    return index
+
+
+def _assert_same_matches(conn, queries):
+    history = load_history_index(conn, THRESHOLD, queries)
+    full = _full_index(conn)
+    for query in queries:
+        assert sorted(history.matches(query)) == sorted(full.matches(query))
+
+
+QUERIES = ["pmo director|||proximie", "head of pmo|||aramco", "cto|||noon", "chief technology officer|||noon"]
+
+
+def test_sync_matches_full_index_and_leaves_jobs_alone(pipeline):
+    assert sync_history_keys(pipeline, normalize, "1") == 3
+    _assert_same_matches(pipeline, QUERIES)
+    triggers = pipeline.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'jobs'")
+    assert triggers.fetchall() == []
+    assert sync_history_keys(pipeline, normalize, "1") == 0
+
+
+def test_sync_follows_changes_in_jobs(pipeline):
+    sync_history_keys(pipeline, normalize, "1")
+    pipeline.execute("UPDATE jobs SET title = 'Chief Technology Officer', company = 'Noon' WHERE id = 3")
+    pipeline.execute("UPDATE jobs SET applied_date = '2026-04-01' WHERE id = 5")
+    pipeline.execute("UPDATE jobs SET applied_date = NULL WHERE id = 1")
+    pipeline.execute("INSERT INTO jobs VALUES (6, 'Head of PMO', 'Aramco', '2026-04-02', NULL, NULL)")
+    pipeline.commit()
+    assert sync_history_keys(pipeline, normalize, "1") == 3   # ids 3, 5, 6; id 1 is dropped
+    assert pipeline.execute("SELECT COUNT(*) FROM job_history_grams WHERE job_id = 1").fetchone()[0] == 0
+    _assert_same_matches(pipeline, QUERIES)
+
+
+def test_new_normalizer_version_rekeys_everything(pipeline):
+    sync_history_keys(pipeline, normalize, "1")
+    assert sync_history_keys(pipeline, lambda t, c: normalize(t, c).replace("|||", " @ "), "2") == 3
+    assert {r[0] for r in pipeline.execute("SELECT key_version FROM job_history_keys")} == {"2"}
+
+
+def test_legacy_trigger_sidecar_is_rebuilt(pipeline):
+    pipeline.executescript("""
+        CREATE TABLE job_history_keys (job_id PRIMARY KEY, fuzzy_key TEXT, applied INTEGER, scored INTEGER,
+                                       url_hash TEXT, key_len INTEGER, key_version TEXT);
+        CREATE TRIGGER job_history_keys_ad AFTER DELETE ON jobs BEGIN
+            DELETE FROM job_history_keys WHERE job_id = old.id;
+        END;
+    """)
+    assert sync_history_keys(pipeline, normalize, "1") == 3
+    assert pipeline.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+                            "AND tbl_name = 'jobs'").fetchone()[0] == 0
+    _assert_same_matches(pipeline, QUERIES)
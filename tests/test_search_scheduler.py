@@ -0,0 +1,115 @@
+"""SearchScheduler: input-order results, per-key caps, retries and the token bucket."""
+import threading
+import time
+
+import pytest
+
+from search_scheduler import SearchScheduler, TokenBucket, interleave_by_key
+
+
+class FakeClock:
+    """Monotonic clock that only moves when something sleeps on it.
+
+    Tests use power-of-two rates so every wait is exact in binary floating
+    point; otherwise a bucket can keep sleeping for a remainder too small
+    to move the clock.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+
+def test_interleave_round_robins_keys_in_input_order():
+    tasks = [("uae", 1), ("uae", 2), ("uae", 3), ("ksa", 4), ("qatar", 5), ("ksa", 6)]
+    assert interleave_by_key(tasks) == [("uae", 1), ("ksa", 4), ("qatar", 5),
+                                        ("uae", 2), ("ksa", 6), ("uae", 3)]
+
+
+def test_token_bucket_spaces_acquires_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, clock=clock, sleep=clock.sleep)
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now == pytest.approx(6.0)   # first token is free, then one per 2 s
+
+
+def test_results_are_indexed_by_input_position():
+    clock = FakeClock()
+    tasks = [(f"k{i % 3}", (i,)) for i in range(12)]
+    scheduler = SearchScheduler(lambda i: i * i, max_workers=4, rate=64.0,
+                                clock=clock, sleep=clock.sleep)
+    results = {index: (result, error, attempts) for index, result, error, attempts in scheduler.run(tasks)}
+    assert results == {i: (i * i, None, 1) for i in range(12)}
+
+
+def test_per_key_limit_caps_concurrency():
+    in_flight, peak, lock = {}, {}, threading.Lock()
+
+    def search(key):
+        with lock:
+            in_flight[key] = in_flight.get(key, 0) + 1
+            peak[key] = max(peak.get(key, 0), in_flight[key])
+        time.sleep(0.01)
+        with lock:
+            in_flight[key] -= 1
+
+    tasks = [(key, (key,)) for key in ["uae"] * 6 + ["ksa"] * 6]
+    scheduler = SearchScheduler(search, max_workers=6, rate=1024.0, per_key_limit=2)
+    assert len(list(scheduler.run(tasks))) == 12
+    assert set(peak) == {"uae", "ksa"} and max(peak.values()) <= 2
+
+
+def test_retries_with_backoff_then_gives_up():
+    clock = FakeClock()
+    calls = {}
+
+    def flaky(name, failures):
+        calls[name] = calls.get(name, 0) + 1
+        if calls[name] <= failures:
+            raise RuntimeError(f"{name} attempt {calls[name]}")
+        return name
+
+    tasks = [("k", ("ok", 0)), ("k", ("recovers", 2)), ("k", ("dead", 5))]
+    scheduler = SearchScheduler(flaky, max_workers=1, rate=1024.0, max_retries=2, backoff=5.0,
+                                clock=clock, sleep=clock.sleep)
+    results = {index: (result, error, attempts) for index, result, error, attempts in scheduler.run(tasks)}
+
+    assert results[0] == ("ok", None, 1)
+    assert results[1] == ("recovers", None, 3)
+    assert results[2][0] is None and str(results[2][1]) == "dead attempt 3" and results[2][2] == 3
+    assert calls == {"ok": 1, "recovers": 3, "dead": 3}
+    assert scheduler.retries_used == 4
+    # Exponential backoff with up to 50% jitter: 5 s then 10 s, per search
+    backoffs = [s for s in clock.sleeps if s >= 1.0]
+    assert len(backoffs) == 4
+    for base, slept in zip([5.0, 10.0, 5.0, 10.0], backoffs):
+        assert base <= slept <= base * 1.5
+
+
+def test_every_attempt_takes_one_token_from_a_shared_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, clock=clock, sleep=clock.sleep)
+    attempts = []
+
+    def search(i):
+        attempts.append(i)
+        if attempts.count(i) == 1 and i == 0:
+            raise RuntimeError("429")
+
+    scheduler = SearchScheduler(search, max_workers=1, rate=1024.0, max_retries=1, backoff=0.0,
+                                clock=clock, sleep=clock.sleep, bucket=bucket)
+    assert scheduler.bucket is bucket
+    list(scheduler.run([("k", (0,)), ("k", (1,))]))
+    assert len(attempts) == 3
+    assert clock.now == pytest.approx(4.0)   # 3 tokens at 0.5/s, the first free